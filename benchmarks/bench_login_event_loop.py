@@ -0,0 +1,68 @@
+"""
+Measures how late the event loop runs a 10 ms ticker while a burst of logins verifies bcrypt
+passwords: verified inline on the loop (as before), vs. in the password hashing thread pool.
+Late ticks are the latency every other request on the worker sees meanwhile.
+
+Run with: python -m benchmarks.bench_login_event_loop
+"""
+import asyncio
+import time
+
+from what_to_wear.api.services.auth_service import (
+    get_password_hash,
+    verify_and_update_password,
+    verify_password,
+)
+from what_to_wear.api.utils.constants import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+
+LOGINS = 20
+TICK_SECONDS = 0.01
+
+
+async def login_inline(password: str, hashed_password: str) -> None:
+    verify_password(password, hashed_password)
+
+
+async def login_in_pool(password: str, hashed_password: str) -> None:
+    await verify_and_update_password(password, hashed_password)
+
+
+async def measure_lag(login, hashed_password: str) -> tuple[float, float, float]:
+    """ Seconds for the whole burst, and the p50 and max delay of the ticker meanwhile """
+    delays = []
+    burst_done = asyncio.Event()
+
+    async def ticker():
+        while not burst_done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            delays.append(time.perf_counter() - started - TICK_SECONDS)
+
+    ticking = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK_SECONDS)
+    started = time.perf_counter()
+    await asyncio.gather(*(login("password", hashed_password) for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - started
+    burst_done.set()
+    await ticking
+
+    delays.sort()
+    return elapsed, delays[len(delays) // 2], delays[-1]
+
+
+async def main():
+    hashed_password = get_password_hash("password")
+    print(
+        f"{LOGINS} concurrent logins, bcrypt cost {BCRYPT_ROUNDS}, "
+        f"{PASSWORD_HASH_WORKERS} hashing threads"
+    )
+    for name, login in (("inline", login_inline), ("thread pool", login_in_pool)):
+        elapsed, p50, worst = await measure_lag(login, hashed_password)
+        print(
+            f"{name:>12}: burst {elapsed * 1000:.0f} ms, "
+            f"loop lag p50 {p50 * 1000:.1f} ms, max {worst * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""
+Measures the rule-based recommender (FAST mode and LLM fallback) against the CPU work the LLM path
+does even on a recommendation cache hit (building the prompt and the bucketed cache key), for the
+current weather and a 10-day forecast. A cache miss adds a full LLM round trip on top.
+
+Run with: python -m benchmarks.bench_recommendations
+"""
+import json
+import timeit
+
+from benchmarks.payloads import build_forecast_payload, load_mock_data
+from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.services.recommendation_service import (
+    get_current_recommendation_key,
+    get_forecast_recommendation_key,
+)
+from what_to_wear.api.services.rule_recommendation_service import get_rule_recommendation
+from what_to_wear.api.utils.constants import RequestTypeEnum
+from what_to_wear.api.utils.utils import (
+    generate_clothes_recommendation_prompt_current_weather,
+    generate_clothes_recommendation_prompt_forecast,
+)
+
+ROUNDS = 5000
+
+
+def llm_prompt_current(weather_data: CurrentWeatherResponse) -> tuple:
+    return generate_clothes_recommendation_prompt_current_weather(weather_data), \
+        get_current_recommendation_key(weather_data)
+
+
+def llm_prompt_forecast(weather_data: ForecastWeatherResponse) -> tuple:
+    return generate_clothes_recommendation_prompt_forecast(weather_data), \
+        get_forecast_recommendation_key(weather_data)
+
+
+def measure(func, *args) -> float:
+    """ Microseconds per call """
+    seconds = min(timeit.repeat(lambda: func(*args), number=ROUNDS, repeat=5))
+    return seconds / ROUNDS * 1_000_000
+
+
+def main():
+    current = CurrentWeatherResponse.model_validate(
+        load_mock_data("mock_current_weather_response.json")
+    )
+    forecast = ForecastWeatherResponse.model_validate_json(
+        json.dumps(build_forecast_payload(days=10))
+    )
+
+    print(f"{ROUNDS} rounds")
+    for name, weather_data, type, llm_baseline in (
+        ("current", current, RequestTypeEnum.CURRENT, llm_prompt_current),
+        ("forecast (10 days)", forecast, RequestTypeEnum.FORECAST, llm_prompt_forecast),
+    ):
+        rules = measure(get_rule_recommendation, weather_data, type)
+        prompt = measure(llm_baseline, weather_data)
+        print(f"{name:>18}: rules {rules:.1f} µs, LLM prompt + cache key {prompt:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Compares parsing a 10-day forecast.json body via response.json() + Model(**data) with validating
+the raw bytes directly through Model.model_validate_json(), and with the lazy model that skips the
+hourly entries.
+
+Run with: python -m benchmarks.bench_weather_parsing
+"""
+import json
+import timeit
+
+from benchmarks.payloads import build_forecast_payload
+from what_to_wear.api.models.schemas.forecast_weather import (
+    ForecastWeatherResponse,
+    LazyForecastWeatherResponse,
+)
+
+ROUNDS = 200
+
+
+def parse_via_dict(raw: bytes) -> ForecastWeatherResponse:
+    return ForecastWeatherResponse(**json.loads(raw))
+
+
+def parse_via_json(raw: bytes) -> ForecastWeatherResponse:
+    return ForecastWeatherResponse.model_validate_json(raw)
+
+
+def parse_lazy(raw: bytes) -> LazyForecastWeatherResponse:
+    return LazyForecastWeatherResponse.model_validate_json(raw)
+
+
+def main():
+    raw = json.dumps(build_forecast_payload(days=10)).encode()
+    assert parse_via_dict(raw) == parse_via_json(raw) == parse_lazy(raw).with_hours()
+
+    print(f"Payload: 10 days x 24 hours, {len(raw) / 1024:.0f} KiB, {ROUNDS} rounds")
+    results = {}
+    for parser in (parse_via_dict, parse_via_json, parse_lazy):
+        seconds = min(timeit.repeat(lambda: parser(raw), number=ROUNDS, repeat=5))
+        results[parser.__name__] = seconds / ROUNDS * 1000
+        print(f"{parser.__name__:>16}: {results[parser.__name__]:.3f} ms per parse")
+
+    print(f"Speedup (json): {results['parse_via_dict'] / results['parse_via_json']:.2f}x")
+    print(f"Speedup (lazy): {results['parse_via_dict'] / results['parse_lazy']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
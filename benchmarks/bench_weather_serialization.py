@@ -0,0 +1,43 @@
+"""
+Compares encoding a 10-day forecast response the old way (model_dump() + stdlib json via
+JSONResponse) with ModelJSONResponse, both on first encoding and on a repeated cache hit.
+
+Run with: python -m benchmarks.bench_weather_serialization
+"""
+import timeit
+
+from fastapi.responses import JSONResponse
+
+from benchmarks.payloads import build_forecast_payload
+from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.utils.responses import ModelJSONResponse
+
+ROUNDS = 200
+
+
+def main():
+    payload = build_forecast_payload(days=10)
+    cached = ForecastWeatherResponse.model_validate(payload)
+
+    def encode_via_dict():
+        return JSONResponse(content=cached.model_dump()).body
+
+    def encode_direct():
+        uncached = ForecastWeatherResponse.model_construct(**cached.__dict__)
+        return ModelJSONResponse(content=uncached).body
+
+    def encode_cached_hit():
+        return ModelJSONResponse(content=cached).body
+
+    print(f"Payload: 10 days x 24 hours, {ROUNDS} rounds")
+    results = {}
+    for encoder in (encode_via_dict, encode_direct, encode_cached_hit):
+        seconds = min(timeit.repeat(encoder, number=ROUNDS, repeat=5))
+        results[encoder.__name__] = seconds / ROUNDS * 1000
+        print(f"{encoder.__name__:>18}: {results[encoder.__name__]:.4f} ms per response")
+
+    print(f"Speedup (first encoding): {results['encode_via_dict'] / results['encode_direct']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
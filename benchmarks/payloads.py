@@ -0,0 +1,43 @@
+""" Realistic WeatherAPI payloads for benchmarks, built from the test mock data """
+import json
+from pathlib import Path
+
+MOCK_DATA_DIR = Path(__file__).parent.parent / "what_to_wear" / "tests" / "mock_data"
+
+
+def load_mock_data(filename: str) -> dict:
+    with open(MOCK_DATA_DIR / filename, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def build_hour(base: dict, epoch: int, hour: int) -> dict:
+    current = {key: value for key, value in base.items() if not key.startswith("last_updated")}
+    return {
+        **current,
+        "time_epoch": epoch + hour * 3600,
+        "time": f"2022-01-01 {hour:02d}:00",
+        "temp_c": round(base["temp_c"] + (hour - 12) * 0.4, 1),
+        "snow_cm": 0.0,
+        "will_it_rain": int(hour % 5 == 0),
+        "chance_of_rain": (hour * 7) % 100,
+        "will_it_snow": 0,
+        "chance_of_snow": 0,
+    }
+
+
+def build_forecast_payload(days: int = 10) -> dict:
+    """ A forecast.json response with 'days' days of 24 hourly entries each """
+    current = load_mock_data("mock_current_weather_response.json")
+    forecast = load_mock_data("mock_forecast_weather_response.json")
+    forecast_day = forecast["forecast"]["forecastday"][0]
+
+    forecast_days = []
+    for day in range(days):
+        epoch = forecast_day["date_epoch"] + day * 86400
+        forecast_days.append({
+            **forecast_day,
+            "date": f"2022-01-{day + 1:02d}",
+            "date_epoch": epoch,
+            "hour": [build_hour(current["current"], epoch, hour) for hour in range(24)],
+        })
+    return {**forecast, "forecast": {"forecastday": forecast_days}}
@@ -1,17 +1,22 @@
 from datetime import timedelta
 from http import HTTPStatus
+from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 
 from what_to_wear.api.database.db import get_session
+from what_to_wear.api.models.db_models.user import User
 from what_to_wear.api.models.schemas.jwt import Token
 from what_to_wear.api.models.schemas.user_auth import UserAuth
 from what_to_wear.api.services.auth_service import (
     authenticate_user,
     create_access_token,
     create_user,
+    get_current_user,
     get_user_by_username,
+    oauth2_scheme,
+    revoke_token,
 )
 from what_to_wear.api.utils.constants import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
@@ -40,7 +45,7 @@ async def register_user(user_data: UserAuth, session=Depends(get_session)):
 @router.post("/login", response_model=Token)
 async def login_for_access_token(user_data: UserAuth, session=Depends(get_session)) -> Token:
     """ Logs in and returns JWT, if username and password match a DB User """
-    user = authenticate_user(user_data.username, user_data.password, session)
+    user = await authenticate_user(user_data.username, user_data.password, session)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,3 +57,16 @@ async def login_for_access_token(user_data: UserAuth, session=Depends(get_sessio
         data={"sub": user.username}, expires_delta=access_token_expires
     )
     return Token(access_token=access_token, token_type="bearer")
+
+
+@router.post("/logout")
+async def logout(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    current_user: User = Depends(get_current_user)
+) -> JSONResponse:
+    """
+    Revokes the JWT used for this request until it expires. Other instances reject it within
+    AUTH_TOKEN_CACHE_TTL_SECONDS
+    """
+    revoke_token(token)
+    return JSONResponse(status_code=HTTPStatus.OK, content="Logged out successfully.")
@@ -1,19 +1,54 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
+from sqlmodel import Session
 
+from what_to_wear.api.database.db import get_session
+from what_to_wear.api.models.db_models.user import User
+from what_to_wear.api.models.schemas.forecast_weather import (
+    ForecastWeatherResponse,
+    LazyForecastWeatherResponse,
+)
+from what_to_wear.api.models.schemas.recommendation_job import (
+    RecommendationJobRequest,
+    RecommendationJobResponse,
+)
+from what_to_wear.api.models.schemas.stats import (
+    CacheStatsResponse,
+    DispatcherStatsResponse,
+    LLMUsageStatsResponse,
+    RecommendationStatsResponse,
+)
+from what_to_wear.api.models.schemas.weather_recommendation import (
+    ForecastRecommendationParams,
+    ForecastRecommendationResponse,
+)
 from what_to_wear.api.models.schemas.weather_request_params import (
     ForecastWeatherRequestParams,
     WeatherRequestParams,
 )
 from what_to_wear.api.services.auth_service import get_current_user
-from what_to_wear.api.services.recommendation_service import get_llm_recommendation
+from what_to_wear.api.services.recommendation_job_service import create_job, get_job
+from what_to_wear.api.services.recommendation_service import (
+    get_recommendation,
+    llm_dispatcher,
+    llm_usage,
+    model_selector,
+    recommendation_cache,
+    recommendation_sources,
+    stream_recommendation,
+)
 from what_to_wear.api.services.weather_service import (
     get_current_weather_data,
     get_forecast_weather_data,
 )
-from what_to_wear.api.utils.constants import RequestTypeEnum
+from what_to_wear.api.utils.constants import (
+    RecommendationDeliveryEnum,
+    RecommendationModeEnum,
+    RequestTypeEnum,
+)
+from what_to_wear.api.utils.responses import EventStreamResponse, ModelJSONResponse, format_event
 
 router = APIRouter()
 
@@ -21,12 +56,17 @@ router = APIRouter()
 @router.get("/current", response_model=str)
 async def get_current_recommendation(
     params: WeatherRequestParams = Depends(),
+    mode: RecommendationModeEnum = Query(
+        RecommendationModeEnum.LLM, description="'fast' for rule-based advice"
+    ),
     current_user: dict = Depends(get_current_user)
 ) -> JSONResponse:
     try:
         weather_data = await get_current_weather_data(params.lat, params.lon, params.city)
-        recommendation = await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+        recommendation = await get_recommendation(weather_data, RequestTypeEnum.CURRENT, mode)
         return JSONResponse(status_code=HTTPStatus.OK, content=recommendation)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -34,11 +74,174 @@ async def get_current_recommendation(
 @router.get("/forecast", response_model=str)
 async def get_forecast_recommendation(
     params: ForecastWeatherRequestParams = Depends(),
+    mode: RecommendationModeEnum = Query(
+        RecommendationModeEnum.LLM, description="'fast' for rule-based advice"
+    ),
     current_user: dict = Depends(get_current_user)
 ) -> JSONResponse:
     try:
         weather_data = await get_forecast_weather_data(params.lat, params.lon, params.city, params.days)
-        recommendation = await get_llm_recommendation(weather_data, RequestTypeEnum.FORECAST)
+        recommendation = await get_recommendation(weather_data, RequestTypeEnum.FORECAST, mode)
         return JSONResponse(status_code=HTTPStatus.OK, content=recommendation)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/forecast/with-weather", response_model=ForecastRecommendationResponse)
+async def get_forecast_with_recommendation(
+    request: Request,
+    params: ForecastRecommendationParams = Depends(),
+    session=Depends(get_session),
+    current_user: User = Depends(get_current_user)
+) -> Response:
+    """
+    The forecast together with its recommendation, from a single weather fetch and auth check. The
+    recommendation is inline, streamed after a 'weather' event, or deferred to a job polled at
+    Location
+    """
+    try:
+        weather_data = await get_forecast_weather_data(
+            params.lat, params.lon, params.city, params.days
+        )
+        if params.delivery == RecommendationDeliveryEnum.STREAM:
+            return _stream_with_weather(weather_data, params)
+        if params.delivery == RecommendationDeliveryEnum.DEFERRED:
+            return _defer_with_weather(request, weather_data, params, session, current_user)
+        recommendation = await get_recommendation(
+            weather_data, RequestTypeEnum.FORECAST, params.mode
+        )
+        return _weather_response(weather_data, params, HTTPStatus.OK, recommendation=recommendation)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+def _project_weather(
+    weather_data: ForecastWeatherResponse, include_hours: bool
+) -> tuple[ForecastWeatherResponse, str]:
+    """ The forecast to return, and the projection to encode it with """
+    if not include_hours:
+        return weather_data, "summary"
+    if isinstance(weather_data, LazyForecastWeatherResponse):
+        return weather_data.with_hours(), "full"
+    return weather_data, "full"
+
+
+def _weather_response(
+    weather_data: ForecastWeatherResponse, params: ForecastRecommendationParams, status_code: int,
+    **kwargs
+) -> ModelJSONResponse:
+    weather, projection = _project_weather(weather_data, params.include_hours)
+    content = ForecastRecommendationResponse(weather=weather, **kwargs)
+    return ModelJSONResponse(status_code=status_code, content=content, projection=projection)
+
+
+def _stream_with_weather(
+    weather_data: ForecastWeatherResponse, params: ForecastRecommendationParams
+) -> EventStreamResponse:
+    """
+    Responds right away with the 'weather' event, without waiting for the first recommendation
+    chunk. Recommendation failures are therefore reported as an 'error' event
+    """
+    weather, projection = _project_weather(weather_data, params.include_hours)
+    prelude = (format_event(weather.to_json_bytes(projection).decode(), event="weather"),)
+    chunks = stream_recommendation(weather_data, RequestTypeEnum.FORECAST, params.mode)
+    return EventStreamResponse(chunks, prelude=prelude)
+
+
+def _defer_with_weather(
+    request: Request, weather_data: ForecastWeatherResponse, params: ForecastRecommendationParams,
+    session: Session, current_user: User
+) -> ModelJSONResponse:
+    """ The job fetches the forecast again, but from the weather cache this request just filled """
+    job_request = RecommendationJobRequest(
+        lat=params.lat, lon=params.lon, city=params.city, days=params.days,
+        type=RequestTypeEnum.FORECAST, mode=params.mode
+    )
+    job = create_job(job_request, current_user.username, session)
+    job_response = RecommendationJobResponse.model_validate(job.model_dump())
+    response = _weather_response(weather_data, params, HTTPStatus.ACCEPTED, job=job_response)
+    response.headers["Location"] = str(request.url_for("get_recommendation_job", job_id=job.id))
+    return response
+
+
+@router.get("/current/stream", response_class=EventStreamResponse)
+async def stream_current_recommendation(
+    params: WeatherRequestParams = Depends(),
+    mode: RecommendationModeEnum = Query(
+        RecommendationModeEnum.LLM, description="'fast' for rule-based advice"
+    ),
+    current_user: dict = Depends(get_current_user)
+) -> EventStreamResponse:
+    try:
+        weather_data = await get_current_weather_data(params.lat, params.lon, params.city)
+        stream = stream_recommendation(weather_data, RequestTypeEnum.CURRENT, mode)
+        return await EventStreamResponse.start(stream)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/forecast/stream", response_class=EventStreamResponse)
+async def stream_forecast_recommendation(
+    params: ForecastWeatherRequestParams = Depends(),
+    mode: RecommendationModeEnum = Query(
+        RecommendationModeEnum.LLM, description="'fast' for rule-based advice"
+    ),
+    current_user: dict = Depends(get_current_user)
+) -> EventStreamResponse:
+    try:
+        weather_data = await get_forecast_weather_data(
+            params.lat, params.lon, params.city, params.days
+        )
+        stream = stream_recommendation(weather_data, RequestTypeEnum.FORECAST, mode)
+        return await EventStreamResponse.start(stream)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/stats", response_model=RecommendationStatsResponse)
+async def get_recommendation_stats(
+    current_user: dict = Depends(get_current_user)
+) -> RecommendationStatsResponse:
+    return RecommendationStatsResponse(
+        cache=CacheStatsResponse.from_stats(recommendation_cache.stats),
+        llm_dispatcher=DispatcherStatsResponse.from_stats(llm_dispatcher.stats),
+        sources=dict(recommendation_sources),
+        llm_usage={
+            type: LLMUsageStatsResponse.from_stats(stats) for type, stats in llm_usage.stats.items()
+        },
+        model_downgrades=dict(model_selector.downgrades)
+    )
+
+
+@router.post("/jobs", status_code=HTTPStatus.ACCEPTED, response_model=RecommendationJobResponse)
+async def create_recommendation_job(
+    params: RecommendationJobRequest,
+    request: Request,
+    response: Response,
+    session=Depends(get_session),
+    current_user: User = Depends(get_current_user)
+) -> RecommendationJobResponse:
+    """ Accepts a recommendation request to work on in the background. Poll its Location for it """
+    job = create_job(params, current_user.username, session)
+    response.headers["Location"] = str(request.url_for("get_recommendation_job", job_id=job.id))
+    return RecommendationJobResponse.model_validate(job.model_dump())
+
+
+@router.get("/jobs/{job_id}", response_model=RecommendationJobResponse)
+async def get_recommendation_job(
+    job_id: str,
+    session=Depends(get_session),
+    current_user: User = Depends(get_current_user)
+) -> RecommendationJobResponse:
+    job = get_job(job_id, current_user.username, session)
+    if job is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Recommendation job not found")
+    return RecommendationJobResponse.model_validate(job.model_dump())
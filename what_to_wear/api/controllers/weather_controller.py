@@ -1,10 +1,15 @@
 from http import HTTPStatus
+from typing import Union
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
-from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import (
+    ForecastWeatherResponse,
+    ForecastWeatherSummaryResponse,
+    LazyForecastWeatherResponse,
+)
+from what_to_wear.api.models.schemas.weather_batch import WeatherBatchRequest, WeatherBatchResponse
 from what_to_wear.api.models.schemas.weather_request_params import (
     ForecastWeatherRequestParams,
     WeatherRequestParams,
@@ -13,7 +18,9 @@ from what_to_wear.api.services.auth_service import get_current_user
 from what_to_wear.api.services.weather_service import (
     get_current_weather_data,
     get_forecast_weather_data,
+    get_weather_batch,
 )
+from what_to_wear.api.utils.responses import ModelJSONResponse
 
 router = APIRouter()
 
@@ -22,26 +29,56 @@ router = APIRouter()
 async def get_current_weather(
     params: WeatherRequestParams = Depends(),
     current_user: dict = Depends(get_current_user)
-) -> JSONResponse:
+) -> ModelJSONResponse:
     try:
         weather_data = await get_current_weather_data(params.lat, params.lon, params.city)
-        return JSONResponse(status_code=HTTPStatus.OK, content=weather_data.model_dump())
+        return ModelJSONResponse(status_code=HTTPStatus.OK, content=weather_data)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=f"Error fetching weather data: {e}")
 
 
-@router.get("/forecast", response_model=ForecastWeatherResponse)
+@router.get(
+    "/forecast", response_model=Union[ForecastWeatherSummaryResponse, ForecastWeatherResponse]
+)
 async def get_forecast_weather(
     params: ForecastWeatherRequestParams = Depends(),
+    include_hours: bool = Query(False, description="Include the hourly forecast of each day."),
     current_user: dict = Depends(get_current_user)
-) -> JSONResponse:
+) -> ModelJSONResponse:
     try:
         weather_data = await get_forecast_weather_data(params.lat, params.lon, params.city, params.days)
-        return JSONResponse(status_code=HTTPStatus.OK, content=weather_data.model_dump())
+        if not include_hours:
+            return ModelJSONResponse(
+                status_code=HTTPStatus.OK, content=weather_data, projection="summary"
+            )
+        if isinstance(weather_data, LazyForecastWeatherResponse):
+            weather_data = weather_data.with_hours()
+        return ModelJSONResponse(status_code=HTTPStatus.OK, content=weather_data)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
                             detail=f"Error fetching forecast weather data: {e}")
+
+
+@router.post("/batch", response_model=WeatherBatchResponse)
+async def get_weather_batch_data(
+    batch: WeatherBatchRequest,
+    current_user: dict = Depends(get_current_user)
+) -> ModelJSONResponse:
+    try:
+        results = await get_weather_batch(batch.items)
+        return ModelJSONResponse(
+            status_code=HTTPStatus.OK, content=WeatherBatchResponse(results=results)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+                            detail=f"Error fetching batch weather data: {e}")
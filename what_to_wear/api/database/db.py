@@ -1,5 +1,10 @@
+from datetime import datetime, timezone
+
 from sqlmodel import Session, SQLModel, create_engine
 
+from what_to_wear.api.models.db_models.recommendation import Recommendation  # noqa
+from what_to_wear.api.models.db_models.recommendation_job import RecommendationJob  # noqa
+from what_to_wear.api.models.db_models.revoked_token import RevokedToken  # noqa
 from what_to_wear.api.models.db_models.user import User  # noqa
 from what_to_wear.api.utils.constants import DATABASE_URL
 
@@ -13,3 +18,8 @@ def init_db():
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+def utc_now() -> datetime:
+    """ Aware UTC timestamp, for the datetime columns """
+    return datetime.now(timezone.utc)
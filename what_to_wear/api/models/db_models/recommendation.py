@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class Recommendation(SQLModel, table=True):
+    # SHA-256 of the recommendation cache key, i.e. the model and the bucketed weather features:
+    key: str = Field(primary_key=True)
+    model: str = Field()
+    recommendation: str = Field()
+    created_at: datetime = Field()
+    expires_at: datetime = Field(index=True)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+from what_to_wear.api.utils.constants import JobStatusEnum, RecommendationModeEnum, RequestTypeEnum
+
+
+class RecommendationJob(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    username: str = Field(index=True)
+    status: JobStatusEnum = Field(default=JobStatusEnum.PENDING)
+    type: RequestTypeEnum = Field()
+    mode: RecommendationModeEnum = Field(default=RecommendationModeEnum.LLM)
+    lat: Optional[float] = Field(default=None)
+    lon: Optional[float] = Field(default=None)
+    city: Optional[str] = Field(default=None)
+    days: int = Field(default=1)
+    result: Optional[str] = Field(default=None)
+    error: Optional[str] = Field(default=None)
+    status_code: Optional[int] = Field(default=None)
+    created_at: datetime = Field()
+    started_at: Optional[datetime] = Field(default=None)
+    finished_at: Optional[datetime] = Field(default=None)
+    expires_at: datetime = Field(index=True)
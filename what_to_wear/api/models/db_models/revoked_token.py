@@ -0,0 +1,9 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class RevokedToken(SQLModel, table=True):
+    # The "jti" claim of a logged out token, or its SHA-256 if it has none:
+    token_id: str = Field(primary_key=True)
+    expires_at: datetime = Field(index=True)
@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from what_to_wear.api.models.schemas.json_cached_model import JSONCachedModel
+
 
 class Condition(BaseModel):
     text: str
@@ -50,6 +52,6 @@ class CurrentWeather(BaseModel):
     gust_kph: float
 
 
-class CurrentWeatherResponse(BaseModel):
+class CurrentWeatherResponse(JSONCachedModel):
     location: Location
     current: CurrentWeather
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from typing import ClassVar, Optional, Self, Union
+
+from pydantic import BaseModel, PrivateAttr
 
 from what_to_wear.api.models.schemas.current_weather import Condition, CurrentWeather, Location
+from what_to_wear.api.models.schemas.json_cached_model import JSONCachedModel
 
 
 class Astro(BaseModel):
@@ -86,7 +89,73 @@ class Forecast(BaseModel):
     forecastday: list[ForecastDay]
 
 
-class ForecastWeatherResponse(BaseModel):
+class ForecastWeatherResponse(JSONCachedModel):
+    JSON_PROJECTIONS: ClassVar[dict[str, Optional[dict]]] = {
+        "full": None,
+        "summary": {"forecast": {"forecastday": {"__all__": {"hour"}}}},
+    }
+
     location: Location
     current: CurrentWeather
     forecast: Forecast
+
+    def first_days(self, days: int) -> Self:
+        """ Returns a view of the first 'days' forecast days, without re-validating anything """
+        if days >= len(self.forecast.forecastday):
+            return self
+        sliced = self.model_construct(
+            location=self.location,
+            current=self.current,
+            forecast=self.forecast.model_construct(forecastday=self.forecast.forecastday[:days]),
+        )
+        sliced._is_stale = self._is_stale
+        return sliced
+
+
+class ForecastDaySummary(BaseModel):
+    date: str
+    date_epoch: int
+    day: DayForecast
+    astro: Astro
+
+
+class ForecastSummary(BaseModel):
+    forecastday: list[ForecastDaySummary]
+
+
+class ForecastWeatherSummaryResponse(BaseModel):
+    """ The 'summary' projection of ForecastWeatherResponse, as documented for the API """
+    location: Location
+    current: CurrentWeather
+    forecast: ForecastSummary
+
+
+class LazyForecastWeatherResponse(ForecastWeatherResponse):
+    """
+    Forecast parsed without its hourly entries (24 x days HourForecast objects), which most callers
+    never use. The raw upstream body is kept, so the full forecast is only parsed when asked for.
+    """
+    forecast: ForecastSummary
+
+    _raw: bytes = PrivateAttr(default=b"")
+
+    @classmethod
+    def model_validate_json(cls, json_data: Union[str, bytes, bytearray], **kwargs) -> Self:
+        weather_data = super().model_validate_json(json_data, **kwargs)
+        weather_data._raw = json_data.encode() if isinstance(json_data, str) else bytes(json_data)
+        return weather_data
+
+    def first_days(self, days: int) -> Self:
+        sliced = super().first_days(days)
+        sliced._raw = self._raw
+        return sliced
+
+    def with_hours(self) -> ForecastWeatherResponse:
+        """
+        Parses the full forecast on every call. Keeping it would make the cached entry hold the
+        hourly objects next to the raw body, for as long as the entry lives
+        """
+        full = ForecastWeatherResponse.model_validate_json(self._raw)
+        full = full.first_days(len(self.forecast.forecastday))
+        full._is_stale = self._is_stale
+        return full
@@ -0,0 +1,33 @@
+from typing import ClassVar, Optional, Self
+
+from pydantic import BaseModel, PrivateAttr
+
+
+class JSONCachedModel(BaseModel):
+    """
+    Model that remembers its own JSON encoding, per projection. Weather responses are shared through
+    the cache and never mutated, so repeated hits for the same entry reuse the encoded bytes.
+    """
+    # Projection name -> 'exclude' argument for the serializer:
+    JSON_PROJECTIONS: ClassVar[dict[str, Optional[dict]]] = {"full": None}
+
+    _json_bytes: dict[str, bytes] = PrivateAttr(default_factory=dict)
+    _is_stale: bool = PrivateAttr(default=False)
+
+    @property
+    def is_stale(self) -> bool:
+        """ True for last known good data served because the upstream is failing """
+        return self._is_stale
+
+    def as_stale(self) -> Self:
+        stale = self.model_copy()
+        stale._is_stale = True
+        return stale
+
+    def to_json_bytes(self, projection: str = "full") -> bytes:
+        encoded = self._json_bytes.get(projection)
+        if encoded is None:
+            exclude = self.JSON_PROJECTIONS[projection]
+            encoded = self.__pydantic_serializer__.to_json(self, exclude=exclude)
+            self._json_bytes[projection] = encoded
+        return encoded
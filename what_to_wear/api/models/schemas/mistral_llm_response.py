@@ -4,23 +4,49 @@ from pydantic import BaseModel
 
 
 class Message(BaseModel):
-    role: str
+    role: Optional[str] = None
     content: str
     refusal: Optional[str] = None
 
 
 class Choice(BaseModel):
     logprobs: Optional[dict] = None
-    finish_reason: str
-    native_finish_reason: str
-    index: int
+    finish_reason: Optional[str] = None
+    native_finish_reason: Optional[str] = None
+    index: Optional[int] = None
     message: Message
 
 
+class Usage(BaseModel):
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+
+
+# NOTE - only the content is required, metadata fields vary between providers
 class MistralLlmResponse(BaseModel):
-    id: str
-    provider: str
-    model: str
-    object: str
-    created: int
+    id: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    object: Optional[str] = None
+    created: Optional[int] = None
     choices: list[Choice]
+    usage: Optional[Usage] = None
+
+
+class Delta(BaseModel):
+    role: Optional[str] = None
+    content: Optional[str] = None
+
+
+class StreamChoice(BaseModel):
+    index: Optional[int] = None
+    finish_reason: Optional[str] = None
+    delta: Delta
+
+
+# One "data:" event of a streamed completion
+class MistralLlmStreamChunk(BaseModel):
+    id: Optional[str] = None
+    model: Optional[str] = None
+    choices: list[StreamChoice]
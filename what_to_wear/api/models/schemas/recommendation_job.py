@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from what_to_wear.api.models.schemas.weather_request_params import ForecastWeatherRequestParams
+from what_to_wear.api.utils.constants import JobStatusEnum, RecommendationModeEnum, RequestTypeEnum
+
+
+class RecommendationJobRequest(ForecastWeatherRequestParams):
+    type: RequestTypeEnum = Field(
+        RequestTypeEnum.CURRENT, description="CURRENT or FORECAST weather."
+    )
+    mode: RecommendationModeEnum = Field(
+        RecommendationModeEnum.LLM, description="'fast' for rule-based advice."
+    )
+
+
+class RecommendationJobResponse(BaseModel):
+    id: str
+    status: JobStatusEnum
+    type: RequestTypeEnum
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    expires_at: datetime
+    result: Optional[str] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
@@ -0,0 +1,75 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from what_to_wear.api.utils.cache import CacheStats
+from what_to_wear.api.utils.constants import (
+    ModelTierEnum,
+    RecommendationSourceEnum,
+    RequestTypeEnum,
+)
+from what_to_wear.api.utils.dispatcher import DispatcherStats
+from what_to_wear.api.utils.llm_usage import LLMUsageStats
+
+
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    stale_hits: int
+    size: int
+    maxsize: int
+    hit_ratio: float
+
+    @classmethod
+    def from_stats(cls, stats: CacheStats) -> "CacheStatsResponse":
+        return cls(
+            hits=stats.hits, misses=stats.misses, stale_hits=stats.stale_hits, size=stats.size,
+            maxsize=stats.maxsize, hit_ratio=stats.hit_ratio
+        )
+
+
+class DispatcherStatsResponse(BaseModel):
+    active: int
+    queued: int
+    max_concurrency: int
+    max_queue: int
+    admitted: int
+    rejected: int
+    timed_out: int
+    wait_p50_seconds: Optional[float]
+    wait_p95_seconds: Optional[float]
+
+    @classmethod
+    def from_stats(cls, stats: DispatcherStats) -> "DispatcherStatsResponse":
+        return cls(
+            active=stats.active, queued=stats.queued, max_concurrency=stats.max_concurrency,
+            max_queue=stats.max_queue, admitted=stats.admitted, rejected=stats.rejected,
+            timed_out=stats.timed_out, wait_p50_seconds=stats.wait_p50,
+            wait_p95_seconds=stats.wait_p95
+        )
+
+
+class LLMUsageStatsResponse(BaseModel):
+    calls: int
+    estimated_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    latency_p50_seconds: Optional[float]
+    latency_p95_seconds: Optional[float]
+
+    @classmethod
+    def from_stats(cls, stats: LLMUsageStats) -> "LLMUsageStatsResponse":
+        return cls(
+            calls=stats.calls, estimated_calls=stats.estimated_calls,
+            prompt_tokens=stats.prompt_tokens, completion_tokens=stats.completion_tokens,
+            latency_p50_seconds=stats.latency_p50, latency_p95_seconds=stats.latency_p95
+        )
+
+
+class RecommendationStatsResponse(BaseModel):
+    cache: CacheStatsResponse
+    llm_dispatcher: DispatcherStatsResponse
+    sources: dict[RecommendationSourceEnum, int]
+    llm_usage: dict[RequestTypeEnum, LLMUsageStatsResponse]
+    # Requests sent to a faster model than their tier's, per tier:
+    model_downgrades: dict[ModelTierEnum, int]
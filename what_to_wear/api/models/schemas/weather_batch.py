@@ -0,0 +1,28 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field, SerializeAsAny
+
+from what_to_wear.api.models.schemas.json_cached_model import JSONCachedModel
+from what_to_wear.api.models.schemas.weather_request_params import ForecastWeatherRequestParams
+from what_to_wear.api.utils.constants import WEATHER_BATCH_MAX_ITEMS, RequestTypeEnum
+
+
+class WeatherBatchItem(ForecastWeatherRequestParams):
+    type: RequestTypeEnum = Field(
+        RequestTypeEnum.CURRENT, description="CURRENT or FORECAST weather."
+    )
+
+
+class WeatherBatchRequest(BaseModel):
+    items: list[WeatherBatchItem] = Field(..., min_length=1, max_length=WEATHER_BATCH_MAX_ITEMS)
+
+
+class WeatherBatchResult(BaseModel):
+    index: int
+    status_code: int
+    data: Optional[SerializeAsAny[JSONCachedModel]] = None
+    error: Optional[str] = None
+
+
+class WeatherBatchResponse(BaseModel):
+    results: list[WeatherBatchResult]
@@ -0,0 +1,40 @@
+from typing import Optional
+
+from pydantic import Field, SerializeAsAny
+
+from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.models.schemas.json_cached_model import JSONCachedModel
+from what_to_wear.api.models.schemas.recommendation_job import RecommendationJobResponse
+from what_to_wear.api.models.schemas.weather_request_params import ForecastWeatherRequestParams
+from what_to_wear.api.utils.constants import RecommendationDeliveryEnum, RecommendationModeEnum
+
+
+class ForecastRecommendationParams(ForecastWeatherRequestParams):
+    mode: RecommendationModeEnum = Field(
+        RecommendationModeEnum.LLM, description="'fast' for rule-based advice."
+    )
+    delivery: RecommendationDeliveryEnum = Field(
+        RecommendationDeliveryEnum.INLINE,
+        description="'deferred' to poll a recommendation job, 'stream' for Server-Sent Events."
+    )
+    include_hours: bool = Field(False, description="Include the hourly forecast of each day.")
+
+
+class ForecastRecommendationResponse(JSONCachedModel):
+    """
+    A forecast with its recommendation, or with the job computing it when deferred. The forecast
+    keeps its own cached encoding, so only the recommendation part is serialized per response.
+    """
+    JSON_PROJECTIONS = ForecastWeatherResponse.JSON_PROJECTIONS
+
+    weather: SerializeAsAny[ForecastWeatherResponse]
+    recommendation: Optional[str] = None
+    job: Optional[RecommendationJobResponse] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self.weather.is_stale
+
+    def to_json_bytes(self, projection: str = "full") -> bytes:
+        rest = self.model_dump_json(exclude={"weather"}).encode()
+        return b'{"weather":' + self.weather.to_json_bytes(projection) + b"," + rest[1:]
@@ -12,6 +12,8 @@ class WeatherRequestParams(BaseModel):
     @model_validator(mode="before")
     @classmethod
     def check_required_params(cls, values):
+        if not isinstance(values, dict):
+            return values  # Not an object, e.g. in a JSON body: left for pydantic to reject
         lat, lon, city = values.get("lat"), values.get("lon"), values.get("city")
 
         if (lat is None or lon is None) and not city:
@@ -1,29 +1,91 @@
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, Union
+from typing import Annotated, Optional, Union
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
-from sqlmodel import Session, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, col, delete, select
 
-from what_to_wear.api.database.db import get_session
+from what_to_wear.api.database.db import engine, get_session, utc_now
+from what_to_wear.api.models.db_models.revoked_token import RevokedToken
 from what_to_wear.api.models.db_models.user import User
-from what_to_wear.api.models.schemas.jwt import TokenData
-from what_to_wear.api.utils.constants import ALGORITHM, SECRET_KEY
-
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+from what_to_wear.api.utils.cache import TTLCache
+from what_to_wear.api.utils.constants import (
+    ALGORITHM,
+    AUTH_STATELESS,
+    AUTH_TOKEN_CACHE_MAX_SIZE,
+    AUTH_TOKEN_CACHE_TTL_SECONDS,
+    AUTH_USER_CACHE_MAX_SIZE,
+    AUTH_USER_CACHE_TTL_SECONDS,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    SECRET_KEY,
+)
+
+logger = logging.getLogger(__name__)
+
+# Hashes outside the configured cost need an update:
+pwd_context = CryptContext(
+    schemes=['bcrypt'], deprecated='auto',
+    bcrypt__rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='token')
 
+# bcrypt is CPU bound and releases the GIL, so it runs here rather than on the event loop:
+password_hasher = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+
+# Username -> detached copy of the user:
+user_cache: TTLCache[User] = TTLCache(AUTH_USER_CACHE_MAX_SIZE, AUTH_USER_CACHE_TTL_SECONDS)
+# SHA-256 of a verified token -> its claims, until the token expires or the cache TTL is over:
+token_cache: TTLCache[dict] = TTLCache(AUTH_TOKEN_CACHE_MAX_SIZE, AUTH_TOKEN_CACHE_TTL_SECONDS)
+
+
+class RevokedTokens:
+    """
+    Ids of tokens known to this process as logged out, each kept until the token would have
+    expired anyway. The RevokedToken table holds them for all processes
+    """
+
+    def __init__(self):
+        self._expires_at: dict[str, float] = {}
+
+    def __contains__(self, token_id: str) -> bool:
+        return token_id in self._expires_at
+
+    def __len__(self) -> int:
+        return len(self._expires_at)
+
+    def add(self, token_id: str, expires_at: float) -> None:
+        now = time.time()
+        self._expires_at = {key: expiry for key, expiry in self._expires_at.items() if expiry > now}
+        self._expires_at[token_id] = expires_at
+
+    def clear(self) -> None:
+        self._expires_at.clear()
+
+
+revoked_tokens = RevokedTokens()
+
 
 async def create_user(username: str, password: str, session: Session):
     """Creates a new user with a hashed password."""
-    hashed_password = get_password_hash(password)
+    hashed_password = await hash_password(password)
     user = User(username=username, hashed_password=hashed_password)
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_user(username)
 
 
 def verify_password(raw_password: str, hashed_password: str) -> bool:
@@ -36,6 +98,22 @@ def get_password_hash(raw_password: str) -> str:
     return pwd_context.hash(raw_password)
 
 
+async def hash_password(raw_password: str) -> str:
+    """Hashes a password in the password hashing pool."""
+    return await asyncio.get_running_loop().run_in_executor(
+        password_hasher, get_password_hash, raw_password
+    )
+
+
+async def verify_and_update_password(
+    raw_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Verifies a password in the hashing pool, plus a new hash if the stored one is outdated."""
+    return await asyncio.get_running_loop().run_in_executor(
+        password_hasher, pwd_context.verify_and_update, raw_password, hashed_password
+    )
+
+
 def get_user_by_username(username: str, session: Session) -> User:
     """Retrieves a user by their username from the database."""
     statement = select(User).where(User.username == username)
@@ -43,19 +121,43 @@ def get_user_by_username(username: str, session: Session) -> User:
     return user
 
 
-def authenticate_user(username: str, password: str, session: Session) -> Union[User, bool]:
-    """Authenticates a user by verifying their credentials."""
+async def authenticate_user(username: str, password: str, session: Session) -> Union[User, bool]:
+    """Authenticates a user by their credentials, rehashing the password if its cost changed."""
     user = get_user_by_username(username, session)
-    if not user or not verify_password(password, user.hashed_password):
+    if not user:
+        return False
+    verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        session.commit()
+        invalidate_user(username)
+    return user
+
+
+def get_cached_user(username: str, session: Session) -> Optional[User]:
+    """Retrieves a user through the user cache. Unknown users are not cached."""
+    user = user_cache.get(username)
+    if user is None:
+        user = get_user_by_username(username, session)
+        if user is not None:
+            user = User(**user.model_dump())
+            user_cache.set(username, user)
     return user
 
 
+def invalidate_user(username: str) -> None:
+    """Drops the cached user, after it was created or changed."""
+    user_cache.pop(username)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Creates a JWT access token with an optional expiration time."""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -69,15 +171,71 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except InvalidTokenError:
+    claims = decode_token(token)
+    if claims is None:
         raise credentials_exception
-    user: User = get_user_by_username(token_data.username, session)
+    if AUTH_STATELESS:
+        return User(username=claims["sub"], hashed_password="")
+    user = get_cached_user(claims["sub"], session)
     if user is None:
         raise credentials_exception
     return user
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """
+    Claims of a valid, unrevoked token with a subject, else None. Verified tokens are cached, and
+    checked against the stored revocations when they are not.
+    """
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    claims = token_cache.get(token_hash)
+    if claims is None:
+        try:
+            claims = jwt.decode(
+                token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]}
+            )
+        except InvalidTokenError:
+            return None
+        token_id = claims.get("jti", token_hash)
+        if is_revoked_in_store(token_id):
+            revoked_tokens.add(token_id, claims["exp"])
+        ttl = min(claims["exp"] - time.time(), AUTH_TOKEN_CACHE_TTL_SECONDS)
+        token_cache.set(token_hash, claims, ttl=ttl)
+    if claims.get("jti", token_hash) in revoked_tokens:
+        return None
+    return claims
+
+
+def revoke_token(token: str) -> None:
+    """
+    Rejects the token from now on. Other processes reject it once it leaves their token cache.
+    Tokens without an id are revoked by hash.
+    """
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    claims = decode_token(token)
+    if claims is not None:
+        token_id = claims.get("jti", token_hash)
+        revoked_tokens.add(token_id, claims["exp"])
+        store_revoked_token(token_id, claims["exp"])
+        token_cache.pop(token_hash)
+
+
+def store_revoked_token(token_id: str, expires_at: float) -> None:
+    """Stores the revocation until the token expires, dropping the expired ones."""
+    revoked = RevokedToken(
+        token_id=token_id, expires_at=datetime.fromtimestamp(expires_at, timezone.utc)
+    )
+    with Session(engine) as session:
+        session.exec(delete(RevokedToken).where(col(RevokedToken.expires_at) <= utc_now()))
+        session.merge(revoked)
+        session.commit()
+
+
+def is_revoked_in_store(token_id: str) -> bool:
+    """Whether the token was revoked by any process. Database failures count as not revoked."""
+    try:
+        with Session(engine) as session:
+            return session.get(RevokedToken, token_id) is not None
+    except SQLAlchemyError as e:
+        logger.warning("Reading token revocations failed: %r", e)
+        return False
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from http import HTTPStatus
+
+from fastapi import HTTPException
+
+from what_to_wear.api.models.schemas.current_weather import Location
+from what_to_wear.api.utils.cache import TTLCache
+from what_to_wear.api.utils.constants import (
+    LOCATION_ALIAS_MAX_SIZE,
+    LOCATION_ALIAS_TTL_SECONDS,
+    LOCATION_NOT_FOUND_TTL_SECONDS,
+)
+
+NOT_FOUND_STATUS_CODES = (HTTPStatus.NOT_FOUND, HTTPStatus.BAD_REQUEST)
+
+
+@dataclass(frozen=True)
+class CanonicalLocation:
+    key: str
+    q_param: str
+
+
+# Normalized user input -> canonical location, learned from WeatherAPI responses:
+location_aliases: TTLCache[CanonicalLocation] = TTLCache(
+    LOCATION_ALIAS_MAX_SIZE, LOCATION_ALIAS_TTL_SECONDS
+)
+# Normalized user input -> (status code, detail) of a recent "not found" answer:
+unknown_locations: TTLCache[tuple[int, str]] = TTLCache(
+    LOCATION_ALIAS_MAX_SIZE, LOCATION_NOT_FOUND_TTL_SECONDS
+)
+
+
+def get_location_key(q_param: str) -> str:
+    """ Normalizes a 'q' parameter so that differently typed spellings of it share a cache entry """
+    return " ".join(q_param.lower().split())
+
+
+def get_canonical_location(location: Location) -> CanonicalLocation:
+    key = get_location_key(f"{location.name}|{location.region}|{location.country}")
+    return CanonicalLocation(key=key, q_param=f"{location.lat},{location.lon}")
+
+
+def resolve_location(q_param: str) -> CanonicalLocation:
+    """
+    Maps a user supplied 'q' parameter to the canonical location it resolved to before, so that
+    e.g. "berlin", "Berlin" and "Berlin, Germany" share cache entries. Unknown inputs resolve to
+    their normalized form. Recently unknown places fail fast with the cached upstream error.
+    """
+    alias = get_location_key(q_param)
+
+    not_found = unknown_locations.get(alias)
+    if not_found is not None:
+        status_code, detail = not_found
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    canonical = location_aliases.get(alias)
+    if canonical is not None:
+        return canonical
+    return CanonicalLocation(key=alias, q_param=q_param)
+
+
+def record_location(q_param: str, location: Location) -> CanonicalLocation:
+    canonical = get_canonical_location(location)
+    location_aliases.set(get_location_key(q_param), canonical)
+    return canonical
+
+
+def record_unknown_location(q_param: str, error: HTTPException) -> None:
+    if error.status_code in NOT_FOUND_STATUS_CODES:
+        unknown_locations.set(get_location_key(q_param), (error.status_code, error.detail))
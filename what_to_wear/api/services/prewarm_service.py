@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+
+from fastapi import HTTPException
+
+from what_to_wear.api.services.recommendation_service import get_llm_recommendation
+from what_to_wear.api.services.weather_service import (
+    get_canonical_request,
+    popular_weather_requests,
+    refresh_weather,
+    weather_cache,
+)
+from what_to_wear.api.utils.background import background_tasks
+from what_to_wear.api.utils.constants import (
+    WEATHER_PREWARM_INTERVAL_SECONDS,
+    WEATHER_PREWARM_MAX_RATE,
+    WEATHER_PREWARM_RECOMMENDATIONS,
+    WEATHER_PREWARM_TOP_N,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def prewarm_popular_weather() -> int:
+    """
+    Refreshes the cache entries of the WEATHER_PREWARM_TOP_N most requested locations that are
+    missing or would expire before the next run, at most WEATHER_PREWARM_MAX_RATE per second.
+    Returns the number of entries refreshed; failed refreshes count towards the rate only.
+    """
+    refresh_before = time.monotonic() + WEATHER_PREWARM_INTERVAL_SECONDS
+    seen = set()
+    attempted = 0
+    refreshed = 0
+
+    for popular_request, _ in popular_weather_requests.top(WEATHER_PREWARM_TOP_N):
+        try:
+            request = get_canonical_request(popular_request)
+        except HTTPException:
+            continue
+        entry = weather_cache.peek(request.cache_key)
+        if request.cache_key in seen or (entry is not None and entry.expires_at > refresh_before):
+            continue
+        seen.add(request.cache_key)
+
+        if attempted:
+            await asyncio.sleep(1 / WEATHER_PREWARM_MAX_RATE)
+        attempted += 1
+        try:
+            weather_data = await refresh_weather(request)
+            if WEATHER_PREWARM_RECOMMENDATIONS:
+                await get_llm_recommendation(weather_data, request.cache_key[0])
+        except HTTPException as e:
+            logger.warning("Pre-warming %s failed: %s", request.cache_key, e.detail)
+            continue
+        refreshed += 1
+
+    return refreshed
+
+
+async def run_prewarm_scheduler() -> None:
+    """ Pre-warms every WEATHER_PREWARM_INTERVAL_SECONDS. Older traffic weighs less on every run """
+    while True:
+        try:
+            await prewarm_popular_weather()
+        except Exception:
+            logger.exception("Weather pre-warming run failed")
+        popular_weather_requests.decay()
+        await asyncio.sleep(WEATHER_PREWARM_INTERVAL_SECONDS)
+
+
+def start_prewarm_scheduler() -> bool:
+    """ Spawns the scheduler as a background task. Returns False if the supervisor is not up """
+    return background_tasks.spawn("weather_prewarm", run_prewarm_scheduler)
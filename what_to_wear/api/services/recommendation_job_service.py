@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+from datetime import timedelta
+from functools import partial
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlmodel import Session, col, delete, select, update
+
+from what_to_wear.api.database.db import engine, utc_now
+from what_to_wear.api.models.db_models.recommendation_job import RecommendationJob
+from what_to_wear.api.models.schemas.recommendation_job import RecommendationJobRequest
+from what_to_wear.api.services.recommendation_service import get_recommendation
+from what_to_wear.api.services.weather_service import (
+    get_current_weather_data,
+    get_forecast_weather_data,
+)
+from what_to_wear.api.utils.background import background_tasks
+from what_to_wear.api.utils.constants import (
+    RECOMMENDATION_JOB_PURGE_INTERVAL_SECONDS,
+    RECOMMENDATION_JOB_QUEUE_SIZE,
+    RECOMMENDATION_JOB_RETENTION_SECONDS,
+    RECOMMENDATION_JOB_STALE_SECONDS,
+    RECOMMENDATION_JOB_WORKERS,
+    RECOMMENDATION_LLM_BUDGET_SECONDS,
+    JobStatusEnum,
+    RequestTypeEnum,
+)
+from what_to_wear.api.utils.resilience import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """
+    Queue of the ids of jobs waiting for a worker. The queue is created when the workers start,
+    in the event loop they run on; until then jobs are only stored, and queued once they start.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.durations = LatencyTracker(min_samples=1)
+        self._queue: Optional[asyncio.Queue[str]] = None
+
+    @property
+    def full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def submit(self, job_id: str) -> bool:
+        if self._queue is None or self._queue.full():
+            return False
+        self._queue.put_nowait(job_id)
+        return True
+
+    @property
+    def retry_after(self) -> float:
+        """
+        Seconds until the queue has room again: each worker takes its next job after about the
+        median job duration. The recommendation budget stands in for it until jobs have run
+        """
+        return self.durations.percentile(50) or RECOMMENDATION_LLM_BUDGET_SECONDS
+
+    def start(self, workers: int) -> None:
+        self._queue = asyncio.Queue(self.size)
+        for index in range(workers):
+            background_tasks.spawn(
+                ("recommendation_job_worker", index), partial(run_job_worker, self._queue)
+            )
+
+    def stop(self) -> None:
+        """ Detaches the queue. The workers are cancelled along with the other background tasks """
+        self._queue = None
+
+
+job_workers = JobWorkerPool(RECOMMENDATION_JOB_QUEUE_SIZE)
+
+
+def create_job(
+    request: RecommendationJobRequest, username: str, session: Session
+) -> RecommendationJob:
+    """
+    Stores a new pending job and queues it for the workers. Raises 503 when the queue is full.
+    Jobs created while the workers are not running are queued once they start
+    """
+    if job_workers.full:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Too many recommendation jobs queued",
+            headers={"Retry-After": str(math.ceil(job_workers.retry_after))}
+        )
+
+    now = utc_now()
+    job = RecommendationJob(
+        id=uuid.uuid4().hex, username=username, type=request.type, mode=request.mode,
+        lat=request.lat, lon=request.lon, city=request.city, days=request.days, created_at=now,
+        expires_at=now + timedelta(seconds=RECOMMENDATION_JOB_RETENTION_SECONDS)
+    )
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    job_workers.submit(job.id)
+    return job
+
+
+def get_job(job_id: str, username: str, session: Session) -> Optional[RecommendationJob]:
+    """ The job, unless it expired or belongs to another user """
+    return session.exec(
+        select(RecommendationJob)
+        .where(RecommendationJob.id == job_id)
+        .where(RecommendationJob.username == username)
+        .where(col(RecommendationJob.expires_at) > utc_now())
+    ).first()
+
+
+async def run_job(job_id: str) -> None:
+    """
+    Fetches the weather and the recommendation of a job, storing the outcome on it. No database
+    session is held meanwhile. Jobs already claimed, e.g. by another process, are skipped
+    """
+    job = await asyncio.to_thread(claim_job, job_id)
+    if job is None:
+        return
+
+    try:
+        result = await _get_job_recommendation(job)
+        outcome = {"status": JobStatusEnum.DONE, "status_code": HTTPStatus.OK, "result": result}
+    except HTTPException as e:
+        outcome = {
+            "status": JobStatusEnum.FAILED, "status_code": e.status_code, "error": str(e.detail)
+        }
+    except Exception as e:
+        logger.exception("Recommendation job %s failed", job_id)
+        outcome = {
+            "status": JobStatusEnum.FAILED, "status_code": HTTPStatus.INTERNAL_SERVER_ERROR,
+            "error": str(e),
+        }
+    await asyncio.to_thread(finish_job, job_id, outcome)
+
+
+def claim_job(job_id: str) -> Optional[RecommendationJob]:
+    """
+    Marks a pending job as running and returns it. The check and the update are a single statement,
+    so only one worker, in any process, gets the job. Returns None if it is not pending
+    """
+    with Session(engine) as session:
+        claimed = session.exec(
+            update(RecommendationJob)
+            .where(col(RecommendationJob.id) == job_id)
+            .where(col(RecommendationJob.status) == JobStatusEnum.PENDING)
+            .values(status=JobStatusEnum.RUNNING, started_at=utc_now())
+        ).rowcount
+        session.commit()
+        return session.get(RecommendationJob, job_id) if claimed else None
+
+
+def finish_job(job_id: str, outcome: dict) -> None:
+    with Session(engine) as session:
+        session.exec(
+            update(RecommendationJob)
+            .where(col(RecommendationJob.id) == job_id)
+            .values(finished_at=utc_now(), **outcome)
+        )
+        session.commit()
+
+
+async def _get_job_recommendation(job: RecommendationJob) -> str:
+    if job.type == RequestTypeEnum.CURRENT:
+        weather_data = await get_current_weather_data(job.lat, job.lon, job.city)
+    else:
+        weather_data = await get_forecast_weather_data(job.lat, job.lon, job.city, job.days)
+    return await get_recommendation(weather_data, job.type, job.mode)
+
+
+async def run_job_worker(queue: asyncio.Queue[str]) -> None:
+    while True:
+        job_id = await queue.get()
+        started = time.monotonic()
+        try:
+            await run_job(job_id)
+        except Exception:
+            logger.exception("Recommendation job worker failed on job %s", job_id)
+        finally:
+            job_workers.durations.record(time.monotonic() - started)
+            queue.task_done()
+
+
+def purge_expired_jobs() -> int:
+    """ Deletes the jobs past their retention window. Returns how many were deleted """
+    with Session(engine) as session:
+        result = session.exec(
+            delete(RecommendationJob).where(col(RecommendationJob.expires_at) <= utc_now())
+        )
+        session.commit()
+        return result.rowcount
+
+
+async def run_job_purger() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(purge_expired_jobs)
+        except Exception:
+            logger.exception("Purging expired recommendation jobs failed")
+        await asyncio.sleep(RECOMMENDATION_JOB_PURGE_INTERVAL_SECONDS)
+
+
+def requeue_unfinished_jobs() -> None:
+    """
+    Queues the pending jobs, e.g. accepted before the workers (re)started. Jobs running for longer
+    than RECOMMENDATION_JOB_STALE_SECONDS are made pending again first. Several processes may
+    queue the same job: claim_job() lets only one of them run it
+    """
+    now = utc_now()
+    stale_before = now - timedelta(seconds=RECOMMENDATION_JOB_STALE_SECONDS)
+    with Session(engine) as session:
+        session.exec(
+            update(RecommendationJob)
+            .where(col(RecommendationJob.status) == JobStatusEnum.RUNNING)
+            .where(col(RecommendationJob.started_at) < stale_before)
+            .values(status=JobStatusEnum.PENDING)
+        )
+        session.commit()
+        pending = session.exec(
+            select(RecommendationJob.id)
+            .where(col(RecommendationJob.status) == JobStatusEnum.PENDING)
+            .where(col(RecommendationJob.expires_at) > now)
+            .order_by(col(RecommendationJob.created_at))
+        ).all()
+
+    for job_id in pending:
+        if not job_workers.submit(job_id):
+            break
+
+
+def start_job_workers() -> None:
+    """ Starts the job workers and the retention purge in the background, from the app lifespan """
+    job_workers.start(RECOMMENDATION_JOB_WORKERS)
+    requeue_unfinished_jobs()
+    background_tasks.spawn("recommendation_job_purger", run_job_purger)
+
+
+def stop_job_workers() -> None:
+    job_workers.stop()
@@ -1,53 +1,505 @@
-from typing import Union
+import asyncio
+import logging
+import math
+import time
+from collections import Counter
+from functools import partial
+from typing import AsyncIterator, Optional, Union
 
 import httpx
 from fastapi import HTTPException
 
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
-from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import DayForecast, ForecastWeatherResponse
+from what_to_wear.api.services.recommendation_store_service import (
+    get_stored_recommendation,
+    store_recommendation,
+)
+from what_to_wear.api.services.rule_recommendation_service import get_rule_recommendation
+from what_to_wear.api.utils.cache import TTLCache
 from what_to_wear.api.utils.constants import (
-    HEADERS,
-    LLM_API_URL,
-    MODEL_TYPE,
+    LLM_LATENCY_MAX_AGE_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_QUEUE,
+    LLM_PRIORITIES,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_ROUTING_POLICY,
+    LLM_TIER_FALLBACK_QUEUE_RATIO,
+    MODEL_TIER_POLICY,
+    MODEL_TIERS,
+    RECOMMENDATION_CACHE_ENABLED,
+    RECOMMENDATION_CACHE_MAX_SIZE,
+    RECOMMENDATION_CACHE_TTL_SECONDS,
+    RECOMMENDATION_FALLBACK_ENABLED,
+    RECOMMENDATION_FORECAST_MODE,
+    RECOMMENDATION_HUMIDITY_BUCKET,
+    RECOMMENDATION_LLM_BUDGET_SECONDS,
+    RECOMMENDATION_PRECIP_BUCKET,
+    RECOMMENDATION_RAIN_CHANCE_BUCKET,
+    RECOMMENDATION_STORE_ENABLED,
+    RECOMMENDATION_TEMP_BUCKET,
+    RECOMMENDATION_UV_BUCKET,
+    RECOMMENDATION_WIND_BUCKET,
+    ForecastRecommendationModeEnum,
     ModelTypeEnum,
+    QueueFullException,
+    QueueTimeoutException,
+    RecommendationModeEnum,
+    RecommendationSourceEnum,
     RequestTypeEnum,
 )
-from what_to_wear.api.utils.llm_utils import get_content_from_llm_response, get_model_params
+from what_to_wear.api.utils.dispatcher import Dispatcher
+from what_to_wear.api.utils.http_clients import UpstreamEnum, use_http_client
+from what_to_wear.api.utils.llm_providers import LLMProvider, llm_providers
+from what_to_wear.api.utils.llm_usage import LLMUsageTracker
+from what_to_wear.api.utils.llm_utils import (
+    LLMCompletion,
+    get_completion_from_llm_response,
+    get_content_from_llm_stream,
+)
+from what_to_wear.api.utils.model_tiers import ModelSelector, ModelTier
+from what_to_wear.api.utils.resilience import hedge
+from what_to_wear.api.utils.single_flight import SingleFlight
 from what_to_wear.api.utils.utils import (
+    estimate_tokens,
     generate_clothes_recommendation_prompt_current_weather,
     generate_clothes_recommendation_prompt_forecast,
+    generate_clothes_recommendation_prompt_forecast_day,
+)
+
+logger = logging.getLogger(__name__)
+
+llm_requests = SingleFlight()
+llm_dispatcher = Dispatcher(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_SECONDS)
+
+# Recommendations for similar weather, i.e. the same feature buckets, are shared:
+recommendation_cache: TTLCache[str] = TTLCache(
+    RECOMMENDATION_CACHE_MAX_SIZE, RECOMMENDATION_CACHE_TTL_SECONDS
 )
+recommendation_requests = SingleFlight()
+
+# How recommendations were served:
+recommendation_sources: Counter[RecommendationSourceEnum] = Counter()
+# Tokens and latency of the LLM calls, per request type:
+llm_usage = LLMUsageTracker()
+model_selector = ModelSelector(
+    [ModelTier(name, model_type, slo) for name, (model_type, slo) in MODEL_TIERS.items()],
+    MODEL_TIER_POLICY, LLM_TIER_FALLBACK_QUEUE_RATIO, LLM_LATENCY_MAX_AGE_SECONDS
+)
+
+
+def bucket(value: float, size: float) -> int:
+    return math.floor(value / size)
+
+
+def get_current_recommendation_key(weather_data: CurrentWeatherResponse) -> tuple:
+    """ Cache key from the bucketed features the current weather prompt depends on """
+    current = weather_data.current
+    return (
+        RequestTypeEnum.CURRENT,
+        bucket(current.temp_c, RECOMMENDATION_TEMP_BUCKET),
+        bucket(current.feelslike_c, RECOMMENDATION_TEMP_BUCKET),
+        bucket(current.humidity, RECOMMENDATION_HUMIDITY_BUCKET),
+        bucket(current.wind_kph, RECOMMENDATION_WIND_BUCKET),
+        bucket(current.precip_mm, RECOMMENDATION_PRECIP_BUCKET),
+        bool(current.is_day),
+    )
+
+
+def get_day_recommendation_key(daily_data: DayForecast) -> tuple:
+    """ Cache key from the bucketed features of one forecasted day """
+    return (
+        bucket(daily_data.avgtemp_c, RECOMMENDATION_TEMP_BUCKET),
+        bucket(daily_data.maxtemp_c, RECOMMENDATION_TEMP_BUCKET),
+        bucket(daily_data.mintemp_c, RECOMMENDATION_TEMP_BUCKET),
+        bucket(daily_data.avghumidity, RECOMMENDATION_HUMIDITY_BUCKET),
+        bucket(daily_data.totalprecip_mm, RECOMMENDATION_PRECIP_BUCKET),
+        bucket(daily_data.daily_chance_of_rain, RECOMMENDATION_RAIN_CHANCE_BUCKET),
+        bucket(daily_data.uv, RECOMMENDATION_UV_BUCKET),
+    )
+
+
+def get_forecast_recommendation_key(weather_data: ForecastWeatherResponse) -> tuple:
+    """
+    Cache key from the bucketed features of each forecasted day. Dates are kept, as answers
+    mention them
+    """
+    return (RequestTypeEnum.FORECAST, *(
+        (forecast_day.date, *get_day_recommendation_key(forecast_day.day))
+        for forecast_day in weather_data.forecast.forecastday
+    ))
+
+
+async def get_recommendation(
+    weather_data: Union[CurrentWeatherResponse, ForecastWeatherResponse],
+    type: RequestTypeEnum,
+    mode: RecommendationModeEnum = RecommendationModeEnum.LLM
+) -> str:
+    """
+    Rule-based recommendation in FAST mode. Otherwise the LLM one, falling back to the rules when
+    the LLM fails or exceeds RECOMMENDATION_LLM_BUDGET_SECONDS. A late LLM answer is still cached
+    """
+    if mode == RecommendationModeEnum.FAST:
+        recommendation_sources[RecommendationSourceEnum.RULES] += 1
+        return get_rule_recommendation(weather_data, type)
+    if not RECOMMENDATION_FALLBACK_ENABLED:
+        recommendation_sources[RecommendationSourceEnum.LLM] += 1
+        return await get_llm_recommendation(weather_data, type)
+
+    llm_recommendation = asyncio.ensure_future(get_llm_recommendation(weather_data, type))
+    try:
+        recommendation = await asyncio.wait_for(
+            asyncio.shield(llm_recommendation), RECOMMENDATION_LLM_BUDGET_SECONDS
+        )
+    except (TimeoutError, HTTPException) as e:
+        llm_recommendation.add_done_callback(_log_late_failure)
+        logger.warning("Falling back to rule-based recommendation: %r", e)
+        recommendation_sources[RecommendationSourceEnum.FALLBACK] += 1
+        return get_rule_recommendation(weather_data, type)
+
+    recommendation_sources[RecommendationSourceEnum.LLM] += 1
+    return recommendation
+
+
+async def stream_recommendation(
+    weather_data: Union[CurrentWeatherResponse, ForecastWeatherResponse],
+    type: RequestTypeEnum,
+    mode: RecommendationModeEnum = RecommendationModeEnum.LLM
+) -> AsyncIterator[str]:
+    """
+    Streaming get_recommendation(). Falls back if the first chunk fails or comes too late. Without
+    the fallback, the LLM stream is passed on as is, with no budget
+    """
+    if mode == RecommendationModeEnum.FAST:
+        recommendation_sources[RecommendationSourceEnum.RULES] += 1
+        yield get_rule_recommendation(weather_data, type)
+        return
+
+    chunks = stream_llm_recommendation(weather_data, type)
+    if not RECOMMENDATION_FALLBACK_ENABLED:
+        recommendation_sources[RecommendationSourceEnum.LLM] += 1
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    try:
+        first_chunk = await asyncio.wait_for(anext(chunks, None), RECOMMENDATION_LLM_BUDGET_SECONDS)
+    except (TimeoutError, HTTPException) as e:
+        await chunks.aclose()
+        logger.warning("Falling back to rule-based recommendation: %r", e)
+        recommendation_sources[RecommendationSourceEnum.FALLBACK] += 1
+        yield get_rule_recommendation(weather_data, type)
+        return
+
+    recommendation_sources[RecommendationSourceEnum.LLM] += 1
+    if first_chunk is not None:
+        yield first_chunk
+    async for chunk in chunks:
+        yield chunk
+
+
+def _log_late_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("LLM recommendation failed after falling back: %r", task.exception())
 
 
 async def get_llm_recommendation(
     weather_data: Union[CurrentWeatherResponse, ForecastWeatherResponse],
     type: RequestTypeEnum
 ) -> str:
+    if (
+        type == RequestTypeEnum.FORECAST
+        and RECOMMENDATION_FORECAST_MODE == ForecastRecommendationModeEnum.PER_DAY
+    ):
+        day_recommendations = _start_day_recommendations(weather_data)
+        try:
+            return "\n".join(
+                [f"{date}: {await recommendation}" for date, recommendation in day_recommendations]
+            )
+        finally:
+            _cancel_pending(day_recommendations)
+
+    prompt, cache_key = _get_prompt_and_cache_key(weather_data, type)
+    return await _get_cached_recommendation(cache_key, prompt, type)
+
+
+async def stream_llm_recommendation(
+    weather_data: Union[CurrentWeatherResponse, ForecastWeatherResponse],
+    type: RequestTypeEnum
+) -> AsyncIterator[str]:
+    """
+    Yields the recommendation as the LLM generates it. Cached recommendations come as a single
+    chunk, per-day forecast recommendations one day at a time
+    """
+    if (
+        type == RequestTypeEnum.FORECAST
+        and RECOMMENDATION_FORECAST_MODE == ForecastRecommendationModeEnum.PER_DAY
+    ):
+        day_recommendations = _start_day_recommendations(weather_data)
+        try:
+            separator = ""
+            for date, recommendation in day_recommendations:
+                yield f"{separator}{date}: {await recommendation}"
+                separator = "\n"
+        finally:
+            _cancel_pending(day_recommendations)
+        return
+
+    prompt, cache_key = _get_prompt_and_cache_key(weather_data, type)
+    recommendation = _get_in_memory(cache_key)
+    if recommendation is None:
+        recommendation = await _get_stored(cache_key)
+    if recommendation is not None:
+        yield recommendation
+        return
+
+    chunks = []
+    model_type = select_model(type, prompt)
+    async for chunk in query_llm_stream(prompt, model_type, type):
+        chunks.append(chunk)
+        yield chunk
+    await _cache(cache_key, "".join(chunks), model_type)
+
+
+def _get_prompt_and_cache_key(
+    weather_data: Union[CurrentWeatherResponse, ForecastWeatherResponse],
+    type: RequestTypeEnum
+) -> tuple[str, tuple]:
+    """ Recommendations are cached under the preferred model, even when a faster one answered """
     if type == RequestTypeEnum.CURRENT:
         weather_data: CurrentWeatherResponse
         prompt = generate_clothes_recommendation_prompt_current_weather(weather_data)
+        key = get_current_recommendation_key(weather_data)
     else:
         weather_data: ForecastWeatherResponse
         prompt = generate_clothes_recommendation_prompt_forecast(weather_data)
+        key = get_forecast_recommendation_key(weather_data)
+    return prompt, (get_preferred_model(type, prompt), *key)
+
+
+def _start_day_recommendations(
+    weather_data: ForecastWeatherResponse
+) -> list[tuple[str, asyncio.Task]]:
+    """
+    Starts fetching one recommendation per forecasted day, concurrently. Days with the same
+    bucketed conditions share a single recommendation. Returns (date, task) pairs in day order
+    """
+    tasks: dict[tuple, asyncio.Task] = {}
+    day_recommendations = []
+    for forecast_day in weather_data.forecast.forecastday:
+        prompt = generate_clothes_recommendation_prompt_forecast_day(forecast_day.day)
+        cache_key = (
+            get_preferred_model(RequestTypeEnum.FORECAST, prompt), RequestTypeEnum.FORECAST,
+            *get_day_recommendation_key(forecast_day.day)
+        )
+        if cache_key not in tasks:
+            tasks[cache_key] = asyncio.ensure_future(
+                _get_cached_recommendation(cache_key, prompt, RequestTypeEnum.FORECAST)
+            )
+        day_recommendations.append((forecast_day.date, tasks[cache_key]))
+    return day_recommendations
+
+
+def _cancel_pending(day_recommendations: list[tuple[str, asyncio.Task]]) -> None:
+    for _, task in day_recommendations:
+        if task.done():
+            if not task.cancelled():
+                # Retrieved, so failures of days we did not wait for are not logged as lost
+                task.exception()
+        else:
+            task.cancel()
+
+
+async def _get_cached_recommendation(cache_key: tuple, prompt: str, type: RequestTypeEnum) -> str:
+    if not RECOMMENDATION_CACHE_ENABLED and not RECOMMENDATION_STORE_ENABLED:
+        return await query_llm(prompt, select_model(type, prompt), type)
+
+    recommendation = _get_in_memory(cache_key)
+    if recommendation is None:
+        recommendation = await recommendation_requests.do(
+            cache_key, lambda: _query_and_cache(cache_key, prompt, type)
+        )
+    return recommendation
+
+
+async def _query_and_cache(cache_key: tuple, prompt: str, type: RequestTypeEnum) -> str:
+    recommendation = await _get_stored(cache_key)
+    if recommendation is None:
+        model_type = select_model(type, prompt)
+        recommendation = await query_llm(prompt, model_type, type)
+        await _cache(cache_key, recommendation, model_type)
+    return recommendation
+
+
+def _get_in_memory(cache_key: tuple) -> Optional[str]:
+    """ Recommendation from the in-memory cache, if enabled """
+    if not RECOMMENDATION_CACHE_ENABLED:
+        return None
+    return recommendation_cache.get(cache_key)
+
+
+async def _get_stored(cache_key: tuple) -> Optional[str]:
+    """
+    Recommendation from the database store, if enabled. Found ones are kept in memory too, if the
+    in-memory cache is enabled. The store is read in a worker thread, as database sessions block
+    """
+    if not RECOMMENDATION_STORE_ENABLED:
+        return None
+    recommendation = await asyncio.to_thread(get_stored_recommendation, cache_key)
+    if recommendation is not None and RECOMMENDATION_CACHE_ENABLED:
+        recommendation_cache.set(cache_key, recommendation)
+    return recommendation
+
+
+async def _cache(cache_key: tuple, recommendation: str, model_type: ModelTypeEnum) -> None:
+    """ Keeps the recommendation in the in-memory cache and in the database store, if enabled """
+    if RECOMMENDATION_CACHE_ENABLED:
+        recommendation_cache.set(cache_key, recommendation)
+    if RECOMMENDATION_STORE_ENABLED:
+        await asyncio.to_thread(store_recommendation, cache_key, recommendation, model_type)
+
+
+def get_preferred_model(type: RequestTypeEnum, prompt: str) -> ModelTypeEnum:
+    """ The model of the tier MODEL_TIER_POLICY gives the request """
+    return model_selector.preferred(type, estimate_tokens(prompt)).model_type
+
+
+def select_model(type: RequestTypeEnum, prompt: str) -> ModelTypeEnum:
+    """ The model to query: the preferred one, or a faster one while the LLMs are busy or slow """
+    return model_selector.choose(type, estimate_tokens(prompt), llm_dispatcher.load).model_type
+
 
-    return await query_llm(prompt, MODEL_TYPE)
+async def query_llm(
+    prompt: str, model_type: ModelTypeEnum, type: RequestTypeEnum = RequestTypeEnum.CURRENT
+) -> str:
+    """
+    Sends the prompt to the LLM once admitted by the dispatcher, with the priority of the request
+    type. Concurrent identical prompts share one upstream call
+    """
+    return await llm_requests.do((model_type, prompt), lambda: _query_llm(prompt, model_type, type))
+
+
+async def _query_llm(prompt: str, model_type: ModelTypeEnum, type: RequestTypeEnum) -> str:
+    """
+    Sends the prompt to the provider(s) chosen by LLM_ROUTING_POLICY, recording the usage. Hedged
+    calls wait for a dispatcher slot of their own
+    """
+    providers = llm_providers.choose(model_type, LLM_ROUTING_POLICY)
+    priority = LLM_PRIORITIES[type]
+    calls = [partial(_call_provider, providers[0], prompt)] + [
+        partial(_call_hedged_provider, provider, prompt, priority) for provider in providers[1:]
+    ]
+
+    try:
+        async with llm_dispatcher.slot(priority):
+            started = time.monotonic()
+            completion = await hedge(calls, providers[0].hedge_delay)
+            elapsed = time.monotonic() - started
+    except (QueueFullException, QueueTimeoutException) as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except httpx.RequestError:
+        raise HTTPException(status_code=503, detail="Service unavailable")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    llm_usage.record(type, prompt, completion, elapsed)
+    model_selector.record(model_type, elapsed)
+    return completion.content
+
+
+async def query_llm_stream(
+    prompt: str,
+    model_type: ModelTypeEnum,
+    type: RequestTypeEnum = RequestTypeEnum.CURRENT
+) -> AsyncIterator[str]:
+    """
+    Requests a streamed completion and yields its content as it arrives. Holds a dispatcher slot
+    meanwhile. Streams are not hedged, they go to the first provider chosen by LLM_ROUTING_POLICY.
+    Their token usage is estimated
+    """
+    provider = llm_providers.choose(model_type, LLM_ROUTING_POLICY)[0]
+    data = _get_llm_request_data(prompt, provider, stream=True)
+    chunks = []
+
+    try:
+        async with llm_dispatcher.slot(LLM_PRIORITIES[type]), \
+                use_http_client(UpstreamEnum.LLM) as client:
+            started = time.monotonic()
+            async for content in _stream_provider(client, provider, data):
+                chunks.append(content)
+                yield content
+    except (QueueFullException, QueueTimeoutException) as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except httpx.RequestError:
+        raise HTTPException(status_code=503, detail="Service unavailable")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    llm_usage.record(type, prompt, LLMCompletion("".join(chunks)), time.monotonic() - started)
+
+
+async def _stream_provider(
+    client: httpx.AsyncClient, provider: LLMProvider, data: dict
+) -> AsyncIterator[str]:
+    """
+    Failures count against the provider, and completed streams clear them. Stream durations are
+    not comparable latencies, so none is recorded
+    """
+    try:
+        request = client.stream("POST", provider.url, headers=provider.headers, json=data)
+        async with request as response:
+            await _raise_for_stream_status(response)
+            lines = response.aiter_lines()
+            async for content in get_content_from_llm_stream(lines, provider.model_type):
+                yield content
+    except Exception:
+        provider.record_failure()
+        raise
+    provider.record_success()
 
 
-async def query_llm(prompt: str, model_type: ModelTypeEnum) -> str:
+async def _call_provider(provider: LLMProvider, prompt: str) -> LLMCompletion:
+    data = _get_llm_request_data(prompt, provider)
+    started = time.monotonic()
+    try:
+        async with use_http_client(UpstreamEnum.LLM) as client:
+            response = await client.post(provider.url, headers=provider.headers, json=data)
+            response.raise_for_status()
+        completion = get_completion_from_llm_response(response.content, provider.model_type)
+    except Exception:
+        provider.record_failure()
+        raise
+    provider.record_success(time.monotonic() - started)
+    return completion
+
+
+async def _call_hedged_provider(
+    provider: LLMProvider, prompt: str, priority: int
+) -> LLMCompletion:
+    async with llm_dispatcher.slot(priority):
+        return await _call_provider(provider, prompt)
+
+
+async def _raise_for_stream_status(response: httpx.Response) -> None:
+    """ Reads the body of failed streamed responses first, so the error detail is available """
+    if response.is_error:
+        await response.aread()
+    response.raise_for_status()
+
+
+def _get_llm_request_data(prompt: str, provider: LLMProvider, stream: bool = False) -> dict:
     data = {
-        "model": f"{get_model_params(model_type)}",
+        "model": provider.model,
         "messages": [{"role": "user", "content": prompt}]
     }
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(LLM_API_URL, headers=HEADERS, json=data)
-            response.raise_for_status()
-            response_json = response.json()
-            return get_content_from_llm_response(response_json, model_type)
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-        except httpx.RequestError:
-            raise HTTPException(status_code=503, detail="Service unavailable")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    if stream:
+        data["stream"] = True
+    return data
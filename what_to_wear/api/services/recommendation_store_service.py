@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, col, delete, select
+
+from what_to_wear.api.database.db import engine, utc_now
+from what_to_wear.api.models.db_models.recommendation import Recommendation
+from what_to_wear.api.utils.background import background_tasks
+from what_to_wear.api.utils.constants import (
+    RECOMMENDATION_STORE_PURGE_INTERVAL_SECONDS,
+    RECOMMENDATION_STORE_TTL_SECONDS,
+    ModelTypeEnum,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_store_key(cache_key: tuple) -> str:
+    """ Stable across processes, unlike hash(): enums are encoded by value, tuples as lists """
+    return hashlib.sha256(json.dumps(cache_key).encode()).hexdigest()
+
+
+def get_stored_recommendation(cache_key: tuple) -> Optional[str]:
+    """ The stored, unexpired recommendation for the cache key. Database failures are a miss """
+    try:
+        with Session(engine) as session:
+            return session.exec(
+                select(Recommendation.recommendation)
+                .where(Recommendation.key == get_store_key(cache_key))
+                .where(col(Recommendation.expires_at) > utc_now())
+            ).first()
+    except SQLAlchemyError as e:
+        logger.warning("Reading a stored recommendation failed: %r", e)
+        return None
+
+
+def store_recommendation(cache_key: tuple, recommendation: str, model_type: ModelTypeEnum) -> None:
+    """ Stores the recommendation for RECOMMENDATION_STORE_TTL_SECONDS. Failures are only logged """
+    now = utc_now()
+    stored = Recommendation(
+        key=get_store_key(cache_key), model=model_type.value, recommendation=recommendation,
+        created_at=now, expires_at=now + timedelta(seconds=RECOMMENDATION_STORE_TTL_SECONDS)
+    )
+    try:
+        with Session(engine) as session:
+            session.merge(stored)
+            session.commit()
+    except SQLAlchemyError as e:
+        logger.warning("Storing a recommendation failed: %r", e)
+
+
+def purge_expired_recommendations() -> int:
+    """ Deletes the expired recommendations. Returns how many were deleted """
+    with Session(engine) as session:
+        result = session.exec(
+            delete(Recommendation).where(col(Recommendation.expires_at) <= utc_now())
+        )
+        session.commit()
+        return result.rowcount
+
+
+async def run_recommendation_purger() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(purge_expired_recommendations)
+        except Exception:
+            logger.exception("Purging expired recommendations failed")
+        await asyncio.sleep(RECOMMENDATION_STORE_PURGE_INTERVAL_SECONDS)
+
+
+def start_recommendation_purger() -> bool:
+    """ Spawns the purge as a background task. Returns False if the supervisor is not running """
+    return background_tasks.spawn("recommendation_purger", run_recommendation_purger)
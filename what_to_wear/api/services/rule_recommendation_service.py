@@ -0,0 +1,87 @@
+from typing import Union
+
+from what_to_wear.api.models.schemas.current_weather import CurrentWeather, CurrentWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import DayForecast, ForecastWeatherResponse
+from what_to_wear.api.utils.constants import RequestTypeEnum
+
+# (Upper bound of the felt temperature in °C, what to wear), checked in order:
+TEMPERATURE_LAYERS = (
+    (0, "a warm winter coat, a hat, gloves and a scarf"),
+    (8, "a warm jacket over a sweater"),
+    (14, "a jacket or a thick sweater"),
+    (19, "a light jacket or a long-sleeved top"),
+    (25, "a t-shirt with light trousers or a skirt"),
+    (float("inf"), "light, breathable clothes such as shorts and a t-shirt"),
+)
+
+LIGHT_RAIN_MM = 0.1
+HEAVY_RAIN_MM = 5
+RAIN_CHANCE_PERCENT = 50
+STRONG_WIND_KPH = 30
+HIGH_UV = 6
+MODERATE_UV = 3
+# Daily temperature ranges from this many °C up are better dressed for in layers:
+LAYERING_RANGE_C = 10
+
+
+def get_layer(feelslike_c: float) -> str:
+    return next(layer for upper_bound, layer in TEMPERATURE_LAYERS if feelslike_c < upper_bound)
+
+
+def get_extras(precip_mm: float, wind_kph: float, uv: float, rain_chance: int = 0) -> list[str]:
+    extras = []
+    if precip_mm >= HEAVY_RAIN_MM:
+        extras.append("a waterproof jacket and waterproof shoes")
+    elif precip_mm >= LIGHT_RAIN_MM or rain_chance >= RAIN_CHANCE_PERCENT:
+        extras.append("an umbrella or a rain jacket")
+    if wind_kph >= STRONG_WIND_KPH:
+        extras.append("a windproof outer layer")
+    if uv >= HIGH_UV:
+        extras.append("sunglasses, a hat and sunscreen")
+    elif uv >= MODERATE_UV:
+        extras.append("sunglasses")
+    return extras
+
+
+def describe(layer: str, extras: list[str], notes: tuple[str, ...] = ()) -> str:
+    sentences = [f"Wear {layer}.", *notes]
+    if extras:
+        listed = f"{', '.join(extras[:-1])}{' and ' if len(extras) > 1 else ''}{extras[-1]}"
+        sentences.append(f"Bring {listed}.")
+    return " ".join(sentences)
+
+
+def recommend_for_current(current: CurrentWeather) -> str:
+    """ Clothing recommendation for the current weather, from fixed thresholds """
+    notes = () if current.is_day else ("Evenings cool down quickly, so add a layer.",)
+    extras = get_extras(current.precip_mm, current.wind_kph, current.uv if current.is_day else 0)
+    return describe(get_layer(current.feelslike_c), extras, notes)
+
+
+def recommend_for_day(daily_data: DayForecast) -> str:
+    """ Clothing recommendation for one forecasted day, from fixed thresholds """
+    notes = ()
+    if daily_data.maxtemp_c - daily_data.mintemp_c >= LAYERING_RANGE_C:
+        notes = (
+            f"Dress in layers, it will range from {daily_data.mintemp_c:.0f}°C "
+            f"to {daily_data.maxtemp_c:.0f}°C.",
+        )
+    extras = get_extras(daily_data.totalprecip_mm, daily_data.maxwind_kph, daily_data.uv,
+                        daily_data.daily_chance_of_rain)
+    return describe(get_layer(daily_data.avgtemp_c), extras, notes)
+
+
+def get_rule_recommendation(
+    weather_data: Union[CurrentWeatherResponse, ForecastWeatherResponse],
+    type: RequestTypeEnum
+) -> str:
+    """
+    Deterministic, in-process recommendation. Forecasts get one '<date>: <recommendation>' line
+    per day
+    """
+    if type == RequestTypeEnum.CURRENT:
+        return recommend_for_current(weather_data.current)
+    return "\n".join(
+        f"{forecast_day.date}: {recommend_for_day(forecast_day.day)}"
+        for forecast_day in weather_data.forecast.forecastday
+    )
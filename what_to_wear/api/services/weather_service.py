@@ -1,50 +1,151 @@
+import asyncio
+import time
+from dataclasses import dataclass, replace
+from decimal import Decimal
 from http import HTTPStatus
-from typing import Optional
+from typing import Optional, Type, TypeVar, Union
 
 import httpx
 from fastapi import HTTPException
+from pydantic import BaseModel
 
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
-from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
-from what_to_wear.api.utils.constants import WEATHER_API_BASE_URL, WEATHER_API_KEY
+from what_to_wear.api.models.schemas.forecast_weather import (
+    ForecastWeatherResponse,
+    LazyForecastWeatherResponse,
+)
+from what_to_wear.api.models.schemas.weather_batch import WeatherBatchItem, WeatherBatchResult
+from what_to_wear.api.services.location_service import (
+    record_location,
+    record_unknown_location,
+    resolve_location,
+)
+from what_to_wear.api.utils.background import background_tasks
+from what_to_wear.api.utils.cache import TTLCache
+from what_to_wear.api.utils.constants import (
+    WEATHER_API_BASE_URL,
+    WEATHER_API_CONNECT_TIMEOUT,
+    WEATHER_API_KEY,
+    WEATHER_API_MAX_RETRIES,
+    WEATHER_API_MIN_TIMEOUT,
+    WEATHER_API_TIMEOUT,
+    WEATHER_BATCH_CONCURRENCY,
+    WEATHER_CACHE_COORD_GRID,
+    WEATHER_CACHE_ENABLED,
+    WEATHER_CACHE_MAX_SIZE,
+    WEATHER_CACHE_MAX_STALE_SECONDS,
+    WEATHER_CIRCUIT_FAILURE_THRESHOLD,
+    WEATHER_CIRCUIT_RESET_SECONDS,
+    WEATHER_CURRENT_TTL_SECONDS,
+    WEATHER_FALLBACK_MAX_AGE_SECONDS,
+    WEATHER_FORECAST_SLICING_ENABLED,
+    WEATHER_FORECAST_TTL_SECONDS,
+    WEATHER_MAX_FORECAST_DAYS,
+    WEATHER_PREWARM_ENABLED,
+    WEATHER_PREWARM_TRACKED_KEYS,
+    WEATHER_RETRY_BASE_DELAY,
+    WEATHER_RETRY_BUDGET_MAX_TOKENS,
+    WEATHER_RETRY_BUDGET_RATIO,
+    WEATHER_RETRY_MAX_DELAY,
+    WEATHER_TIMEOUT_LATENCY_MULTIPLIER,
+    CircuitOpenException,
+    RequestTypeEnum,
+)
+from what_to_wear.api.utils.heavy_hitters import HeavyHitters
+from what_to_wear.api.utils.http_clients import UpstreamEnum, use_http_client
+from what_to_wear.api.utils.resilience import (
+    CircuitBreaker,
+    CircuitStateEnum,
+    LatencyTracker,
+    RetryBudget,
+    jittered_backoff,
+)
+from what_to_wear.api.utils.single_flight import SingleFlight
 
+WeatherModel = TypeVar("WeatherModel", bound=BaseModel)
 
-async def get_current_weather_data(
-    lat: Optional[str],
-    lon: Optional[str],
-    city: Optional[str]
-) -> CurrentWeatherResponse:
+weather_cache: TTLCache[Union[CurrentWeatherResponse, ForecastWeatherResponse]] = TTLCache(
+    WEATHER_CACHE_MAX_SIZE, WEATHER_CURRENT_TTL_SECONDS, WEATHER_CACHE_MAX_STALE_SECONDS
+)
+
+
+@dataclass(frozen=True)
+class WeatherRequest:
+    """ One WeatherAPI call and how its result is cached """
+    cache_key: tuple
+    q_param: str  # As typed by the user, to learn location aliases from the response
+    path: str
+    params: dict
+    model: Type[BaseModel]
+    ttl: float
+
+
+# Last known good entries, served as stale data while WeatherAPI is failing:
+weather_fallback_cache: TTLCache[Union[CurrentWeatherResponse, ForecastWeatherResponse]] = TTLCache(
+    WEATHER_CACHE_MAX_SIZE, WEATHER_FALLBACK_MAX_AGE_SECONDS
+)
+
+weather_circuit_breaker = CircuitBreaker(
+    WEATHER_CIRCUIT_FAILURE_THRESHOLD, WEATHER_CIRCUIT_RESET_SECONDS
+)
+weather_retry_budget = RetryBudget(WEATHER_RETRY_BUDGET_RATIO, WEATHER_RETRY_BUDGET_MAX_TOKENS)
+weather_latency = LatencyTracker()
+
+# Concurrent misses for the same cache key share a single upstream request:
+weather_requests = SingleFlight()
+
+# Most requested cache keys, for the pre-warm scheduler:
+popular_weather_requests: HeavyHitters[WeatherRequest] = HeavyHitters(WEATHER_PREWARM_TRACKED_KEYS)
+
+_COORD_DECIMALS = max(0, -Decimal(str(WEATHER_CACHE_COORD_GRID)).as_tuple().exponent)
+
+
+def quantize_coordinate(value: Union[str, float]) -> str:
+    """ Snaps a coordinate to the cache grid. Values that are not numbers are passed on as is """
+    try:
+        snapped = round(float(value) / WEATHER_CACHE_COORD_GRID) * WEATHER_CACHE_COORD_GRID
+    except ValueError:
+        return str(value)
+    return f"{snapped:.{_COORD_DECIMALS}f}"
+
+
+def get_query_param(lat: Optional[str], lon: Optional[str], city: Optional[str]) -> str:
+    """ Builds the WeatherAPI 'q' parameter from either a city name or a pair of coordinates """
     if not (lat and lon) and not city:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Either 'city' or ('lat', 'lon') must be provided."
         )
 
-    q_param = city if city else f"{lat},{lon}"
+    if city:
+        return city
+    if WEATHER_CACHE_ENABLED:
+        return f"{quantize_coordinate(lat)},{quantize_coordinate(lon)}"
+    return f"{lat},{lon}"
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{WEATHER_API_BASE_URL}/current.json",
-                params={"key": WEATHER_API_KEY, "q": q_param},
-                timeout=10.0
-            )
-            response.raise_for_status()
-            return CurrentWeatherResponse(**response.json())
 
-    except httpx.HTTPStatusError as e:
-        status_code = e.response.status_code
-        if status_code == HTTPStatus.NOT_FOUND:
-            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="City or coordinates not found.")
-        if status_code == HTTPStatus.BAD_REQUEST:
-            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid city or coordinates.")
-        raise HTTPException(status_code=e.response.status_code, detail="Weather API error")
+async def get_current_weather_data(
+    lat: Optional[str],
+    lon: Optional[str],
+    city: Optional[str]
+) -> CurrentWeatherResponse:
+    q_param = get_query_param(lat, lon, city)
+    location = resolve_location(q_param)
+    cache_key = (RequestTypeEnum.CURRENT, location.key)
 
-    except httpx.RequestError:
-        raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Service unavailable")
+    if WEATHER_FORECAST_SLICING_ENABLED and WEATHER_CACHE_ENABLED:
+        forecast_entry = weather_cache.peek((RequestTypeEnum.FORECAST, location.key))
+        if forecast_entry is not None and (
+            forecast_entry.stored_at + WEATHER_CURRENT_TTL_SECONDS > time.monotonic()
+        ):
+            return CurrentWeatherResponse.model_construct(
+                location=forecast_entry.value.location, current=forecast_entry.value.current
+            )
 
-    except Exception as e:
-        raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
+    return await _get_cached_or_fetch(WeatherRequest(
+        cache_key, q_param, "current.json", {"q": location.q_param}, CurrentWeatherResponse,
+        WEATHER_CURRENT_TTL_SECONDS
+    ))
 
 
 async def get_forecast_weather_data(
@@ -53,23 +154,121 @@ async def get_forecast_weather_data(
     city: Optional[str],
     days: int
 ) -> ForecastWeatherResponse:
-    if not (lat and lon) and not city:
-        raise HTTPException(
-            status_code=HTTPStatus.BAD_REQUEST,
-            detail="Either 'city' or ('lat', 'lon') must be provided."
-        )
+    q_param = get_query_param(lat, lon, city)
+    location = resolve_location(q_param)
+
+    if WEATHER_FORECAST_SLICING_ENABLED and WEATHER_CACHE_ENABLED:
+        cache_key = (RequestTypeEnum.FORECAST, location.key)
+        weather_data = await _get_cached_or_fetch(WeatherRequest(
+            cache_key, q_param, "forecast.json",
+            {"q": location.q_param, "days": WEATHER_MAX_FORECAST_DAYS},
+            LazyForecastWeatherResponse, WEATHER_FORECAST_TTL_SECONDS
+        ))
+        return weather_data.first_days(days)
+
+    cache_key = (RequestTypeEnum.FORECAST, location.key, days)
+    return await _get_cached_or_fetch(WeatherRequest(
+        cache_key, q_param, "forecast.json", {"q": location.q_param, "days": days},
+        LazyForecastWeatherResponse, WEATHER_FORECAST_TTL_SECONDS
+    ))
+
+
+async def get_weather_batch(items: list[WeatherBatchItem]) -> list[WeatherBatchResult]:
+    """
+    Resolves many locations at once through the regular (cached) lookups, with at most
+    WEATHER_BATCH_CONCURRENCY of them in flight. Failures are reported per item.
+    """
+    semaphore = asyncio.Semaphore(WEATHER_BATCH_CONCURRENCY)
+
+    async def resolve(index: int, item: WeatherBatchItem) -> WeatherBatchResult:
+        async with semaphore:
+            try:
+                if item.type == RequestTypeEnum.CURRENT:
+                    weather_data = await get_current_weather_data(item.lat, item.lon, item.city)
+                else:
+                    weather_data = await get_forecast_weather_data(
+                        item.lat, item.lon, item.city, item.days
+                    )
+                return WeatherBatchResult(index=index, status_code=HTTPStatus.OK, data=weather_data)
+            except HTTPException as e:
+                return WeatherBatchResult(
+                    index=index, status_code=e.status_code, error=str(e.detail)
+                )
+
+    return list(await asyncio.gather(*(resolve(index, item) for index, item in enumerate(items))))
+
 
-    q_param = city if city else f"{lat},{lon}"
+async def _get_cached_or_fetch(request: WeatherRequest) -> BaseModel:
+    """
+    Serves fresh cache entries directly. Stale entries (within WEATHER_CACHE_MAX_STALE_SECONDS) are
+    served as well while a background task refreshes them, if the app lifespan is running.
+    Everything else is fetched from WeatherAPI, sharing one request between concurrent callers.
+    """
+    def fetch():
+        return refresh_weather(request)
+
+    if WEATHER_PREWARM_ENABLED:
+        popular_weather_requests.add(request.cache_key, request)
+    if not WEATHER_CACHE_ENABLED:
+        return await fetch()
+
+    entry = weather_cache.get_entry(request.cache_key)
+    if entry is not None:
+        if entry.is_fresh or background_tasks.spawn(("weather_refresh", request.cache_key), fetch):
+            return entry.value
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{WEATHER_API_BASE_URL}/forecast.json",
-                params={"key": WEATHER_API_KEY, "q": q_param, "days": days},
-                timeout=10.0
-            )
-            response.raise_for_status()
-            return ForecastWeatherResponse(**response.json())
+        return await fetch()
+    except HTTPException as e:
+        fallback = weather_fallback_cache.get(request.cache_key)
+        if e.status_code < HTTPStatus.INTERNAL_SERVER_ERROR or fallback is None:
+            raise
+        return fallback.as_stale()
+
+
+def get_canonical_request(request: WeatherRequest) -> WeatherRequest:
+    """ The same request, keyed and queried by the canonical location its q_param resolves to """
+    location = resolve_location(request.q_param)
+    request_type, _, *rest = request.cache_key
+    return replace(
+        request, cache_key=(request_type, location.key, *rest),
+        params={**request.params, "q": location.q_param}
+    )
+
+
+async def refresh_weather(request: WeatherRequest) -> BaseModel:
+    """ Fetches from WeatherAPI regardless of the cache contents and stores the result """
+    return await weather_requests.do(request.cache_key, lambda: _fetch_and_cache(request))
+
+
+async def _fetch_and_cache(request: WeatherRequest) -> BaseModel:
+    """ Fetches from WeatherAPI and caches the result under the canonical location it maps to """
+    try:
+        weather_data = await _fetch_weather(request.path, request.params, request.model)
+    except HTTPException as e:
+        record_unknown_location(request.q_param, e)
+        raise
+
+    canonical = record_location(request.q_param, weather_data.location)
+    if WEATHER_CACHE_ENABLED:
+        request_type, _, *rest = request.cache_key
+        cache_key = (request_type, canonical.key, *rest)
+        weather_cache.set(cache_key, weather_data, ttl=request.ttl)
+        weather_fallback_cache.set(cache_key, weather_data)
+    return weather_data
+
+
+async def _fetch_weather(path: str, params: dict, model: Type[WeatherModel]) -> WeatherModel:
+    """ Calls a WeatherAPI endpoint and maps upstream failures to HTTP errors """
+    try:
+        response = await _request_weather(path, params)
+        return model.model_validate_json(response.content)
+
+    except CircuitOpenException:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Weather service temporarily unavailable",
+        )
 
     except httpx.HTTPStatusError as e:
         status_code = e.response.status_code
@@ -84,3 +283,59 @@ async def get_forecast_weather_data(
 
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+async def _request_weather(path: str, params: dict) -> httpx.Response:
+    """
+    GETs a WeatherAPI endpoint behind the circuit breaker, with a latency based timeout.
+    Connection errors, 429 and 5xx answers are retried with jittered backoff while the
+    retry budget allows it, and not at all for half-open probes. The breaker counts one failure per
+    request, once its retries are over.
+    """
+    if not weather_circuit_breaker.allow_request():
+        raise CircuitOpenException(UpstreamEnum.WEATHER.value)
+    weather_retry_budget.record_request()
+
+    attempt = 0
+    while True:
+        timeout = weather_latency.adaptive_timeout(
+            WEATHER_TIMEOUT_LATENCY_MULTIPLIER, WEATHER_API_MIN_TIMEOUT, WEATHER_API_TIMEOUT
+        )
+        started = time.monotonic()
+        try:
+            async with use_http_client(UpstreamEnum.WEATHER) as client:
+                response = await client.get(
+                    f"{WEATHER_API_BASE_URL}/{path}",
+                    params={"key": WEATHER_API_KEY, **params},
+                    timeout=httpx.Timeout(timeout, connect=WEATHER_API_CONNECT_TIMEOUT)
+                )
+            response.raise_for_status()
+        except (httpx.RequestError, httpx.HTTPStatusError) as e:
+            if not _is_retryable(e):
+                weather_circuit_breaker.record_success()
+                raise
+
+            if (attempt >= WEATHER_API_MAX_RETRIES
+                    or weather_circuit_breaker.state != CircuitStateEnum.CLOSED
+                    or not weather_retry_budget.try_retry()):
+                weather_circuit_breaker.record_failure()
+                raise
+            await asyncio.sleep(
+                jittered_backoff(attempt, WEATHER_RETRY_BASE_DELAY, WEATHER_RETRY_MAX_DELAY)
+            )
+            attempt += 1
+            continue
+
+        weather_latency.record(time.monotonic() - started)
+        weather_circuit_breaker.record_success()
+        return response
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return (
+            status_code == HTTPStatus.TOO_MANY_REQUESTS
+            or status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+        )
+    return True
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSupervisor:
+    """
+    Owns the application's background tasks. Tasks can only be spawned while the supervisor is
+    running (between start() and stop(), i.e. inside the app lifespan), at most one per key.
+    """
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        self._running = True
+
+    async def stop(self) -> None:
+        """ Cancels all pending tasks and waits for them to finish """
+        self._running = False
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def spawn(self, key: Hashable, func: Callable[[], Awaitable[None]]) -> bool:
+        """
+        Runs func() in the background unless a task with the same key is already pending.
+        Returns False if the supervisor is not running, so the caller can do the work inline.
+        """
+        if not self._running:
+            return False
+        if key in self._tasks:
+            return True
+
+        task = asyncio.ensure_future(self._run(key, func))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return True
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    @staticmethod
+    async def _run(key: Hashable, func: Callable[[], Awaitable[None]]) -> None:
+        try:
+            await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Background task %s failed", key)
+
+
+background_tasks = TaskSupervisor()
@@ -0,0 +1,111 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class CacheEntry(Generic[V]):
+    value: V
+    stored_at: float
+    expires_at: float
+    stale_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires_at > time.monotonic()
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    stale_hits: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+
+class TTLCache(Generic[V]):
+    """
+    In-memory cache with per-entry expiry, bounded size (LRU eviction) and hit/miss counters.
+
+    Expired entries are kept for another 'max_stale' seconds, so callers that can live with
+    stale data may still read them through get_entry().
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_stale: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries: OrderedDict[Hashable, CacheEntry[V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """ Returns the value if present and not expired, otherwise None """
+        entry = self._lookup(key)
+        if entry is None or not entry.is_fresh:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry.value
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry[V]]:
+        """ Returns the entry if it is fresh or still within its staleness window, else None """
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+        elif entry.is_fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry[V]]:
+        """ Like get_entry(), but without touching the hit/miss counters """
+        return self._lookup(key)
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._entries[key] = CacheEntry(value, now, expires_at, expires_at + self.max_stale)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.pop(key, None)
+        return entry.value if entry else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, self.stale_hits, len(self._entries), self.maxsize)
+
+    def _lookup(self, key: Hashable) -> Optional[CacheEntry[V]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.stale_until <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
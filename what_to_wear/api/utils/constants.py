@@ -1,3 +1,4 @@
+import math
 import os
 from enum import Enum
 
@@ -9,6 +10,96 @@ load_dotenv()
 WEATHER_API_BASE_URL = os.getenv("WEATHER_API_BASE_URL")
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 
+# Weather cache:
+WEATHER_CACHE_ENABLED = os.getenv("WEATHER_CACHE_ENABLED", "true").lower() == "true"
+WEATHER_CACHE_MAX_SIZE = int(os.getenv("WEATHER_CACHE_MAX_SIZE", "2048"))
+WEATHER_CURRENT_TTL_SECONDS = float(os.getenv("WEATHER_CURRENT_TTL_SECONDS", "300"))
+WEATHER_FORECAST_TTL_SECONDS = float(os.getenv("WEATHER_FORECAST_TTL_SECONDS", "1800"))
+# Expired entries are still served for this long while they are refreshed in the background:
+WEATHER_CACHE_MAX_STALE_SECONDS = float(os.getenv("WEATHER_CACHE_MAX_STALE_SECONDS", "600"))
+# Coordinates are snapped to this grid (in degrees) before lookup, so nearby points share an entry:
+WEATHER_CACHE_COORD_GRID = float(os.getenv("WEATHER_CACHE_COORD_GRID", "0.01"))
+# Fetch the longest forecast once per location and slice it for shorter ones (and current weather):
+WEATHER_FORECAST_SLICING_ENABLED = (
+    os.getenv("WEATHER_FORECAST_SLICING_ENABLED", "false").lower() == "true"
+)
+WEATHER_MAX_FORECAST_DAYS = int(os.getenv("WEATHER_MAX_FORECAST_DAYS", "10"))
+
+# WeatherAPI resilience (retries, circuit breaker, adaptive timeouts, stale fallback):
+WEATHER_API_MAX_RETRIES = int(os.getenv("WEATHER_API_MAX_RETRIES", "2"))
+WEATHER_RETRY_BASE_DELAY = float(os.getenv("WEATHER_RETRY_BASE_DELAY", "0.1"))
+WEATHER_RETRY_MAX_DELAY = float(os.getenv("WEATHER_RETRY_MAX_DELAY", "1"))
+# Retries may add at most this fraction of extra requests on top of the regular ones:
+WEATHER_RETRY_BUDGET_RATIO = float(os.getenv("WEATHER_RETRY_BUDGET_RATIO", "0.1"))
+WEATHER_RETRY_BUDGET_MAX_TOKENS = float(os.getenv("WEATHER_RETRY_BUDGET_MAX_TOKENS", "10"))
+WEATHER_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("WEATHER_CIRCUIT_FAILURE_THRESHOLD", "5"))
+WEATHER_CIRCUIT_RESET_SECONDS = float(os.getenv("WEATHER_CIRCUIT_RESET_SECONDS", "30"))
+# The request timeout adapts to this multiple of the observed p99 latency, capped by
+# WEATHER_API_TIMEOUT:
+WEATHER_TIMEOUT_LATENCY_MULTIPLIER = float(os.getenv("WEATHER_TIMEOUT_LATENCY_MULTIPLIER", "3"))
+WEATHER_API_MIN_TIMEOUT = float(os.getenv("WEATHER_API_MIN_TIMEOUT", "1"))
+# Last known good entries are served (flagged as stale) for this long when WeatherAPI is failing:
+WEATHER_FALLBACK_MAX_AGE_SECONDS = float(os.getenv("WEATHER_FALLBACK_MAX_AGE_SECONDS", "21600"))
+
+# Location canonicalization (maps typed locations to WeatherAPI's canonical one) and caching of
+# "not found" answers:
+LOCATION_ALIAS_MAX_SIZE = int(os.getenv("LOCATION_ALIAS_MAX_SIZE", "10000"))
+LOCATION_ALIAS_TTL_SECONDS = float(os.getenv("LOCATION_ALIAS_TTL_SECONDS", "86400"))
+LOCATION_NOT_FOUND_TTL_SECONDS = float(os.getenv("LOCATION_NOT_FOUND_TTL_SECONDS", "300"))
+
+# Cache pre-warming of the most requested locations (scheduled from the app lifespan):
+WEATHER_PREWARM_ENABLED = os.getenv("WEATHER_PREWARM_ENABLED", "false").lower() == "true"
+WEATHER_PREWARM_INTERVAL_SECONDS = float(os.getenv("WEATHER_PREWARM_INTERVAL_SECONDS", "120"))
+WEATHER_PREWARM_TOP_N = int(os.getenv("WEATHER_PREWARM_TOP_N", "200"))
+# Number of request keys whose frequency is tracked (heavy-hitters sketch):
+WEATHER_PREWARM_TRACKED_KEYS = int(os.getenv("WEATHER_PREWARM_TRACKED_KEYS", "2000"))
+# Pre-warm calls are spread out to stay below this many WeatherAPI requests per second:
+WEATHER_PREWARM_MAX_RATE = float(os.getenv("WEATHER_PREWARM_MAX_RATE", "5"))
+WEATHER_PREWARM_RECOMMENDATIONS = (
+    os.getenv("WEATHER_PREWARM_RECOMMENDATIONS", "false").lower() == "true"
+)
+
+# Weather batch endpoint:
+WEATHER_BATCH_MAX_ITEMS = int(os.getenv("WEATHER_BATCH_MAX_ITEMS", "200"))
+WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "10"))
+
+# Recommendation cache, keyed on the weather features of the prompt snapped to these bucket sizes:
+RECOMMENDATION_CACHE_ENABLED = os.getenv("RECOMMENDATION_CACHE_ENABLED", "true").lower() == "true"
+RECOMMENDATION_CACHE_MAX_SIZE = int(os.getenv("RECOMMENDATION_CACHE_MAX_SIZE", "4096"))
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "3600"))
+RECOMMENDATION_TEMP_BUCKET = float(os.getenv("RECOMMENDATION_TEMP_BUCKET", "2"))
+RECOMMENDATION_HUMIDITY_BUCKET = float(os.getenv("RECOMMENDATION_HUMIDITY_BUCKET", "20"))
+RECOMMENDATION_WIND_BUCKET = float(os.getenv("RECOMMENDATION_WIND_BUCKET", "10"))
+RECOMMENDATION_PRECIP_BUCKET = float(os.getenv("RECOMMENDATION_PRECIP_BUCKET", "1"))
+RECOMMENDATION_RAIN_CHANCE_BUCKET = float(os.getenv("RECOMMENDATION_RAIN_CHANCE_BUCKET", "25"))
+RECOMMENDATION_UV_BUCKET = float(os.getenv("RECOMMENDATION_UV_BUCKET", "3"))
+
+# Recommendations persisted in the database, shared by all workers and kept across restarts:
+RECOMMENDATION_STORE_ENABLED = os.getenv("RECOMMENDATION_STORE_ENABLED", "false").lower() == "true"
+RECOMMENDATION_STORE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_STORE_TTL_SECONDS", "86400"))
+RECOMMENDATION_STORE_PURGE_INTERVAL_SECONDS = float(
+    os.getenv("RECOMMENDATION_STORE_PURGE_INTERVAL_SECONDS", "3600")
+)
+
+# LLM admission control (concurrency limit and bounded priority queue):
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+# Prompt size budget, in locally estimated tokens. Longer forecasts are summarized to fit:
+LLM_PROMPT_MAX_TOKENS = int(os.getenv("LLM_PROMPT_MAX_TOKENS", "400"))
+
+# Asynchronous recommendation jobs (in-process worker pool, results kept in the database):
+RECOMMENDATION_JOB_WORKERS = int(os.getenv("RECOMMENDATION_JOB_WORKERS", "4"))
+RECOMMENDATION_JOB_QUEUE_SIZE = int(os.getenv("RECOMMENDATION_JOB_QUEUE_SIZE", "1000"))
+RECOMMENDATION_JOB_RETENTION_SECONDS = float(
+    os.getenv("RECOMMENDATION_JOB_RETENTION_SECONDS", "86400")
+)
+RECOMMENDATION_JOB_PURGE_INTERVAL_SECONDS = float(
+    os.getenv("RECOMMENDATION_JOB_PURGE_INTERVAL_SECONDS", "600")
+)
+# Jobs still running after this long were left by a stopped process, and are run again:
+RECOMMENDATION_JOB_STALE_SECONDS = float(os.getenv("RECOMMENDATION_JOB_STALE_SECONDS", "300"))
+
 LLM_API_URL = os.getenv("LLM_API_URL")
 LLM_API_KEY = os.getenv("LLM_API_KEY")
 HEADERS = {"Authorization": f"Bearer {LLM_API_KEY}"}
@@ -17,6 +108,17 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# HTTP clients (shared, application-scoped connection pools):
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+WEATHER_API_CONNECT_TIMEOUT = float(os.getenv("WEATHER_API_CONNECT_TIMEOUT", "3"))
+WEATHER_API_TIMEOUT = float(os.getenv("WEATHER_API_TIMEOUT", "10"))
+LLM_API_CONNECT_TIMEOUT = float(os.getenv("LLM_API_CONNECT_TIMEOUT", "5"))
+LLM_API_TIMEOUT = float(os.getenv("LLM_API_TIMEOUT", "60"))
+
 
 # Enums and other constants:
 class RequestTypeEnum(str, Enum):
@@ -24,20 +126,146 @@ class RequestTypeEnum(str, Enum):
     FORECAST = "FORECAST"
 
 
+class ForecastRecommendationModeEnum(str, Enum):
+    COMBINED = "COMBINED"  # One prompt for all days
+    PER_DAY = "PER_DAY"  # One (cached, deduplicated) recommendation per day, assembled afterwards
+
+
+RECOMMENDATION_FORECAST_MODE = ForecastRecommendationModeEnum(
+    os.getenv("RECOMMENDATION_FORECAST_MODE", ForecastRecommendationModeEnum.COMBINED.value).upper()
+)
+
+
+class RecommendationModeEnum(str, Enum):
+    LLM = "llm"
+    FAST = "fast"  # Rule-based, in-process
+
+
+class RecommendationDeliveryEnum(str, Enum):
+    INLINE = "inline"
+    DEFERRED = "deferred"  # As a recommendation job to poll
+    STREAM = "stream"  # As Server-Sent Events
+
+
+class JobStatusEnum(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class RecommendationSourceEnum(str, Enum):
+    LLM = "llm"
+    RULES = "rules"  # Requested in FAST mode
+    FALLBACK = "fallback"  # Rules, because the LLM failed or was too slow
+
+
+# LLM recommendations fall back to the rule-based ones on errors or when slower than the budget:
+RECOMMENDATION_FALLBACK_ENABLED = (
+    os.getenv("RECOMMENDATION_FALLBACK_ENABLED", "true").lower() == "true"
+)
+RECOMMENDATION_LLM_BUDGET_SECONDS = float(os.getenv("RECOMMENDATION_LLM_BUDGET_SECONDS", "8"))
+
+# Queued LLM calls with a lower value are admitted first:
+LLM_PRIORITIES = {
+    RequestTypeEnum.CURRENT: 0,
+    RequestTypeEnum.FORECAST: 1,
+}
+
+
 class ModelTypeEnum(str, Enum):
-    MISTRAL = "MISTRAL"
+    MISTRAL = "MISTRAL"  # 7B
+    MISTRAL_NEMO = "MISTRAL_NEMO"  # 12B
+    MISTRAL_SMALL = "MISTRAL_SMALL"  # 24B
+
+
+class ModelTierEnum(str, Enum):
+    FAST = "FAST"
+    BALANCED = "BALANCED"
+    QUALITY = "QUALITY"
 
 
 # Auth:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# Password hashes with another bcrypt cost are upgraded on the next successful login:
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads hashing and verifying passwords, i.e. at most this many bcrypt operations run at once:
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Resolved users and verified tokens are cached for a short while. Tokens logged out on another
+# instance are rejected here once their cache entry expires:
+AUTH_USER_CACHE_MAX_SIZE = int(os.getenv("AUTH_USER_CACHE_MAX_SIZE", "1024"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+AUTH_TOKEN_CACHE_MAX_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_MAX_SIZE", "4096"))
+AUTH_TOKEN_CACHE_TTL_SECONDS = float(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "60"))
+# Trust the signed token claims without looking the user up. Logged out tokens are still rejected:
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() == "true"
 
 # Change model here:
 MODEL_TYPE = ModelTypeEnum.MISTRAL
 
 MODEL_PARAMS = {
-    ModelTypeEnum.MISTRAL: "mistralai/mistral-7b-instruct"
+    ModelTypeEnum.MISTRAL: "mistralai/mistral-7b-instruct",
+    ModelTypeEnum.MISTRAL_NEMO: "mistralai/mistral-nemo",
+    ModelTypeEnum.MISTRAL_SMALL: "mistralai/mistral-small-3.1-24b-instruct",
+}
+
+# Model tiers, fastest first: (model, p95 latency SLO in seconds):
+MODEL_TIERS = {
+    ModelTierEnum.FAST: (
+        ModelTypeEnum(
+            os.getenv("LLM_FAST_MODEL_TYPE", ModelTypeEnum.MISTRAL.value).upper()
+        ),
+        float(os.getenv("LLM_FAST_SLO_SECONDS", "3")),
+    ),
+    ModelTierEnum.BALANCED: (
+        ModelTypeEnum(
+            os.getenv("LLM_BALANCED_MODEL_TYPE", ModelTypeEnum.MISTRAL_NEMO.value).upper()
+        ),
+        float(os.getenv("LLM_BALANCED_SLO_SECONDS", "5")),
+    ),
+    ModelTierEnum.QUALITY: (
+        ModelTypeEnum(
+            os.getenv("LLM_QUALITY_MODEL_TYPE", ModelTypeEnum.MISTRAL_SMALL.value).upper()
+        ),
+        float(os.getenv("LLM_QUALITY_SLO_SECONDS", "8")),
+    ),
+}
+# Tier per request type: the first (max prompt tokens, tier) entry the estimated prompt fits in:
+MODEL_TIER_POLICY = {
+    RequestTypeEnum.CURRENT: ((math.inf, ModelTierEnum.FAST),),
+    RequestTypeEnum.FORECAST: ((150, ModelTierEnum.BALANCED), (math.inf, ModelTierEnum.QUALITY)),
 }
+# Requests move to faster tiers while the LLM queue is this full, or their tier misses its SLO:
+LLM_TIER_FALLBACK_QUEUE_RATIO = float(os.getenv("LLM_TIER_FALLBACK_QUEUE_RATIO", "0.5"))
+
+
+class LLMRoutingPolicyEnum(str, Enum):
+    SINGLE = "SINGLE"  # Always the first provider
+    WEIGHTED = "WEIGHTED"  # Random provider, by weight
+    LATENCY = "LATENCY"  # Provider with the lowest observed median latency
+    HEDGED = "HEDGED"  # Fastest provider, plus the next one if no answer within the p90 latency
+
+
+# LLM providers. The primary one is LLM_API_URL / LLM_API_KEY, a secondary one is optional:
+LLM_ROUTING_POLICY = LLMRoutingPolicyEnum(
+    os.getenv("LLM_ROUTING_POLICY", LLMRoutingPolicyEnum.SINGLE.value).upper()
+)
+LLM_PRIMARY_WEIGHT = float(os.getenv("LLM_PRIMARY_WEIGHT", "1"))
+LLM_SECONDARY_API_URL = os.getenv("LLM_SECONDARY_API_URL")
+LLM_SECONDARY_API_KEY = os.getenv("LLM_SECONDARY_API_KEY")
+LLM_SECONDARY_MODEL_TYPE = ModelTypeEnum(
+    os.getenv("LLM_SECONDARY_MODEL_TYPE", MODEL_TYPE.value).upper()
+)
+LLM_SECONDARY_MODEL = os.getenv("LLM_SECONDARY_MODEL", MODEL_PARAMS[LLM_SECONDARY_MODEL_TYPE])
+LLM_SECONDARY_WEIGHT = float(os.getenv("LLM_SECONDARY_WEIGHT", "1"))
+# Hedge delay while a provider's latency is not known yet:
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "3"))
+# Providers failing since their last success rank as slow as this, until their failure is older
+# than LLM_LATENCY_MAX_AGE_SECONDS:
+LLM_FAILURE_PENALTY_SECONDS = float(os.getenv("LLM_FAILURE_PENALTY_SECONDS", str(LLM_API_TIMEOUT)))
+# Observed LLM latencies are forgotten after this long, so slow or failing providers are retried:
+LLM_LATENCY_MAX_AGE_SECONDS = float(os.getenv("LLM_LATENCY_MAX_AGE_SECONDS", "300"))
 
 
 # CORS:
@@ -66,6 +294,26 @@ class FailureCreatingUserException(Exception):
         super().__init__("Failure creating user")
 
 
+class CircuitOpenException(Exception):
+    """Exception raised when calls to an upstream are suspended by its circuit breaker."""
+    def __init__(self, upstream: str):
+        super().__init__(f"Circuit open for upstream: {upstream}")
+
+
+class QueueFullException(Exception):
+    """Exception raised when a call is rejected because the wait queue of an upstream is full."""
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__("Too many requests queued, try again later")
+
+
+class QueueTimeoutException(Exception):
+    """Exception raised when a queued call is not admitted within its deadline."""
+    def __init__(self, timeout: float):
+        self.retry_after = timeout
+        super().__init__(f"Request not admitted within {timeout} seconds, try again later")
+
+
 class UsernameAlreadyExistsException(Exception):
     """Exception raised when creating a new user with an already existing username """
     def __init__(self):
@@ -0,0 +1,112 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from what_to_wear.api.utils.constants import QueueFullException, QueueTimeoutException
+from what_to_wear.api.utils.resilience import LatencyTracker
+
+
+@dataclass
+class DispatcherStats:
+    active: int
+    queued: int
+    max_concurrency: int
+    max_queue: int
+    admitted: int
+    rejected: int
+    timed_out: int
+    wait_p50: Optional[float]
+    wait_p95: Optional[float]
+
+
+class Dispatcher:
+    """
+    Admission control for an upstream: at most 'max_concurrency' calls run at once, up to
+    'max_queue' more wait for a slot (lowest priority value first, FIFO within a priority), for at
+    most 'queue_timeout' seconds. Callers beyond that are rejected right away with
+    QueueFullException.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._sequence = itertools.count()
+        self.wait_times = LatencyTracker(min_samples=1)
+        self.reset()
+
+    def reset(self) -> None:
+        self._active = 0
+        self._queued = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_times.clear()
+
+    @property
+    def stats(self) -> DispatcherStats:
+        return DispatcherStats(
+            self._active, self._queued, self.max_concurrency, self.max_queue, self.admitted,
+            self.rejected, self.timed_out, self.wait_times.percentile(50),
+            self.wait_times.percentile(95)
+        )
+
+    @property
+    def load(self) -> float:
+        """ How full the queue is, from 0 to 1 """
+        return self._queued / self.max_queue if self.max_queue else 0.0
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0) -> AsyncIterator[None]:
+        """ Holds one of the concurrency slots for the duration of the block """
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int) -> None:
+        started = time.monotonic()
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+        elif self._queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullException(self.queue_timeout)
+        else:
+            await self._wait_for_slot(priority)
+
+        self.admitted += 1
+        self.wait_times.record(time.monotonic() - started)
+
+    async def _wait_for_slot(self, priority: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if future.done():
+                # The slot was handed over just as we gave up on it
+                self._release()
+            else:
+                future.cancel()
+                self._queued -= 1
+            if isinstance(e, TimeoutError):
+                self.timed_out += 1
+                raise QueueTimeoutException(self.queue_timeout)
+            raise
+
+    def _release(self) -> None:
+        """ Hands the slot over to the first waiter still waiting, or frees it """
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._queued -= 1
+                future.set_result(None)
+                return
+        self._active -= 1
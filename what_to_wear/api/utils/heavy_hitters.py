@@ -0,0 +1,74 @@
+import heapq
+import itertools
+from typing import Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+
+class HeavyHitters(Generic[V]):
+    """
+    Bounded sketch of the most frequent keys (Space-Saving algorithm). Tracks at most 'capacity'
+    keys; a new key replaces the least counted one and inherits its count, so counts may be
+    overestimated but frequent keys are never lost. Each key carries the latest payload added
+    with it.
+
+    The least counted key is found through a min-heap holding one entry per key. Entries are not
+    updated on increments, only when they reach the top with an outdated count, so add() costs
+    O(log capacity) amortized.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: dict[Hashable, int] = {}
+        self._payloads: dict[Hashable, V] = {}
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key: Hashable, payload: V) -> None:
+        if key in self._counts:
+            self._counts[key] += 1
+        elif len(self._counts) < self.capacity:
+            self._counts[key] = 1
+            self._push(key)
+        else:
+            evicted = self._pop_least_counted()
+            self._counts[key] = self._counts.pop(evicted) + 1
+            del self._payloads[evicted]
+            self._push(key)
+        self._payloads[key] = payload
+
+    def _push(self, key: Hashable) -> None:
+        heapq.heappush(self._heap, (self._counts[key], next(self._sequence), key))
+
+    def _pop_least_counted(self) -> Hashable:
+        """ Counts only grow between rebuilds, so an entry is a lower bound of its key's count """
+        while True:
+            count, _, key = heapq.heappop(self._heap)
+            if count == self._counts[key]:
+                return key
+            self._push(key)
+
+    def top(self, n: int) -> list[tuple[V, int]]:
+        """ The payloads of the 'n' most frequent keys, with their counts """
+        keys = sorted(self._counts, key=self._counts.__getitem__, reverse=True)[:n]
+        return [(self._payloads[key], self._counts[key]) for key in keys]
+
+    def decay(self, factor: float = 0.5) -> None:
+        """ Scales all counts down, so the ranking follows recent traffic. Keys at 0 are removed """
+        for key in list(self._counts):
+            count = int(self._counts[key] * factor)
+            if count:
+                self._counts[key] = count
+            else:
+                del self._counts[key]
+                del self._payloads[key]
+        self._heap = [(count, next(self._sequence), key) for key, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    def clear(self) -> None:
+        self._counts.clear()
+        self._payloads.clear()
+        self._heap.clear()
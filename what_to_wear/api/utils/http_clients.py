@@ -0,0 +1,78 @@
+from contextlib import asynccontextmanager
+from enum import Enum
+from importlib.util import find_spec
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from what_to_wear.api.utils.constants import (
+    HTTP2_ENABLED,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_API_CONNECT_TIMEOUT,
+    LLM_API_TIMEOUT,
+    WEATHER_API_CONNECT_TIMEOUT,
+    WEATHER_API_TIMEOUT,
+)
+
+
+class UpstreamEnum(str, Enum):
+    WEATHER = "WEATHER"
+    LLM = "LLM"
+
+
+_TIMEOUTS = {
+    UpstreamEnum.WEATHER: httpx.Timeout(WEATHER_API_TIMEOUT, connect=WEATHER_API_CONNECT_TIMEOUT),
+    UpstreamEnum.LLM: httpx.Timeout(LLM_API_TIMEOUT, connect=LLM_API_CONNECT_TIMEOUT),
+}
+
+_clients: dict[UpstreamEnum, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    """ HTTP/2 needs the optional 'h2' package (httpx[http2]) """
+    return HTTP2_ENABLED and find_spec("h2") is not None
+
+
+def create_client(upstream: UpstreamEnum) -> httpx.AsyncClient:
+    """ Builds a client tuned for one upstream: keep-alive pool, timeouts and optional HTTP/2 """
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=_TIMEOUTS[upstream], http2=_http2_available())
+
+
+async def open_http_clients() -> None:
+    """ Creates the application-scoped clients. Called from the app lifespan on startup """
+    for upstream in UpstreamEnum:
+        if upstream not in _clients:
+            _clients[upstream] = create_client(upstream)
+
+
+async def close_http_clients() -> None:
+    """ Closes all application-scoped clients. Called from the app lifespan on shutdown """
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+def get_http_client(upstream: UpstreamEnum) -> Optional[httpx.AsyncClient]:
+    return _clients.get(upstream)
+
+
+@asynccontextmanager
+async def use_http_client(upstream: UpstreamEnum) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Yields the pooled client for the upstream. Outside of the app lifespan (scripts, unit tests)
+    a short-lived client with the same settings is used instead.
+    """
+    client = _clients.get(upstream)
+    if client is not None:
+        yield client
+        return
+
+    async with create_client(upstream) as client:
+        yield client
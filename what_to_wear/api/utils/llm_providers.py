@@ -0,0 +1,131 @@
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from what_to_wear.api.utils.constants import (
+    LLM_API_KEY,
+    LLM_API_URL,
+    LLM_FAILURE_PENALTY_SECONDS,
+    LLM_HEDGE_DELAY_SECONDS,
+    LLM_LATENCY_MAX_AGE_SECONDS,
+    LLM_PRIMARY_WEIGHT,
+    LLM_SECONDARY_API_KEY,
+    LLM_SECONDARY_API_URL,
+    LLM_SECONDARY_MODEL,
+    LLM_SECONDARY_MODEL_TYPE,
+    LLM_SECONDARY_WEIGHT,
+    MODEL_TYPE,
+    LLMRoutingPolicyEnum,
+    ModelTypeEnum,
+)
+from what_to_wear.api.utils.llm_utils import get_model_params
+from what_to_wear.api.utils.resilience import LatencyTracker
+
+
+@dataclass
+class LLMProvider:
+    """
+    An endpoint serving a model: where requests go, which model id they ask for and how answers
+    are parsed
+    """
+    name: str
+    url: str
+    api_key: Optional[str]
+    model_type: ModelTypeEnum
+    model: str
+    weight: float = 1
+    latency: LatencyTracker = field(
+        default_factory=lambda: LatencyTracker(min_samples=5, max_age=LLM_LATENCY_MAX_AGE_SECONDS)
+    )
+    # When the provider last failed, unless it succeeded since:
+    failed_at: Optional[float] = None
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    @property
+    def failing(self) -> bool:
+        if self.failed_at is None:
+            return False
+        return time.monotonic() - self.failed_at < LLM_LATENCY_MAX_AGE_SECONDS
+
+    @property
+    def median_latency(self) -> float:
+        """ 0 while unknown, so new providers get tried. At least the failure penalty if failing """
+        median = self.latency.percentile(50) or 0
+        return max(median, LLM_FAILURE_PENALTY_SECONDS) if self.failing else median
+
+    @property
+    def hedge_delay(self) -> float:
+        """ The p90 of successful calls only, so failures do not delay hedging """
+        return self.latency.percentile(90) or LLM_HEDGE_DELAY_SECONDS
+
+    def record_success(self, seconds: Optional[float] = None) -> None:
+        """ Without 'seconds' (e.g. for streams), only clears the failure """
+        if seconds is not None:
+            self.latency.record(seconds)
+        self.failed_at = None
+
+    def record_failure(self) -> None:
+        self.failed_at = time.monotonic()
+
+
+class LLMProviderRegistry:
+    """ The configured providers, and the routing policies choosing among those serving a model """
+
+    def __init__(self, providers: list[LLMProvider]):
+        self.providers = providers
+
+    def register(self, provider: LLMProvider) -> None:
+        self.providers.append(provider)
+
+    def get_providers(self, model_type: ModelTypeEnum) -> list[LLMProvider]:
+        """
+        Providers serving the model. Models without any are sent to the primary endpoint, through a
+        provider registered on first use, so its latency is tracked
+        """
+        providers = [provider for provider in self.providers if provider.model_type == model_type]
+        if providers:
+            return providers
+        provider = LLMProvider(
+            "primary", LLM_API_URL, LLM_API_KEY, model_type, get_model_params(model_type)
+        )
+        self.register(provider)
+        return [provider]
+
+    def choose(self, model_type: ModelTypeEnum, policy: LLMRoutingPolicyEnum) -> list[LLMProvider]:
+        """ The providers to call, in order. Only HEDGED returns more than one """
+        providers = self.get_providers(model_type)
+        if policy == LLMRoutingPolicyEnum.WEIGHTED:
+            return random.choices(providers, weights=[provider.weight for provider in providers])
+        if policy == LLMRoutingPolicyEnum.LATENCY:
+            return [min(providers, key=lambda provider: provider.median_latency)]
+        if policy == LLMRoutingPolicyEnum.HEDGED:
+            return sorted(providers, key=lambda provider: provider.median_latency)[:2]
+        return providers[:1]
+
+    def clear_latencies(self) -> None:
+        for provider in self.providers:
+            provider.latency.clear()
+            provider.failed_at = None
+
+
+def build_llm_providers() -> LLMProviderRegistry:
+    """ Registry with the primary provider and, if configured, the secondary one """
+    registry = LLMProviderRegistry([
+        LLMProvider(
+            "primary", LLM_API_URL, LLM_API_KEY, MODEL_TYPE, get_model_params(MODEL_TYPE),
+            LLM_PRIMARY_WEIGHT
+        )
+    ])
+    if LLM_SECONDARY_API_URL:
+        registry.register(LLMProvider(
+            "secondary", LLM_SECONDARY_API_URL, LLM_SECONDARY_API_KEY, LLM_SECONDARY_MODEL_TYPE,
+            LLM_SECONDARY_MODEL, LLM_SECONDARY_WEIGHT
+        ))
+    return registry
+
+
+llm_providers = build_llm_providers()
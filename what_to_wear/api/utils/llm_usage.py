@@ -0,0 +1,50 @@
+from dataclasses import dataclass, field
+from typing import Hashable, Optional
+
+from what_to_wear.api.utils.llm_utils import LLMCompletion
+from what_to_wear.api.utils.resilience import LatencyTracker
+from what_to_wear.api.utils.utils import estimate_tokens
+
+
+@dataclass
+class LLMUsageStats:
+    """ Upstream LLM calls for one kind of request. 'estimated_calls' reported no token usage """
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated_calls: int = 0
+    latency: LatencyTracker = field(default_factory=lambda: LatencyTracker(min_samples=1))
+
+    @property
+    def latency_p50(self) -> Optional[float]:
+        return self.latency.percentile(50)
+
+    @property
+    def latency_p95(self) -> Optional[float]:
+        return self.latency.percentile(95)
+
+
+class LLMUsageTracker:
+    """ Token usage and latency of LLM calls, per request type """
+
+    def __init__(self):
+        self._stats: dict[Hashable, LLMUsageStats] = {}
+
+    def record(self, key: Hashable, prompt: str, completion: LLMCompletion, seconds: float) -> None:
+        """ Records one call. Token counts the provider left out are estimated from the texts """
+        stats = self._stats.setdefault(key, LLMUsageStats())
+        stats.calls += 1
+        reported = completion.prompt_tokens is not None and completion.completion_tokens is not None
+        stats.prompt_tokens += completion.prompt_tokens if reported else estimate_tokens(prompt)
+        stats.completion_tokens += (
+            completion.completion_tokens if reported else estimate_tokens(completion.content)
+        )
+        stats.estimated_calls += not reported
+        stats.latency.record(seconds)
+
+    @property
+    def stats(self) -> dict[Hashable, LLMUsageStats]:
+        return dict(self._stats)
+
+    def clear(self) -> None:
+        self._stats.clear()
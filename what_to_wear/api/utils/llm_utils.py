@@ -1,30 +1,71 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Union
 
-from what_to_wear.api.models.schemas.mistral_llm_response import MistralLlmResponse
+from what_to_wear.api.models.schemas.mistral_llm_response import (
+    MistralLlmResponse,
+    MistralLlmStreamChunk,
+)
 from what_to_wear.api.utils.constants import MODEL_PARAMS, ModelTypeEnum, NoModelSelectedException
 
+SSE_DATA_PREFIX = "data:"
+SSE_DONE = "[DONE]"
+
+
+@dataclass
+class LLMCompletion:
+    """ The content of an LLM response, with its token usage when the provider reports it """
+    content: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
 
 class LLMResponseParser(ABC):
     """ Abstract class to obtain a parser for the content of different LLM responses """
 
     @abstractmethod
-    def get_content(self, llm_response: dict) -> str:
+    def get_content(self, llm_response: Union[bytes, str]) -> str:
         pass
 
+    @abstractmethod
+    def get_completion(self, llm_response: Union[bytes, str]) -> LLMCompletion:
+        pass
+
+    @abstractmethod
+    def get_stream_content(self, chunk: Union[bytes, str]) -> Optional[str]:
+        """ Gets the content delta of one streamed chunk (an SSE 'data:' line payload), if any """
+
 
 class MistralResponseParser(LLMResponseParser):
-    """ Parser implementation for Mistral LLM """
+    """ Parser implementation for Mistral LLM. Validates raw bodies straight into the model """
+
+    @staticmethod
+    def get_content(llm_response: Union[bytes, str]) -> str:
+        return MistralLlmResponse.model_validate_json(llm_response).choices[0].message.content
+
+    @staticmethod
+    def get_completion(llm_response: Union[bytes, str]) -> LLMCompletion:
+        response = MistralLlmResponse.model_validate_json(llm_response)
+        usage = response.usage
+        return LLMCompletion(
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else None,
+            usage.completion_tokens if usage else None,
+        )
 
     @staticmethod
-    def get_content(llm_response: MistralLlmResponse) -> str:
-        return llm_response["choices"][0]["message"]["content"]
+    def get_stream_content(chunk: Union[bytes, str]) -> Optional[str]:
+        choices = MistralLlmStreamChunk.model_validate_json(chunk).choices
+        return choices[0].delta.content if choices else None
 
 
 class LLMResponseParserFactory:
     """ To obtain specific parser implementation """
     # NOTE - add new parsers when a new model is added:
     _parsers = {
-        ModelTypeEnum.MISTRAL: MistralResponseParser
+        ModelTypeEnum.MISTRAL: MistralResponseParser,
+        ModelTypeEnum.MISTRAL_NEMO: MistralResponseParser,
+        ModelTypeEnum.MISTRAL_SMALL: MistralResponseParser,
     }
 
     @classmethod
@@ -34,12 +75,38 @@ class LLMResponseParserFactory:
         raise NoModelSelectedException(f"No parser available for model: {model_type}")
 
 
-def get_content_from_llm_response(llm_response, model_type: ModelTypeEnum) -> str:
+def get_content_from_llm_response(
+    llm_response: Union[bytes, str], model_type: ModelTypeEnum
+) -> str:
     """ Gets the relevant (content) part of LLM responses: """
     parser = LLMResponseParserFactory.get_parser(model_type)
     return parser.get_content(llm_response)
 
 
+def get_completion_from_llm_response(
+    llm_response: Union[bytes, str], model_type: ModelTypeEnum
+) -> LLMCompletion:
+    """ Gets the content of LLM responses, with the token usage reported in them: """
+    parser = LLMResponseParserFactory.get_parser(model_type)
+    return parser.get_completion(llm_response)
+
+
+async def get_content_from_llm_stream(
+    lines: AsyncIterator[str], model_type: ModelTypeEnum
+) -> AsyncIterator[str]:
+    """ Yields the content deltas of a streamed (SSE) LLM response, read line by line """
+    parser = LLMResponseParserFactory.get_parser(model_type)
+    async for line in lines:
+        if not line.startswith(SSE_DATA_PREFIX):
+            continue
+        data = line.removeprefix(SSE_DATA_PREFIX).strip()
+        if data == SSE_DONE:
+            break
+        content = parser.get_stream_content(data)
+        if content:
+            yield content
+
+
 def get_model_params(model_type: ModelTypeEnum) -> str:
     """ Returns parameters for selected LLM, to be used in API calls """
     return MODEL_PARAMS.get(model_type)
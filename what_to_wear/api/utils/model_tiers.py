@@ -0,0 +1,66 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from what_to_wear.api.utils.constants import ModelTierEnum, ModelTypeEnum, RequestTypeEnum
+from what_to_wear.api.utils.resilience import LatencyTracker
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: ModelTierEnum
+    model_type: ModelTypeEnum
+    latency_slo: float
+
+
+class ModelSelector:
+    """
+    Chooses the model tier of a request from a policy table, by request type and prompt size.
+    Requests move to the next faster tier while the LLM queue is at least 'queue_ratio' full, or
+    while the observed p95 latency of their tier's model is over its SLO. 'tiers' are ordered
+    fastest first. Latencies older than 'max_age' seconds are forgotten: a tier skipped for its
+    latency gets no new samples, so this is what sends requests back to it.
+    """
+
+    def __init__(
+        self,
+        tiers: list[ModelTier],
+        policy: dict[RequestTypeEnum, tuple[tuple[float, ModelTierEnum], ...]],
+        queue_ratio: float,
+        max_age: Optional[float] = None
+    ):
+        self.tiers = tiers
+        self.policy = policy
+        self.queue_ratio = queue_ratio
+        self.latency: defaultdict[ModelTypeEnum, LatencyTracker] = defaultdict(
+            lambda: LatencyTracker(max_age=max_age)
+        )
+        # Requests moved off each tier:
+        self.downgrades: Counter[ModelTierEnum] = Counter()
+
+    def preferred(self, type: RequestTypeEnum, prompt_tokens: int) -> ModelTier:
+        """ The tier the policy gives the request, regardless of load """
+        tier_name = next(
+            tier for max_tokens, tier in self.policy[type] if prompt_tokens <= max_tokens
+        )
+        return next(tier for tier in self.tiers if tier.name == tier_name)
+
+    def choose(self, type: RequestTypeEnum, prompt_tokens: int, queue_load: float) -> ModelTier:
+        tier = self.preferred(type, prompt_tokens)
+        index = self.tiers.index(tier)
+        while index and (queue_load >= self.queue_ratio or self.misses_slo(self.tiers[index])):
+            index -= 1
+        if self.tiers[index] != tier:
+            self.downgrades[tier.name] += 1
+        return self.tiers[index]
+
+    def misses_slo(self, tier: ModelTier) -> bool:
+        p95 = self.latency[tier.model_type].percentile(95)
+        return p95 is not None and p95 > tier.latency_slo
+
+    def record(self, model_type: ModelTypeEnum, seconds: float) -> None:
+        self.latency[model_type].record(seconds)
+
+    def clear(self) -> None:
+        self.latency.clear()
+        self.downgrades.clear()
@@ -0,0 +1,163 @@
+import asyncio
+import random
+import time
+from collections import deque
+from enum import Enum
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitStateEnum(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after 'failure_threshold' consecutive failures. After 'reset_timeout'
+    seconds a single probe request is let through (half-open), the others are still rejected: its
+    success closes the circuit, its failure opens it again. A probe that never reports back is
+    replaced after another 'reset_timeout' seconds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.reset()
+
+    def reset(self) -> None:
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> CircuitStateEnum:
+        if self.opened_at is None:
+            return CircuitStateEnum.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return CircuitStateEnum.OPEN
+        return CircuitStateEnum.HALF_OPEN
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state != CircuitStateEnum.HALF_OPEN:
+            return state == CircuitStateEnum.CLOSED
+        now = time.monotonic()
+        if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+            return False
+        self.probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.reset()
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == CircuitStateEnum.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probe_started_at = None
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of the requests made: every request deposits 'ratio' tokens
+    (up to 'max_tokens') and every retry withdraws one. Keeps retries from multiplying the load
+    on an upstream that is already struggling.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.reset()
+
+    def reset(self) -> None:
+        self.tokens = self.max_tokens
+
+    def record_request(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class LatencyTracker:
+    """
+    Sliding window of observed latencies (in seconds) of upstream calls. With 'max_age', samples
+    older than that many seconds are forgotten too
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, max_age: Optional[float] = None):
+        self.min_samples = min_samples
+        self.max_age = max_age
+        # (recorded at, latency) pairs, oldest first:
+        self._samples: deque[tuple[float, float]] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append((time.monotonic(), seconds))
+
+    def clear(self) -> None:
+        self._samples.clear()
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._samples)
+
+    def _expire(self) -> None:
+        if self.max_age is None:
+            return
+        oldest = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < oldest:
+            self._samples.popleft()
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """ Returns the given percentile (0-100), or None while there are too few samples """
+        if len(self) < self.min_samples:
+            return None
+        ordered = sorted(seconds for _, seconds in self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+    def adaptive_timeout(self, multiplier: float, min_timeout: float, max_timeout: float) -> float:
+        """ A timeout of 'multiplier' times the observed p99, clamped. Falls back to the maximum """
+        p99 = self.percentile(99)
+        if p99 is None:
+            return max_timeout
+        return max(min_timeout, min(max_timeout, p99 * multiplier))
+
+
+def jittered_backoff(attempt: int, base_delay: float, max_delay: float) -> float:
+    """ Exponential backoff with full jitter, for the given (zero based) retry attempt """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+async def hedge(calls: list[Callable[[], Awaitable[T]]], delay: float) -> T:
+    """
+    Starts the first call, and the next one whenever the previous has failed or not succeeded
+    within 'delay' seconds. The first success wins and the calls still running are cancelled.
+    Raises the first error if all calls fail.
+    """
+    pending: set[asyncio.Task] = set()
+    errors = []
+    try:
+        for index, call in enumerate(calls):
+            pending.add(asyncio.ensure_future(call()))
+            timeout = None if index == len(calls) - 1 else delay
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+                if timeout is not None:
+                    break
+        raise errors[0]
+    finally:
+        for task in pending:
+            task.cancel()
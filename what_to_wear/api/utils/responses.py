@@ -0,0 +1,91 @@
+import logging
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from what_to_wear.api.models.schemas.json_cached_model import JSONCachedModel
+
+logger = logging.getLogger(__name__)
+
+STALE_WARNING = '110 - "Response is Stale"'
+
+
+class ModelJSONResponse(JSONResponse):
+    """ JSON response serializing pydantic models straight to bytes, skipping dict + json.dumps """
+
+    def __init__(self, content: Any, projection: str = "full", **kwargs):
+        self.projection = projection
+        super().__init__(content, **kwargs)
+        if isinstance(content, JSONCachedModel) and content.is_stale:
+            self.headers["Warning"] = STALE_WARNING
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, JSONCachedModel):
+            return content.to_json_bytes(self.projection)
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        return super().render(content)
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    Relays text chunks as Server-Sent Events, ending with a 'done' (or 'error') event.
+    The 'prelude' events, already formatted, are sent before the chunks
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[str],
+        prelude: tuple[str, ...] = (),
+        status_code: int = 200,
+        **kwargs
+    ):
+        headers = {
+            "Cache-Control": "no-cache", "X-Accel-Buffering": "no", **kwargs.pop("headers", {})
+        }
+        super().__init__(
+            self._events(chunks, prelude), status_code=status_code, headers=headers, **kwargs
+        )
+
+    @classmethod
+    async def start(cls, chunks: AsyncIterator[str], **kwargs) -> "EventStreamResponse":
+        """
+        Waits for the first chunk before responding, so failures before the stream starts
+        are still reported with a proper status code
+        """
+        first_chunk = await anext(chunks, None)
+
+        async def replay() -> AsyncIterator[str]:
+            if first_chunk is not None:
+                yield first_chunk
+            async for chunk in chunks:
+                yield chunk
+
+        return cls(replay(), **kwargs)
+
+    @staticmethod
+    async def _events(chunks: AsyncIterator[str], prelude: tuple[str, ...]) -> AsyncIterator[str]:
+        for event in prelude:
+            yield event
+        try:
+            async for chunk in chunks:
+                yield format_event(chunk)
+        except HTTPException as e:
+            yield format_event(str(e.detail), event="error")
+            return
+        except Exception as e:
+            logger.exception("Event stream failed")
+            yield format_event(str(e), event="error")
+            return
+        yield format_event("", event="done")
+
+
+def format_event(data: str, event: Optional[str] = None) -> str:
+    """ Formats one SSE message. Multi-line data is split over several 'data:' fields """
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
@@ -1,45 +1,100 @@
+import math
+from typing import Union
+
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
-from what_to_wear.api.models.schemas.forecast_weather import DayForecast, ForecastWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import (
+    DayForecast,
+    ForecastDay,
+    ForecastDaySummary,
+    ForecastWeatherResponse,
+)
+from what_to_wear.api.utils.constants import LLM_PROMPT_MAX_TOKENS
+
+# Rough average for English text with numbers, as counted by common LLM tokenizers:
+CHARS_PER_TOKEN = 4
+
+# Prompt templates, kept on one line each: indentation and blank lines would only cost tokens.
+# The '.format_map' methods are bound once, so building a prompt is a single formatting pass.
+render_current_prompt = (
+    "Recommend what to wear in this weather, concisely and without repeating it: "
+    "{temp_c}°C, feels like {feelslike_c}°C, humidity {humidity}%, wind {wind_kph} km/h, "
+    "precipitation {precip_mm} mm, pressure {pressure_mb} mbar, {time_of_day}."
+).format_map
+
+DAY_FIELDS = (
+    "avg {avgtemp_c}°C, max {maxtemp_c}°C, min {mintemp_c}°C, humidity {avghumidity}%, "
+    "precipitation {totalprecip_mm} mm, rain chance {daily_chance_of_rain}%, UV {uv}"
+)
+render_day_prompt = (
+    "Recommend what to wear on a day with this forecast, concisely and without repeating it: "
+    + DAY_FIELDS + "."
+).format_map
+render_day_line = ("{date}: " + DAY_FIELDS).format_map
+render_short_day_line = (
+    "{date}: {mintemp_c:.0f}-{maxtemp_c:.0f}°C, rain chance {daily_chance_of_rain}%, UV {uv:.0f}"
+).format_map
+render_days_line = (
+    "{first_date} to {last_date}: {mintemp_c:.0f}-{maxtemp_c:.0f}°C, "
+    "rain chance up to {daily_chance_of_rain}%, UV up to {uv:.0f}"
+).format_map
+
+FORECAST_PROMPT_HEADER = (
+    "Recommend what to wear on each day, concisely, one line per day starting with its date, "
+    "without repeating the forecast:"
+)
+
 
+def estimate_tokens(text: str) -> int:
+    """ Local token count estimate, without the model's tokenizer """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
 
-def generate_clothes_recommendation_prompt_current_weather(weather_data: CurrentWeatherResponse) -> str:
+
+def generate_clothes_recommendation_prompt_current_weather(
+    weather_data: CurrentWeatherResponse
+) -> str:
     """ Gets a llm prompt for one current weather clothes recommendation """
-    return f"""
-        Based on the following weather conditions, provide a direct clothing recommendation,
-        without repeating the details:
-        - Temperature: {weather_data.current.temp_c}°C
-        - Feels Like: {weather_data.current.feelslike_c}°C
-        - Pressure: {weather_data.current.pressure_mb} mbar
-        - Humidity: {weather_data.current.humidity}%
-        - Wind Speed: {weather_data.current.wind_kph} km/h
-        - Precipitation: {weather_data.current.precip_mm} mm
-        - Time of Day: {"Daytime" if weather_data.current.is_day else "Evening"}
-
-    Only give the recommended clothing choices concisely.
-    """
+    current = weather_data.current
+    time_of_day = "daytime" if current.is_day else "evening"
+    return render_current_prompt({**current.__dict__, "time_of_day": time_of_day})
+
 
+def generate_clothes_recommendation_prompt_forecast_day(daily_data: DayForecast) -> str:
+    """ Gets a llm prompt for one forecasted day's clothes recommendation, without its date """
+    return render_day_prompt(daily_data.__dict__)
 
-def generate_individual_forecast_prompt(daily_data: DayForecast) -> str:
-    """ Gets a llm prompt for each day with forecasted weather """
-    return f"""
-        - Average Temperature: {daily_data.avgtemp_c}°C
-        - Max Temperature: {daily_data.maxtemp_c}°C
-        - Min Temperature: {daily_data.mintemp_c}°C
-        - Average Humidity: {daily_data.avghumidity}%
-        - Total Precipitation: {daily_data.totalprecip_mm} mm
-        - Chance of rain: {daily_data.daily_chance_of_rain}
-        - UV radiation levels: {daily_data.uv}
+
+def generate_clothes_recommendation_prompt_forecast(
+    weather_data: ForecastWeatherResponse,
+    max_tokens: int = LLM_PROMPT_MAX_TOKENS
+) -> str:
+    """
+    Gets a llm prompt for all forecasted days, one line each. Over the 'max_tokens' budget, days get
+    fewer details, then the last days are merged into a single line, as many as needed
     """
+    days = weather_data.forecast.forecastday
+    for render_line in (render_day_line, render_short_day_line):
+        lines = [render_line({**day.day.__dict__, "date": day.date}) for day in days]
+        prompt = "\n".join([FORECAST_PROMPT_HEADER, *lines])
+        if estimate_tokens(prompt) <= max_tokens:
+            return prompt
+
+    for detailed in range(len(days) - 1, -1, -1):
+        lines = [
+            render_short_day_line({**day.day.__dict__, "date": day.date}) for day in days[:detailed]
+        ]
+        prompt = "\n".join([FORECAST_PROMPT_HEADER, *lines, aggregate_days_line(days[detailed:])])
+        if estimate_tokens(prompt) <= max_tokens:
+            break
+    return prompt
 
 
-def generate_clothes_recommendation_prompt_forecast(weather_data: ForecastWeatherResponse) -> str:
-    """ Consolidates a llm prompt for all forecasted days to obtain clothes recommendation """
-    final_prompt = """
-            Based on the following weather conditions for each day, provide a direct clothing
-            recommendation for each day, without repeating the details.
-            Only give the recommended clothing choices concisely:
-        """
-    for day in weather_data.forecast.forecastday:
-        day_prompt = generate_individual_forecast_prompt(day.day)
-        final_prompt += f" .Day: {day.date}: {day_prompt}"
-    return final_prompt
+def aggregate_days_line(days: list[Union[ForecastDay, ForecastDaySummary]]) -> str:
+    """ One line for consecutive forecasted days: temperature range, worst rain chance and UV """
+    return render_days_line({
+        "first_date": days[0].date,
+        "last_date": days[-1].date,
+        "mintemp_c": min(day.day.mintemp_c for day in days),
+        "maxtemp_c": max(day.day.maxtemp_c for day in days),
+        "daily_chance_of_rain": max(day.day.daily_chance_of_rain for day in days),
+        "uv": max(day.day.uv for day in days),
+    })
@@ -5,13 +5,34 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from what_to_wear.api import routes
 from what_to_wear.api.database.db import init_db
-from what_to_wear.api.utils.constants import ORIGINS
+from what_to_wear.api.services.prewarm_service import start_prewarm_scheduler
+from what_to_wear.api.services.recommendation_job_service import start_job_workers, stop_job_workers
+from what_to_wear.api.services.recommendation_store_service import start_recommendation_purger
+from what_to_wear.api.utils.background import background_tasks
+from what_to_wear.api.utils.constants import (
+    ORIGINS,
+    RECOMMENDATION_STORE_ENABLED,
+    WEATHER_PREWARM_ENABLED,
+)
+from what_to_wear.api.utils.http_clients import close_http_clients, open_http_clients
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    yield
+    await open_http_clients()
+    background_tasks.start()
+    start_job_workers()
+    if WEATHER_PREWARM_ENABLED:
+        start_prewarm_scheduler()
+    if RECOMMENDATION_STORE_ENABLED:
+        start_recommendation_purger()
+    try:
+        yield
+    finally:
+        stop_job_workers()
+        await background_tasks.stop()
+        await close_http_clients()
 
 
 app = FastAPI(
@@ -0,0 +1,72 @@
+import copy
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from what_to_wear.api.database.db import init_db
+from what_to_wear.api.services.auth_service import revoked_tokens, token_cache, user_cache
+from what_to_wear.api.services.location_service import location_aliases, unknown_locations
+from what_to_wear.api.services.recommendation_job_service import job_workers
+from what_to_wear.api.services.recommendation_service import (
+    llm_dispatcher,
+    llm_usage,
+    model_selector,
+    recommendation_cache,
+    recommendation_sources,
+)
+from what_to_wear.api.services.weather_service import (
+    weather_cache,
+    weather_circuit_breaker,
+    weather_fallback_cache,
+    weather_latency,
+    weather_retry_budget,
+)
+from what_to_wear.api.utils.llm_providers import llm_providers
+
+MOCK_DATA = Path(__file__).parent / "mock_data"
+MOCK_FORECAST_WEATHER_RESPONSE = json.loads(
+    (MOCK_DATA / "mock_forecast_weather_response.json").read_text(encoding="utf-8")
+)
+
+CACHES = (
+    weather_cache, weather_fallback_cache, location_aliases, unknown_locations,
+    recommendation_cache, user_cache, token_cache,
+)
+
+
+def build_multi_day_forecast(days: int) -> dict:
+    """ The mock forecast response, with its first day repeated over 'days' consecutive dates """
+    forecast_day = MOCK_FORECAST_WEATHER_RESPONSE["forecast"]["forecastday"][0]
+    return {**MOCK_FORECAST_WEATHER_RESPONSE, "forecast": {"forecastday": [
+        {**copy.deepcopy(forecast_day), "date": f"2022-01-{day + 1:02d}"} for day in range(days)
+    ]}}
+
+
+def reset_state():
+    for cache in CACHES:
+        cache.clear()
+    weather_circuit_breaker.reset()
+    weather_retry_budget.reset()
+    weather_latency.clear()
+    llm_dispatcher.reset()
+    recommendation_sources.clear()
+    llm_usage.clear()
+    model_selector.clear()
+    revoked_tokens.clear()
+    llm_providers.clear_latencies()
+    job_workers.durations.clear()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def database():
+    init_db()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    reset_state()
+    with patch("what_to_wear.api.services.weather_service.WEATHER_RETRY_BASE_DELAY", 0):
+        yield
+    reset_state()
@@ -5,6 +5,8 @@ import pytest
 from fastapi.testclient import TestClient
 
 from what_to_wear.api.controllers.auth_controller import router
+from what_to_wear.api.models.db_models.user import User
+from what_to_wear.api.services.auth_service import create_access_token
 from what_to_wear.main import app
 
 client = TestClient(app)
@@ -43,7 +45,8 @@ async def test_register_user_server_error():
 async def test_login_success():
     mock_user = type("User", (), {"username": "testuser"})()
 
-    with patch("what_to_wear.api.controllers.auth_controller.authenticate_user", return_value=mock_user), \
+    with patch("what_to_wear.api.controllers.auth_controller.authenticate_user",
+               new_callable=AsyncMock, return_value=mock_user), \
          patch("what_to_wear.api.controllers.auth_controller.create_access_token", return_value="mock_token"):
 
         response = client.post("/auth/login", json={"username": "testuser", "password": "securepassword"})
@@ -54,8 +57,22 @@ async def test_login_success():
 
 @pytest.mark.asyncio
 async def test_login_invalid_credentials():
-    with patch("what_to_wear.api.controllers.auth_controller.authenticate_user", return_value=None):
+    with patch("what_to_wear.api.controllers.auth_controller.authenticate_user",
+               new_callable=AsyncMock, return_value=None):
 
         response = client.post("/auth/login", json={"username": "testuser", "password": "wrongpassword"})
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json()["detail"] == "Incorrect username or password"
+
+
+def test_logout_revokes_the_token():
+    token = create_access_token({"sub": "testuser"})
+    headers = {"Authorization": f"Bearer {token}"}
+    user = User(username="testuser", hashed_password="hashed")
+
+    with patch("what_to_wear.api.services.auth_service.get_user_by_username", return_value=user):
+        response = client.post("/auth/logout", headers=headers)
+        assert response.status_code == HTTPStatus.OK
+
+        response = client.post("/auth/logout", headers=headers)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
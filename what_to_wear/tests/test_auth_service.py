@@ -1,22 +1,30 @@
+import threading
 from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import jwt
 import pytest
 from fastapi import HTTPException
+from passlib.hash import bcrypt
 from sqlmodel import Session
 
 from what_to_wear.api.models.db_models.user import User
 from what_to_wear.api.services.auth_service import (
     authenticate_user,
     create_access_token,
+    decode_token,
     get_current_user,
     get_password_hash,
     get_user_by_username,
+    hash_password,
+    invalidate_user,
+    revoke_token,
+    revoked_tokens,
+    token_cache,
     verify_password,
 )
-from what_to_wear.api.utils.constants import ALGORITHM, SECRET_KEY
+from what_to_wear.api.utils.constants import ALGORITHM, BCRYPT_ROUNDS, SECRET_KEY
 
 
 @pytest.fixture
@@ -49,17 +57,57 @@ def test_get_user_by_username(mock_session, test_user):
     assert user.username == "testuser"
 
 
-def test_authenticate_user_success(mock_session, test_user):
+@pytest.mark.asyncio
+async def test_authenticate_user_success(mock_session, test_user):
     mock_session.exec.return_value.first.return_value = test_user
-    user = authenticate_user("testuser", "testpassword", mock_session)
+    user = await authenticate_user("testuser", "testpassword", mock_session)
     assert user is not False
     assert user.username == "testuser"
 
 
-def test_authenticate_user_failure(mock_session):
+@pytest.mark.asyncio
+async def test_authenticate_user_failure(mock_session):
     mock_session.exec.return_value.first.return_value = None
-    user = authenticate_user("invaliduser", "wrongpassword", mock_session)
+    user = await authenticate_user("invaliduser", "wrongpassword", mock_session)
+    assert user is False
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_wrong_password(mock_session, test_user):
+    mock_session.exec.return_value.first.return_value = test_user
+    user = await authenticate_user("testuser", "wrongpassword", mock_session)
     assert user is False
+    mock_session.commit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_rehashes_outdated_hashes(mock_session):
+    outdated_rounds = 4
+    outdated_hash = bcrypt.using(rounds=outdated_rounds).hash("testpassword")
+    user = User(username="testuser", hashed_password=outdated_hash)
+    mock_session.exec.return_value.first.return_value = user
+
+    assert await authenticate_user("testuser", "testpassword", mock_session) is user
+
+    assert user.hashed_password != outdated_hash
+    assert f"${BCRYPT_ROUNDS:02d}$" in user.hashed_password
+    assert verify_password("testpassword", user.hashed_password)
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_the_event_loop():
+    threads = []
+
+    def record_thread(raw_password: str) -> str:
+        threads.append(threading.current_thread().name)
+        return "hashed"
+
+    with patch("what_to_wear.api.services.auth_service.get_password_hash",
+               side_effect=record_thread):
+        assert await hash_password("testpassword") == "hashed"
+
+    assert threads[0].startswith("password-hash")
 
 
 def test_create_access_token():
@@ -113,3 +161,77 @@ async def test_get_current_user_nonexistent_user(mock_session):
         await get_current_user(token, mock_session)
     assert exc_info.value.status_code == HTTPStatus.UNAUTHORIZED
     assert "Could not validate credentials" in exc_info.value.detail
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_users_and_tokens(mock_session, test_user):
+    token = create_access_token({"sub": "testuser"})
+    mock_session.exec.return_value.first.return_value = test_user
+
+    first = await get_current_user(token, mock_session)
+    with patch("what_to_wear.api.services.auth_service.jwt.decode") as mock_decode:
+        second = await get_current_user(token, mock_session)
+
+    assert first.username == second.username == "testuser"
+    assert first is not test_user
+    mock_session.exec.assert_called_once()
+    mock_decode.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_changed_users_are_looked_up_again(mock_session, test_user):
+    token = create_access_token({"sub": "testuser"})
+    mock_session.exec.return_value.first.return_value = test_user
+    await get_current_user(token, mock_session)
+
+    invalidate_user("testuser")
+    await get_current_user(token, mock_session)
+
+    expected_lookups = 2
+    assert mock_session.exec.call_count == expected_lookups
+
+
+@pytest.mark.asyncio
+async def test_stateless_mode_trusts_token_claims(mock_session):
+    token = create_access_token({"sub": "testuser"})
+    with patch("what_to_wear.api.services.auth_service.AUTH_STATELESS", True):
+        user = await get_current_user(token, mock_session)
+
+    assert user.username == "testuser"
+    mock_session.exec.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_revoked_tokens_are_rejected(mock_session, test_user):
+    token = create_access_token({"sub": "testuser"})
+    other_token = create_access_token({"sub": "testuser"})
+    mock_session.exec.return_value.first.return_value = test_user
+    await get_current_user(token, mock_session)
+
+    revoke_token(token)
+
+    for stateless in (False, True):
+        with patch("what_to_wear.api.services.auth_service.AUTH_STATELESS", stateless), \
+             pytest.raises(HTTPException) as exc_info:
+            await get_current_user(token, mock_session)
+        assert exc_info.value.status_code == HTTPStatus.UNAUTHORIZED
+    assert (await get_current_user(other_token, mock_session)).username == "testuser"
+    assert len(revoked_tokens) == 1
+
+
+def test_revocations_are_shared_through_the_database():
+    token = create_access_token({"sub": "testuser"})
+    assert decode_token(token) is not None
+
+    revoke_token(token)
+    # Another process, which has not seen this token yet:
+    revoked_tokens.clear()
+    token_cache.clear()
+
+    assert decode_token(token) is None
+    assert len(revoked_tokens) == 1
+
+
+def test_tokens_without_subject_are_invalid():
+    token = create_access_token({"role": "admin"})
+    assert decode_token(token) is None
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from what_to_wear.api.utils.cache import TTLCache
+
+
+def test_ttl_cache_hit_and_miss_counters():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("berlin", 1)
+
+    assert cache.get("berlin") == 1
+    assert cache.get("paris") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+    expected_hit_ratio = 0.5
+    assert cache.stats.hit_ratio == expected_hit_ratio
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+    with patch("what_to_wear.api.utils.cache.time.monotonic", return_value=100.0):
+        cache.set("berlin", 1)
+        cache.set("paris", 2, ttl=10)
+
+    with patch("what_to_wear.api.utils.cache.time.monotonic", return_value=130.0):
+        assert cache.get("berlin") == 1
+        assert cache.get("paris") is None
+    assert len(cache) == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("berlin", 1)
+    cache.set("paris", 2)
+    cache.get("berlin")
+    cache.set("rome", 3)
+
+    assert cache.get("paris") is None
+    assert cache.get("berlin") == 1
+    assert cache.get("rome") is not None
+
+
+def test_ttl_cache_keeps_expired_entries_within_staleness_window():
+    cache = TTLCache(maxsize=10, ttl=60, max_stale=30)
+    with patch("what_to_wear.api.utils.cache.time.monotonic", return_value=100.0):
+        cache.set("berlin", 1)
+
+    with patch("what_to_wear.api.utils.cache.time.monotonic", return_value=170.0):
+        assert cache.get("berlin") is None
+        entry = cache.get_entry("berlin")
+        assert entry.value == 1
+        assert not entry.is_fresh
+        assert cache.stats.stale_hits == 1
+
+    with patch("what_to_wear.api.utils.cache.time.monotonic", return_value=191.0):
+        assert cache.get_entry("berlin") is None
+    assert len(cache) == 0
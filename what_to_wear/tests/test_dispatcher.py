@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from what_to_wear.api.utils.constants import QueueFullException, QueueTimeoutException
+from what_to_wear.api.utils.dispatcher import Dispatcher
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_limits_concurrency():
+    dispatcher = Dispatcher(max_concurrency=2, max_queue=10, queue_timeout=1)
+    running = max_running = 0
+
+    async def call():
+        nonlocal running, max_running
+        async with dispatcher.slot():
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+
+    expected_max_running, expected_admitted = 2, 6
+    assert max_running == expected_max_running
+    assert dispatcher.stats.admitted == expected_admitted
+    assert dispatcher.stats.active == 0
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_admits_lower_priority_values_first():
+    dispatcher = Dispatcher(max_concurrency=1, max_queue=10, queue_timeout=1)
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with dispatcher.slot():
+            await release.wait()
+
+    async def call(name: str, priority: int):
+        async with dispatcher.slot(priority):
+            order.append(name)
+
+    blocking = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(call("forecast", 1)), asyncio.create_task(call("current", 0))]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocking, *waiting)
+
+    assert order == ["current", "forecast"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_rejects_when_queue_is_full_and_times_out_waiters():
+    dispatcher = Dispatcher(max_concurrency=1, max_queue=1, queue_timeout=0.01)
+    release = asyncio.Event()
+
+    async def blocker():
+        async with dispatcher.slot():
+            await release.wait()
+
+    async def call():
+        async with dispatcher.slot():
+            pass
+
+    blocking = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(call())
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueFullException):
+        await call()
+    with pytest.raises(QueueTimeoutException):
+        await queued
+
+    release.set()
+    await blocking
+    await call()
+
+    stats = dispatcher.stats
+    expected_admitted = 2
+    assert (stats.rejected, stats.timed_out, stats.admitted) == (1, 1, expected_admitted)
+    assert (stats.active, stats.queued) == (0, 0)
@@ -0,0 +1,59 @@
+from what_to_wear.api.utils.heavy_hitters import HeavyHitters
+
+
+def test_heavy_hitters_ranks_most_frequent_keys():
+    sketch = HeavyHitters(capacity=10)
+    for key, count in (("berlin", 3), ("paris", 5), ("rome", 1)):
+        for _ in range(count):
+            sketch.add(key, key.title())
+
+    assert sketch.top(2) == [("Paris", 5), ("Berlin", 3)]
+
+
+def test_heavy_hitters_keeps_frequent_keys_when_full():
+    sketch = HeavyHitters(capacity=2)
+    for _ in range(10):
+        sketch.add("berlin", "berlin")
+    for key in ("paris", "rome", "madrid"):
+        sketch.add(key, key)
+
+    max_tracked = 2
+    assert len(sketch) == max_tracked
+    assert sketch.top(1) == [("berlin", 10)]
+
+
+def test_heavy_hitters_evicts_the_least_counted_key():
+    sketch = HeavyHitters(capacity=2)
+    sketch.add("berlin", "berlin")
+    sketch.add("paris", "paris")
+    for _ in range(3):
+        sketch.add("berlin", "berlin")
+
+    sketch.add("rome", "rome")
+    sketch.add("madrid", "madrid")
+
+    assert sketch.top(2) == [("berlin", 4), ("madrid", 3)]
+
+
+def test_heavy_hitters_decay_drops_rare_keys():
+    sketch = HeavyHitters(capacity=10)
+    for _ in range(4):
+        sketch.add("berlin", "berlin")
+    sketch.add("paris", "paris")
+
+    sketch.decay()
+
+    assert sketch.top(10) == [("berlin", 2)]
+
+
+def test_heavy_hitters_evicts_correctly_after_decay():
+    sketch = HeavyHitters(capacity=2)
+    for _ in range(4):
+        sketch.add("berlin", "berlin")
+    for _ in range(3):
+        sketch.add("paris", "paris")
+
+    sketch.decay()
+    sketch.add("rome", "rome")
+
+    assert sketch.top(2) == [("berlin", 2), ("rome", 2)]
@@ -1,7 +1,11 @@
+import asyncio
 from http import HTTPStatus
+from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 
+from what_to_wear.api.utils.background import background_tasks
+from what_to_wear.api.utils.http_clients import UpstreamEnum, get_http_client
 from what_to_wear.main import app
 
 
@@ -12,3 +16,26 @@ def test_root_should_return_ok():
 
     assert response.status_code == HTTPStatus.OK
     assert response.content == b'"Welcome to WhatToWear, your weather and clothes recommendation APP, powered by AI!"'
+
+
+def test_lifespan_opens_and_closes_pooled_http_clients():
+    with TestClient(app):
+        weather_client = get_http_client(UpstreamEnum.WEATHER)
+        llm_client = get_http_client(UpstreamEnum.LLM)
+        assert weather_client is not None
+        assert llm_client is not None
+        assert weather_client is not llm_client
+
+    assert get_http_client(UpstreamEnum.WEATHER) is None
+    assert weather_client.is_closed
+    assert llm_client.is_closed
+
+
+def test_lifespan_starts_prewarm_scheduler_when_enabled():
+    with patch("what_to_wear.main.WEATHER_PREWARM_ENABLED", True), \
+            patch("what_to_wear.api.services.prewarm_service.run_prewarm_scheduler",
+                  lambda: asyncio.sleep(60)):
+        with TestClient(app):
+            assert background_tasks.is_pending("weather_prewarm")
+
+    assert not background_tasks.is_pending("weather_prewarm")
@@ -0,0 +1,55 @@
+import math
+from unittest.mock import patch
+
+import pytest
+
+from what_to_wear.api.utils.constants import ModelTierEnum, ModelTypeEnum, RequestTypeEnum
+from what_to_wear.api.utils.model_tiers import ModelSelector, ModelTier
+
+FAST = ModelTier(ModelTierEnum.FAST, ModelTypeEnum.MISTRAL, latency_slo=1)
+BALANCED = ModelTier(ModelTierEnum.BALANCED, ModelTypeEnum.MISTRAL_NEMO, latency_slo=2)
+QUALITY = ModelTier(ModelTierEnum.QUALITY, ModelTypeEnum.MISTRAL_SMALL, latency_slo=4)
+POLICY = {
+    RequestTypeEnum.CURRENT: ((math.inf, ModelTierEnum.FAST),),
+    RequestTypeEnum.FORECAST: ((100, ModelTierEnum.BALANCED), (math.inf, ModelTierEnum.QUALITY)),
+}
+
+
+@pytest.fixture
+def selector():
+    return ModelSelector([FAST, BALANCED, QUALITY], POLICY, queue_ratio=0.5)
+
+
+def test_policy_picks_the_tier_by_type_and_prompt_size(selector):
+    assert selector.choose(RequestTypeEnum.CURRENT, 1000, queue_load=0) == FAST
+    assert selector.choose(RequestTypeEnum.FORECAST, 100, queue_load=0) == BALANCED
+    assert selector.choose(RequestTypeEnum.FORECAST, 101, queue_load=0) == QUALITY
+    assert not selector.downgrades
+
+
+def test_long_queue_moves_requests_to_the_fastest_tier(selector):
+    assert selector.choose(RequestTypeEnum.FORECAST, 500, queue_load=0.5) == FAST
+    assert selector.preferred(RequestTypeEnum.FORECAST, 500) == QUALITY
+    assert selector.downgrades == {ModelTierEnum.QUALITY: 1}
+
+
+def test_missed_slo_moves_requests_to_a_faster_tier(selector):
+    for _ in range(20):
+        selector.record(ModelTypeEnum.MISTRAL_SMALL, QUALITY.latency_slo + 1)
+        selector.record(ModelTypeEnum.MISTRAL_NEMO, BALANCED.latency_slo / 2)
+
+    assert selector.choose(RequestTypeEnum.FORECAST, 500, queue_load=0) == BALANCED
+
+    selector.clear()
+    assert selector.choose(RequestTypeEnum.FORECAST, 500, queue_load=0) == QUALITY
+
+
+def test_slow_tiers_are_used_again_once_their_latencies_expire():
+    selector = ModelSelector([FAST, BALANCED, QUALITY], POLICY, queue_ratio=0.5, max_age=60)
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=100.0):
+        for _ in range(30):
+            selector.record(ModelTypeEnum.MISTRAL_SMALL, QUALITY.latency_slo * 5)
+        assert selector.choose(RequestTypeEnum.FORECAST, 500, queue_load=0) == BALANCED
+
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=161.0):
+        assert selector.choose(RequestTypeEnum.FORECAST, 500, queue_load=0) == QUALITY
@@ -0,0 +1,114 @@
+import json
+from http import HTTPStatus
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+import respx
+
+from what_to_wear.api.services.prewarm_service import prewarm_popular_weather
+from what_to_wear.api.services.weather_service import (
+    get_current_weather_data,
+    popular_weather_requests,
+    weather_cache,
+)
+from what_to_wear.api.utils.constants import LLM_API_URL, WEATHER_API_BASE_URL, RequestTypeEnum
+
+
+def load_mock_data(filename: str):
+    json_path = Path(__file__).parent / "mock_data" / filename
+    with open(json_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+MOCK_CURRENT_WEATHER_RESPONSE = load_mock_data("mock_current_weather_response.json")
+MOCK_OTHER_WEATHER_RESPONSE = {
+    **MOCK_CURRENT_WEATHER_RESPONSE,
+    "location": {**MOCK_CURRENT_WEATHER_RESPONSE["location"], "name": "Other City", "lat": 1.0},
+}
+MOCK_LLM_RESPONSE = {"choices": [{"message": {"content": "Wear a light jacket."}}]}
+
+
+@pytest.fixture(autouse=True)
+def prewarm_enabled():
+    popular_weather_requests.clear()
+    with patch("what_to_wear.api.services.weather_service.WEATHER_PREWARM_ENABLED", True):
+        yield
+    popular_weather_requests.clear()
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_prewarm_refreshes_expiring_popular_entries():
+    route = respx.get(f"{WEATHER_API_BASE_URL}/current.json").mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+    await get_current_weather_data(None, None, "Test City")
+
+    assert popular_weather_requests.top(1)[0][0].cache_key == (RequestTypeEnum.CURRENT, "test city")
+
+    # Fresh for longer than the scheduler interval: nothing to do
+    with patch("what_to_wear.api.services.prewarm_service.WEATHER_PREWARM_INTERVAL_SECONDS", 60):
+        assert await prewarm_popular_weather() == 0
+
+    with patch("what_to_wear.api.services.prewarm_service.WEATHER_PREWARM_INTERVAL_SECONDS", 3600):
+        assert await prewarm_popular_weather() == 1
+
+    expected_calls = 2
+    assert route.call_count == expected_calls
+    cache_key = (RequestTypeEnum.CURRENT, "test city|test region|test country")
+    assert weather_cache.peek(cache_key) is not None
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_prewarm_fetches_recommendations_when_enabled():
+    respx.get(f"{WEATHER_API_BASE_URL}/current.json").mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+    llm_route = respx.post(LLM_API_URL).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    await get_current_weather_data(None, None, "Test City")
+    weather_cache.clear()
+
+    with patch("what_to_wear.api.services.prewarm_service.WEATHER_PREWARM_RECOMMENDATIONS", True):
+        assert await prewarm_popular_weather() == 1
+
+    assert llm_route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_prewarm_continues_after_upstream_errors():
+    route = respx.get(f"{WEATHER_API_BASE_URL}/current.json").mock(
+        side_effect=[
+            httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE),
+            httpx.Response(HTTPStatus.OK, json=MOCK_OTHER_WEATHER_RESPONSE),
+            httpx.Response(HTTPStatus.NOT_FOUND),
+            httpx.Response(HTTPStatus.OK, json=MOCK_OTHER_WEATHER_RESPONSE),
+        ]
+    )
+    await get_current_weather_data(None, None, "Test City")
+    await get_current_weather_data(None, None, "Other City")
+    weather_cache.clear()
+
+    assert await prewarm_popular_weather() == 1
+    upstream_calls = 4
+    assert route.call_count == upstream_calls
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_prewarm_does_not_count_failed_refreshes():
+    respx.get(f"{WEATHER_API_BASE_URL}/current.json").mock(
+        side_effect=[
+            httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE),
+            httpx.Response(HTTPStatus.NOT_FOUND),
+        ]
+    )
+    await get_current_weather_data(None, None, "Test City")
+    weather_cache.clear()
+
+    assert await prewarm_popular_weather() == 0
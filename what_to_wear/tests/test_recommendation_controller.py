@@ -4,9 +4,12 @@ from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 from what_to_wear.api.controllers.recommendation_controller import router
+from what_to_wear.api.database.db import init_db
+from what_to_wear.api.models.db_models.user import User
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
 from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
 from what_to_wear.api.services.auth_service import get_current_user
@@ -38,7 +41,7 @@ def override_auth():
 async def test_get_current_recommendation(override_auth):
     with patch("what_to_wear.api.controllers.recommendation_controller.get_current_weather_data",
                new_callable=AsyncMock) as mock_weather, \
-         patch("what_to_wear.api.controllers.recommendation_controller.get_llm_recommendation",
+         patch("what_to_wear.api.controllers.recommendation_controller.get_recommendation",
                new_callable=AsyncMock) as mock_recommendation:
 
         mock_weather.return_value = CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE)
@@ -59,7 +62,7 @@ async def test_get_current_recommendation(override_auth):
 async def test_get_forecast_recommendation(override_auth):
     with patch("what_to_wear.api.controllers.recommendation_controller.get_forecast_weather_data",
                new_callable=AsyncMock) as mock_weather, \
-         patch("what_to_wear.api.controllers.recommendation_controller.get_llm_recommendation",
+         patch("what_to_wear.api.controllers.recommendation_controller.get_recommendation",
                new_callable=AsyncMock) as mock_recommendation:
 
         mock_weather.return_value = ForecastWeatherResponse.model_validate(MOCK_FORECAST_WEATHER_RESPONSE)
@@ -146,3 +149,222 @@ async def test_get_current_recommendation_server_error(override_auth):
         )
 
         assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def test_get_recommendation_stats(override_auth):
+    response = client.get("/recommendation/stats", headers={"Authorization": "Bearer fake_token"})
+
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json()["cache"]) == {
+        "hits", "misses", "stale_hits", "size", "maxsize", "hit_ratio"
+    }
+    assert response.json()["llm_usage"] == {}
+
+
+async def mock_stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def failing_stream():
+    yield "Wear a "
+    raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Service unavailable")
+
+
+def test_stream_routes_are_documented_as_event_streams():
+    paths = app.openapi()["paths"]
+
+    for path in ("/recommendation/current/stream", "/recommendation/forecast/stream"):
+        assert "text/event-stream" in paths[path]["get"]["responses"]["200"]["content"]
+
+
+def test_stream_current_recommendation(override_auth):
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_current_weather_data",
+               new_callable=AsyncMock) as mock_weather, \
+         patch("what_to_wear.api.controllers.recommendation_controller.stream_recommendation",
+               return_value=mock_stream("Wear a ", "light\njacket.")):
+        mock_weather.return_value = CurrentWeatherResponse.model_validate(
+            MOCK_CURRENT_WEATHER_RESPONSE
+        )
+
+        response = client.get("/recommendation/current/stream", params={"city": "Berlin"})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == "data: Wear a \n\ndata: light\ndata: jacket.\n\nevent: done\ndata: \n\n"
+
+
+def test_stream_forecast_recommendation_reports_errors_as_events(override_auth):
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_forecast_weather_data",
+               new_callable=AsyncMock) as mock_weather, \
+         patch("what_to_wear.api.controllers.recommendation_controller.stream_recommendation",
+               return_value=failing_stream()):
+        mock_weather.return_value = ForecastWeatherResponse.model_validate(
+            MOCK_FORECAST_WEATHER_RESPONSE
+        )
+
+        response = client.get(
+            "/recommendation/forecast/stream", params={"city": "Berlin", "days": 3}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.text.endswith("event: error\ndata: Service unavailable\n\n")
+
+
+def test_get_current_recommendation_passes_on_service_unavailable(override_auth):
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_current_weather_data",
+               new_callable=AsyncMock) as mock_weather, \
+         patch("what_to_wear.api.controllers.recommendation_controller.get_recommendation",
+               new_callable=AsyncMock) as mock_recommendation:
+        mock_weather.return_value = CurrentWeatherResponse.model_validate(
+            MOCK_CURRENT_WEATHER_RESPONSE
+        )
+        mock_recommendation.side_effect = HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Too many requests queued",
+            headers={"Retry-After": "10"}
+        )
+
+        response = client.get("/recommendation/current", params={"city": "Berlin"})
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "10"
+
+
+def test_get_forecast_recommendation_fast_mode(override_auth):
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_forecast_weather_data",
+               new_callable=AsyncMock) as mock_weather:
+        mock_weather.return_value = ForecastWeatherResponse.model_validate(
+            MOCK_FORECAST_WEATHER_RESPONSE
+        )
+
+        response = client.get(
+            "/recommendation/forecast", params={"city": "Berlin", "days": 1, "mode": "fast"}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json().startswith("2022-01-01: Wear ")
+
+
+@pytest.fixture
+def override_user():
+    user = User(username="testuser", hashed_password="hashed")
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_create_and_poll_recommendation_job(override_user):
+    init_db()
+    response = client.post("/recommendation/jobs", json={"city": "Berlin", "mode": "fast"})
+
+    assert response.status_code == HTTPStatus.ACCEPTED
+    job = response.json()
+    assert job["status"] == "PENDING"
+    assert response.headers["location"].endswith(f"/recommendation/jobs/{job['id']}")
+
+    response = client.get(f"/recommendation/jobs/{job['id']}")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["id"] == job["id"]
+
+
+def test_get_missing_recommendation_job(override_user):
+    init_db()
+    response = client.get("/recommendation/jobs/missing")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_create_recommendation_job_rejects_non_object_body(override_user):
+    response = client.post("/recommendation/jobs", json=["x"])
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_create_recommendation_job_unauthorized():
+    response = client.post("/recommendation/jobs", json={"city": "Berlin"})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_get_forecast_with_recommendation(override_auth):
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_forecast_weather_data",
+               new_callable=AsyncMock) as mock_weather, \
+         patch("what_to_wear.api.controllers.recommendation_controller.get_recommendation",
+               new_callable=AsyncMock, return_value=MOCK_LLM_RECOMMENDATION):
+        mock_weather.return_value = ForecastWeatherResponse.model_validate(
+            MOCK_FORECAST_WEATHER_RESPONSE
+        )
+
+        response = client.get(
+            "/recommendation/forecast/with-weather", params={"city": "Berlin", "days": 3}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()
+    assert body["recommendation"] == MOCK_LLM_RECOMMENDATION
+    assert body["job"] is None
+    assert body["weather"]["location"]["name"] == MOCK_FORECAST_WEATHER_RESPONSE["location"]["name"]
+    assert "hour" not in body["weather"]["forecast"]["forecastday"][0]
+    mock_weather.assert_awaited_once()
+
+
+def test_stream_forecast_with_recommendation(override_auth):
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_forecast_weather_data",
+               new_callable=AsyncMock) as mock_weather, \
+         patch("what_to_wear.api.controllers.recommendation_controller.stream_recommendation",
+               return_value=mock_stream("Wear a ", "light jacket.")):
+        mock_weather.return_value = ForecastWeatherResponse.model_validate(
+            MOCK_FORECAST_WEATHER_RESPONSE
+        )
+
+        response = client.get("/recommendation/forecast/with-weather",
+                              params={"city": "Berlin", "days": 3, "delivery": "stream"})
+
+    assert response.status_code == HTTPStatus.OK
+    weather_event, *recommendation_events = response.text.split("\n\n")
+    assert weather_event.startswith("event: weather\ndata: {")
+    weather = json.loads(weather_event.split("data: ", 1)[1])
+    assert weather["location"]["name"] == MOCK_FORECAST_WEATHER_RESPONSE["location"]["name"]
+    assert recommendation_events[:3] == [
+        "data: Wear a ", "data: light jacket.", "event: done\ndata: "
+    ]
+
+
+async def unavailable_stream():
+    raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Service unavailable")
+    yield
+
+
+def test_stream_forecast_with_recommendation_sends_weather_before_the_recommendation(override_auth):
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_forecast_weather_data",
+               new_callable=AsyncMock) as mock_weather, \
+         patch("what_to_wear.api.controllers.recommendation_controller.stream_recommendation",
+               return_value=unavailable_stream()):
+        mock_weather.return_value = ForecastWeatherResponse.model_validate(
+            MOCK_FORECAST_WEATHER_RESPONSE
+        )
+
+        response = client.get("/recommendation/forecast/with-weather",
+                              params={"city": "Berlin", "days": 3, "delivery": "stream"})
+
+    assert response.status_code == HTTPStatus.OK
+    weather_event, error_event, _ = response.text.split("\n\n")
+    assert weather_event.startswith("event: weather\ndata: {")
+    assert error_event == "event: error\ndata: Service unavailable"
+
+
+def test_defer_forecast_recommendation(override_user):
+    init_db()
+    with patch("what_to_wear.api.controllers.recommendation_controller.get_forecast_weather_data",
+               new_callable=AsyncMock) as mock_weather:
+        mock_weather.return_value = ForecastWeatherResponse.model_validate(
+            MOCK_FORECAST_WEATHER_RESPONSE
+        )
+
+        response = client.get("/recommendation/forecast/with-weather",
+                              params={"city": "Berlin", "days": 3, "delivery": "deferred",
+                                      "include_hours": True})
+
+    assert response.status_code == HTTPStatus.ACCEPTED
+    body = response.json()
+    assert body["recommendation"] is None
+    assert body["job"]["status"] == "PENDING"
+    assert "hour" in body["weather"]["forecast"]["forecastday"][0]
+    assert response.headers["location"].endswith(f"/recommendation/jobs/{body['job']['id']}")
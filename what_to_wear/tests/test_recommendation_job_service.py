@@ -0,0 +1,220 @@
+import asyncio
+import json
+from datetime import timedelta
+from http import HTTPStatus
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session, delete
+
+from what_to_wear.api.database.db import engine, init_db
+from what_to_wear.api.models.db_models.recommendation_job import RecommendationJob
+from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
+from what_to_wear.api.models.schemas.recommendation_job import RecommendationJobRequest
+from what_to_wear.api.services.recommendation_job_service import (
+    JobWorkerPool,
+    claim_job,
+    create_job,
+    get_job,
+    purge_expired_jobs,
+    requeue_unfinished_jobs,
+    run_job,
+    run_job_worker,
+    utc_now,
+)
+from what_to_wear.api.utils.constants import (
+    RECOMMENDATION_JOB_STALE_SECONDS,
+    JobStatusEnum,
+    RecommendationModeEnum,
+    RequestTypeEnum,
+)
+
+
+def load_mock_data(filename: str):
+    json_path = Path(__file__).parent / "mock_data" / filename
+    with open(json_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+MOCK_CURRENT_WEATHER_RESPONSE = load_mock_data("mock_current_weather_response.json")
+JOB_SERVICE = "what_to_wear.api.services.recommendation_job_service"
+
+
+@pytest.fixture
+def session():
+    init_db()
+    with Session(engine) as session:
+        session.exec(delete(RecommendationJob))
+        session.commit()
+        yield session
+
+
+@pytest.fixture
+def mock_weather():
+    with patch(f"{JOB_SERVICE}.get_current_weather_data", new_callable=AsyncMock) as mock_weather:
+        mock_weather.return_value = CurrentWeatherResponse.model_validate(
+            MOCK_CURRENT_WEATHER_RESPONSE
+        )
+        yield mock_weather
+
+
+def make_request(**params) -> RecommendationJobRequest:
+    return RecommendationJobRequest(city="Berlin", type=RequestTypeEnum.CURRENT, **params)
+
+
+@pytest.mark.asyncio
+async def test_job_runs_to_done(session, mock_weather):
+    job = create_job(make_request(mode=RecommendationModeEnum.FAST), "testuser", session)
+    assert job.status == JobStatusEnum.PENDING
+
+    await run_job(job.id)
+
+    session.refresh(job)
+    assert job.status == JobStatusEnum.DONE
+    assert job.status_code == HTTPStatus.OK
+    assert job.result.startswith("Wear ")
+    assert job.finished_at is not None
+    mock_weather.assert_awaited_once_with(None, None, "Berlin")
+
+
+@pytest.mark.asyncio
+async def test_job_records_failures(session, mock_weather):
+    mock_weather.side_effect = HTTPException(
+        status_code=HTTPStatus.NOT_FOUND, detail="City not found"
+    )
+    job = create_job(make_request(), "testuser", session)
+
+    await run_job(job.id)
+
+    session.refresh(job)
+    assert job.status == JobStatusEnum.FAILED
+    assert job.status_code == HTTPStatus.NOT_FOUND
+    assert job.error == "City not found"
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_are_not_run_again(session, mock_weather):
+    job = create_job(make_request(mode=RecommendationModeEnum.FAST), "testuser", session)
+    await run_job(job.id)
+    await run_job(job.id)
+
+    mock_weather.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_workers_run_submitted_jobs(session, mock_weather):
+    pool = JobWorkerPool(size=1)
+    pool._queue = asyncio.Queue(1)
+    job = create_job(make_request(mode=RecommendationModeEnum.FAST), "testuser", session)
+
+    assert pool.submit(job.id)
+    assert pool.full
+    assert not pool.submit("another-job")
+
+    worker = asyncio.create_task(run_job_worker(pool._queue))
+    await asyncio.wait_for(pool._queue.join(), 1)
+    worker.cancel()
+
+    session.refresh(job)
+    assert job.status == JobStatusEnum.DONE
+
+
+def test_create_job_rejects_when_queue_is_full(session):
+    with patch(f"{JOB_SERVICE}.job_workers", JobWorkerPool(size=0)) as pool:
+        pool._queue = asyncio.Queue(1)
+        pool._queue.put_nowait("queued-job")
+        with pytest.raises(HTTPException) as exc_info:
+            create_job(make_request(), "testuser", session)
+
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert "Retry-After" in exc_info.value.headers
+
+
+def test_retry_after_follows_job_durations():
+    pool = JobWorkerPool(size=1)
+    for seconds in (2, 3, 40):
+        pool.durations.record(seconds)
+
+    expected_retry_after = 3
+    assert pool.retry_after == expected_retry_after
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_claimed_once(session, mock_weather):
+    job = create_job(make_request(mode=RecommendationModeEnum.FAST), "testuser", session)
+
+    assert claim_job(job.id).status == JobStatusEnum.RUNNING
+    assert claim_job(job.id) is None
+    await run_job(job.id)
+
+    mock_weather.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_no_session_is_held_while_a_job_runs(session, mock_weather):
+    job = create_job(make_request(mode=RecommendationModeEnum.FAST), "testuser", session)
+    session.close()
+    checked_out = []
+
+    async def get_weather(*args):
+        checked_out.append(engine.pool.checkedout())
+        return CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE)
+
+    mock_weather.side_effect = get_weather
+    await run_job(job.id)
+
+    assert checked_out == [0]
+    assert session.get(RecommendationJob, job.id).status == JobStatusEnum.DONE
+
+
+def test_only_stale_running_jobs_are_requeued(session):
+    running = create_job(make_request(), "testuser", session)
+    stale = create_job(make_request(), "testuser", session)
+    pending = create_job(make_request(), "testuser", session)
+    claim_job(running.id)
+    claim_job(stale.id)
+    session.refresh(stale)
+    stale.started_at = utc_now() - timedelta(seconds=RECOMMENDATION_JOB_STALE_SECONDS + 1)
+    session.add(stale)
+    session.commit()
+
+    with patch(f"{JOB_SERVICE}.job_workers", JobWorkerPool(size=100)) as pool:
+        pool._queue = asyncio.Queue(100)
+        requeue_unfinished_jobs()
+        queued = [pool._queue.get_nowait() for _ in range(pool._queue.qsize())]
+
+    assert stale.id in queued
+    assert pending.id in queued
+    assert running.id not in queued
+    session.expire_all()
+    assert session.get(RecommendationJob, running.id).status == JobStatusEnum.RUNNING
+
+
+def test_get_job_only_returns_own_unexpired_jobs(session):
+    job = create_job(make_request(), "testuser", session)
+
+    assert get_job(job.id, "testuser", session).id == job.id
+    assert get_job(job.id, "otheruser", session) is None
+    assert get_job("missing", "testuser", session) is None
+
+    job.expires_at = utc_now() - timedelta(seconds=1)
+    session.add(job)
+    session.commit()
+    assert get_job(job.id, "testuser", session) is None
+
+
+def test_purge_expired_jobs(session):
+    expired = create_job(make_request(), "testuser", session)
+    kept = create_job(make_request(), "testuser", session)
+    expired.expires_at = utc_now() - timedelta(seconds=1)
+    session.add(expired)
+    session.commit()
+    expired_id, kept_id = expired.id, kept.id
+
+    assert purge_expired_jobs() >= 1
+
+    session.expire_all()
+    assert session.get(RecommendationJob, expired_id) is None
+    assert session.get(RecommendationJob, kept_id) is not None
@@ -1,6 +1,10 @@
+import asyncio
 import json
+import math
 from http import HTTPStatus
 from pathlib import Path
+from typing import Optional
+from unittest.mock import PropertyMock, patch
 
 import httpx
 import pytest
@@ -9,8 +13,36 @@ from fastapi import HTTPException
 
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
 from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
-from what_to_wear.api.services.recommendation_service import get_llm_recommendation, query_llm
-from what_to_wear.api.utils.constants import HEADERS, LLM_API_URL, ModelTypeEnum, RequestTypeEnum
+from what_to_wear.api.services.recommendation_service import (
+    get_llm_recommendation,
+    get_recommendation,
+    llm_dispatcher,
+    llm_usage,
+    model_selector,
+    query_llm,
+    query_llm_stream,
+    recommendation_cache,
+    recommendation_sources,
+    stream_llm_recommendation,
+    stream_recommendation,
+)
+from what_to_wear.api.utils.constants import (
+    HEADERS,
+    LLM_API_URL,
+    LLM_FAILURE_PENALTY_SECONDS,
+    LLM_LATENCY_MAX_AGE_SECONDS,
+    MODEL_PARAMS,
+    ForecastRecommendationModeEnum,
+    LLMRoutingPolicyEnum,
+    ModelTierEnum,
+    ModelTypeEnum,
+    RecommendationModeEnum,
+    RecommendationSourceEnum,
+    RequestTypeEnum,
+)
+from what_to_wear.api.utils.llm_providers import LLMProvider, llm_providers
+from what_to_wear.api.utils.utils import estimate_tokens
+from what_to_wear.tests.conftest import build_multi_day_forecast
 
 
 def load_mock_data(filename: str):
@@ -23,6 +55,10 @@ MOCK_CURRENT_WEATHER_RESPONSE = load_mock_data("mock_current_weather_response.js
 MOCK_FORECAST_WEATHER_RESPONSE = load_mock_data("mock_forecast_weather_response.json")
 MOCK_LLM_RESPONSE = {"choices": [{"message": {"content": "Wear a light jacket."}}]}
 MOCK_INVALID_LLM_RESPONSE = {"error": "Invalid request"}
+MOCK_LLM_STREAM = b"".join(
+    b"data: " + json.dumps({"choices": [{"delta": {"content": content}}]}).encode() + b"\n\n"
+    for content in ("Wear a ", "light ", "jacket.")
+) + b": keep-alive\n\ndata: [DONE]\n\n"
 
 
 @pytest.mark.asyncio
@@ -116,3 +152,549 @@ async def test_query_llm_unexpected_error():
 
     assert exc_info.value.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
     assert "Unexpected Error" in exc_info.value.detail
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_coalesces_identical_concurrent_prompts():
+    prompt = "What should I wear today?"
+
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+
+    responses = await asyncio.gather(*(query_llm(prompt, ModelTypeEnum.MISTRAL) for _ in range(5)))
+
+    assert route.call_count == 1
+    assert responses == ["Wear a light jacket."] * 5
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_malformed_response():
+    prompt = "What should I wear today?"
+
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_INVALID_LLM_RESPONSE)
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await query_llm(prompt, ModelTypeEnum.MISTRAL)
+
+    assert exc_info.value.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_llm_recommendation_reuses_answers_for_similar_weather():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    similar_weather = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+    similar_weather.current.temp_c += 0.2
+    colder_weather = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+    colder_weather.current.temp_c -= 10
+
+    base_weather = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+    await get_llm_recommendation(base_weather, RequestTypeEnum.CURRENT)
+    response = await get_llm_recommendation(similar_weather, RequestTypeEnum.CURRENT)
+    await get_llm_recommendation(colder_weather, RequestTypeEnum.CURRENT)
+
+    expected_calls = 2
+    assert response == "Wear a light jacket."
+    assert route.call_count == expected_calls
+    assert recommendation_cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_llm_recommendation_caches_forecasts():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    weather_data = ForecastWeatherResponse(**MOCK_FORECAST_WEATHER_RESPONSE)
+
+    await get_llm_recommendation(weather_data, RequestTypeEnum.FORECAST)
+    await get_llm_recommendation(weather_data, RequestTypeEnum.FORECAST)
+
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_llm_recommendation_does_not_cache_errors():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        side_effect=[
+            httpx.Response(HTTPStatus.INTERNAL_SERVER_ERROR),
+            httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE),
+        ]
+    )
+    weather_data = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    with pytest.raises(HTTPException):
+        await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+    response = await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+
+    expected_calls = 2
+    assert response == "Wear a light jacket."
+    assert route.call_count == expected_calls
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_stream_yields_content_deltas():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, content=MOCK_LLM_STREAM)
+    )
+
+    prompt = "What should I wear today?"
+    chunks = [chunk async for chunk in query_llm_stream(prompt, ModelTypeEnum.MISTRAL)]
+
+    assert chunks == ["Wear a ", "light ", "jacket."]
+    assert json.loads(route.calls.last.request.content)["stream"] is True
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_stream_http_error():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.BAD_REQUEST, json=MOCK_INVALID_LLM_RESPONSE)
+    )
+
+    prompt = "What should I wear today?"
+    with pytest.raises(HTTPException) as exc_info:
+        [chunk async for chunk in query_llm_stream(prompt, ModelTypeEnum.MISTRAL)]
+
+    assert exc_info.value.status_code == HTTPStatus.BAD_REQUEST
+    assert "Invalid request" in exc_info.value.detail
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stream_llm_recommendation_caches_the_full_answer():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, content=MOCK_LLM_STREAM)
+    )
+    weather_data = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    streamed = [
+        chunk async for chunk in stream_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+    ]
+    cached = [
+        chunk async for chunk in stream_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+    ]
+
+    assert "".join(streamed) == "Wear a light jacket."
+    assert cached == ["Wear a light jacket."]
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_rejects_with_retry_after_when_queue_is_full():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+
+    with patch.object(llm_dispatcher, "max_concurrency", 0), \
+         patch.object(llm_dispatcher, "max_queue", 0):
+        with pytest.raises(HTTPException) as exc_info:
+            await query_llm("What should I wear today?", ModelTypeEnum.MISTRAL)
+
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert exc_info.value.headers["Retry-After"] == str(math.ceil(llm_dispatcher.queue_timeout))
+    assert llm_dispatcher.stats.rejected == 1
+
+
+def build_uneven_forecast() -> ForecastWeatherResponse:
+    """ Three days: the second one like the first, the third one much colder """
+    payload = build_multi_day_forecast(3)
+    days = payload["forecast"]["forecastday"]
+    days[1]["day"]["avgtemp_c"] += 0.5
+    for field in ("avgtemp_c", "maxtemp_c", "mintemp_c"):
+        days[2]["day"][field] -= 15
+    return ForecastWeatherResponse(**payload)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_llm_recommendation_per_day_reuses_equivalent_days():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    weather_data = build_uneven_forecast()
+
+    with patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_FORECAST_MODE",
+               ForecastRecommendationModeEnum.PER_DAY):
+        response = await get_llm_recommendation(weather_data, RequestTypeEnum.FORECAST)
+        shorter_response = await get_llm_recommendation(
+            weather_data.first_days(2), RequestTypeEnum.FORECAST
+        )
+
+    expected_calls = 2
+    assert route.call_count == expected_calls
+    assert response == "\n".join(f"2022-01-0{day}: Wear a light jacket." for day in (1, 2, 3))
+    assert shorter_response == "\n".join(f"2022-01-0{day}: Wear a light jacket." for day in (1, 2))
+    last_prompt = json.loads(route.calls.last.request.content)["messages"][0]["content"]
+    assert "2022-01-01" not in last_prompt
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stream_llm_recommendation_per_day_yields_one_day_at_a_time():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    weather_data = build_uneven_forecast()
+
+    with patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_FORECAST_MODE",
+               ForecastRecommendationModeEnum.PER_DAY):
+        stream = stream_llm_recommendation(weather_data, RequestTypeEnum.FORECAST)
+        chunks = [chunk async for chunk in stream]
+
+    assert chunks == [
+        "2022-01-01: Wear a light jacket.",
+        "\n2022-01-02: Wear a light jacket.",
+        "\n2022-01-03: Wear a light jacket.",
+    ]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_recommendation_fast_mode_skips_the_llm():
+    route = respx.post(LLM_API_URL, headers=HEADERS)
+    weather_data = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    response = await get_recommendation(
+        weather_data, RequestTypeEnum.CURRENT, RecommendationModeEnum.FAST
+    )
+
+    assert response.startswith("Wear ")
+    assert not route.called
+    assert recommendation_sources[RecommendationSourceEnum.RULES] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_recommendation_falls_back_on_llm_errors():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.BAD_GATEWAY)
+    )
+    weather_data = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    response = await get_recommendation(weather_data, RequestTypeEnum.CURRENT)
+
+    assert response.startswith("Wear ")
+    assert recommendation_sources[RecommendationSourceEnum.FALLBACK] == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_recommendation_falls_back_when_over_budget_and_caches_late_answer():
+    async def slow_llm(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(side_effect=slow_llm)
+    weather_data = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    with patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_LLM_BUDGET_SECONDS",
+               0.01):
+        fallback = await get_recommendation(weather_data, RequestTypeEnum.CURRENT)
+        await asyncio.sleep(0.1)
+        response = await get_recommendation(weather_data, RequestTypeEnum.CURRENT)
+
+    assert fallback.startswith("Wear ")
+    assert response == "Wear a light jacket."
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_recommendation_without_fallback_raises():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.BAD_GATEWAY)
+    )
+    weather_data = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    with patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_FALLBACK_ENABLED",
+               False):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_recommendation(weather_data, RequestTypeEnum.CURRENT)
+
+    assert exc_info.value.status_code == HTTPStatus.BAD_GATEWAY
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stream_recommendation_falls_back_before_the_first_chunk():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        side_effect=httpx.ConnectError("Connection refused")
+    )
+    weather_data = ForecastWeatherResponse(**MOCK_FORECAST_WEATHER_RESPONSE)
+
+    stream = stream_recommendation(weather_data, RequestTypeEnum.FORECAST)
+    chunks = [chunk async for chunk in stream]
+
+    assert len(chunks) == 1
+    assert chunks[0].startswith("2022-01-01: Wear ")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_stream_recommendation_without_fallback_has_no_budget():
+    async def slow_llm(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(HTTPStatus.OK, content=MOCK_LLM_STREAM)
+
+    respx.post(LLM_API_URL, headers=HEADERS).mock(side_effect=slow_llm)
+    weather_data = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    with patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_FALLBACK_ENABLED",
+               False), \
+         patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_LLM_BUDGET_SECONDS",
+               0.01):
+        stream = stream_recommendation(weather_data, RequestTypeEnum.CURRENT)
+        chunks = [chunk async for chunk in stream]
+
+    assert chunks == ["Wear a ", "light ", "jacket."]
+    assert recommendation_sources[RecommendationSourceEnum.LLM] == 1
+
+
+SECONDARY_LLM_API_URL = "https://mock_secondary_llm_api.com/v1"
+MOCK_SECONDARY_LLM_RESPONSE = {"choices": [{"message": {"content": "Wear a raincoat."}}]}
+
+
+@pytest.fixture
+def secondary_provider():
+    provider = LLMProvider(
+        "secondary", SECONDARY_LLM_API_URL, "secondary_key", ModelTypeEnum.MISTRAL, "mistral-small"
+    )
+    llm_providers.register(provider)
+    yield provider
+    llm_providers.providers.remove(provider)
+
+
+def mock_llm_with_latency(
+    url: str, content: dict, delay: float, started: Optional[list] = None
+) -> respx.Route:
+    """ A stand-in provider answering after 'delay' seconds. Requests join 'started' on arrival """
+    async def respond(request):
+        if started is not None:
+            started.append(url)
+        await asyncio.sleep(delay)
+        return httpx.Response(HTTPStatus.OK, json=content)
+
+    return respx.post(url).mock(side_effect=respond)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_hedges_slow_provider_with_the_next_one(secondary_provider):
+    started = []
+    mock_llm_with_latency(LLM_API_URL, MOCK_LLM_RESPONSE, delay=1, started=started)
+    secondary = mock_llm_with_latency(
+        SECONDARY_LLM_API_URL, MOCK_SECONDARY_LLM_RESPONSE, delay=0, started=started
+    )
+
+    with patch("what_to_wear.api.services.recommendation_service.LLM_ROUTING_POLICY",
+               LLMRoutingPolicyEnum.HEDGED), \
+            patch("what_to_wear.api.utils.llm_providers.LLM_HEDGE_DELAY_SECONDS", 0.01):
+        response = await query_llm("What should I wear today?", ModelTypeEnum.MISTRAL)
+
+    assert response == "Wear a raincoat."
+    assert started == [LLM_API_URL, SECONDARY_LLM_API_URL]
+    assert json.loads(secondary.calls.last.request.content)["model"] == "mistral-small"
+    assert secondary.calls.last.request.headers["Authorization"] == "Bearer secondary_key"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_hedges_only_within_the_concurrency_limit(secondary_provider):
+    started = []
+    mock_llm_with_latency(LLM_API_URL, MOCK_LLM_RESPONSE, delay=0.1, started=started)
+    mock_llm_with_latency(
+        SECONDARY_LLM_API_URL, MOCK_SECONDARY_LLM_RESPONSE, delay=0, started=started
+    )
+
+    with patch("what_to_wear.api.services.recommendation_service.LLM_ROUTING_POLICY",
+               LLMRoutingPolicyEnum.HEDGED), \
+            patch("what_to_wear.api.utils.llm_providers.LLM_HEDGE_DELAY_SECONDS", 0.01), \
+            patch.object(llm_dispatcher, "max_concurrency", 1):
+        response = await query_llm("What should I wear today?", ModelTypeEnum.MISTRAL)
+    await asyncio.sleep(0)
+
+    assert response == "Wear a light jacket."
+    assert started == [LLM_API_URL]
+    assert llm_dispatcher.stats.active == 0
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_latency_policy_prefers_the_faster_provider(secondary_provider):
+    primary = mock_llm_with_latency(LLM_API_URL, MOCK_LLM_RESPONSE, delay=0)
+    mock_llm_with_latency(SECONDARY_LLM_API_URL, MOCK_SECONDARY_LLM_RESPONSE, delay=0)
+    for _ in range(secondary_provider.latency.min_samples):
+        llm_providers.providers[0].latency.record(2)
+        secondary_provider.latency.record(0.5)
+
+    with patch("what_to_wear.api.services.recommendation_service.LLM_ROUTING_POLICY",
+               LLMRoutingPolicyEnum.LATENCY):
+        response = await query_llm("What should I wear today?", ModelTypeEnum.MISTRAL)
+
+    assert response == "Wear a raincoat."
+    assert not primary.called
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_latency_policy_avoids_a_failing_provider(secondary_provider):
+    primary = respx.post(LLM_API_URL).mock(
+        return_value=httpx.Response(HTTPStatus.INTERNAL_SERVER_ERROR)
+    )
+    secondary = mock_llm_with_latency(SECONDARY_LLM_API_URL, MOCK_SECONDARY_LLM_RESPONSE, delay=0)
+    for _ in range(10):
+        secondary_provider.latency.record(0.5)
+
+    with patch(
+        "what_to_wear.api.services.recommendation_service.LLM_ROUTING_POLICY",
+        LLMRoutingPolicyEnum.LATENCY,
+    ):
+        with pytest.raises(HTTPException):
+            await query_llm("What should I wear today?", ModelTypeEnum.MISTRAL)
+        for attempt in range(4):
+            prompt = f"What should I wear on day {attempt}?"
+            response = await query_llm(prompt, ModelTypeEnum.MISTRAL)
+            assert response == "Wear a raincoat."
+
+    assert primary.call_count == 1
+    expected_secondary_calls = 4
+    assert secondary.call_count == expected_secondary_calls
+    assert llm_providers.providers[0].failing
+
+
+def test_failing_providers_are_retried_once_their_failure_is_old(secondary_provider):
+    primary = llm_providers.providers[0]
+    with patch("what_to_wear.api.utils.llm_providers.time.monotonic", return_value=100.0):
+        primary.record_failure()
+        assert primary.median_latency >= LLM_FAILURE_PENALTY_SECONDS
+
+    with patch(
+        "what_to_wear.api.utils.llm_providers.time.monotonic",
+        return_value=100.0 + LLM_LATENCY_MAX_AGE_SECONDS
+    ):
+        assert not primary.failing
+    primary.record_success(0.2)
+    assert primary.failed_at is None
+
+
+def test_failures_do_not_delay_hedging():
+    primary = llm_providers.providers[0]
+    for _ in range(10):
+        primary.latency.record(0.5)
+
+    for _ in range(10):
+        primary.record_failure()
+
+    expected_delay = 0.5
+    assert primary.hedge_delay == expected_delay
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_completed_streams_clear_the_provider_failure():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, content=MOCK_LLM_STREAM)
+    )
+    primary = llm_providers.providers[0]
+    primary.record_failure()
+
+    [chunk async for chunk in query_llm_stream("What should I wear today?", ModelTypeEnum.MISTRAL)]
+
+    assert not primary.failing
+    assert len(primary.latency) == 0
+
+
+def test_weighted_policy_follows_weights(secondary_provider):
+    secondary_provider.weight = 0
+
+    chosen = {
+        llm_providers.choose(ModelTypeEnum.MISTRAL, LLMRoutingPolicyEnum.WEIGHTED)[0].name
+        for _ in range(20)
+    }
+
+    assert chosen == {"primary"}
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_query_llm_records_usage_per_request_type():
+    expected_prompt_tokens, expected_completion_tokens = 42, 7
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json={**MOCK_LLM_RESPONSE, "usage": {
+            "prompt_tokens": expected_prompt_tokens,
+            "completion_tokens": expected_completion_tokens,
+            "total_tokens": expected_prompt_tokens + expected_completion_tokens
+        }})
+    )
+
+    await query_llm("What should I wear today?", ModelTypeEnum.MISTRAL, RequestTypeEnum.FORECAST)
+
+    stats = llm_usage.stats[RequestTypeEnum.FORECAST]
+    assert (stats.calls, stats.estimated_calls) == (1, 0)
+    assert stats.prompt_tokens == expected_prompt_tokens
+    assert stats.completion_tokens == expected_completion_tokens
+    assert stats.latency_p50 is not None
+    assert RequestTypeEnum.CURRENT not in llm_usage.stats
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_usage_is_estimated_when_not_reported():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        side_effect=[
+            httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE),
+            httpx.Response(HTTPStatus.OK, content=MOCK_LLM_STREAM),
+        ]
+    )
+
+    await query_llm("What should I wear today?", ModelTypeEnum.MISTRAL)
+    [chunk async for chunk in query_llm_stream("What should I wear today?", ModelTypeEnum.MISTRAL)]
+
+    stats = llm_usage.stats[RequestTypeEnum.CURRENT]
+    expected_calls = 2
+    assert stats.calls == stats.estimated_calls == expected_calls
+    assert stats.prompt_tokens == 2 * estimate_tokens("What should I wear today?")
+    assert stats.completion_tokens == 2 * estimate_tokens("Wear a light jacket.")
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_recommendations_use_the_model_tier_of_their_request_type():
+    route = respx.post(LLM_API_URL).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+
+    current = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+    forecast = ForecastWeatherResponse(**MOCK_FORECAST_WEATHER_RESPONSE)
+    await get_llm_recommendation(current, RequestTypeEnum.CURRENT)
+    await get_llm_recommendation(forecast, RequestTypeEnum.FORECAST)
+
+    models = [json.loads(call.request.content)["model"] for call in route.calls]
+    assert models == [MODEL_PARAMS[ModelTypeEnum.MISTRAL], MODEL_PARAMS[ModelTypeEnum.MISTRAL_NEMO]]
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_long_llm_queue_moves_recommendations_to_the_fast_tier():
+    route = respx.post(LLM_API_URL).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    weather_data = ForecastWeatherResponse(**MOCK_FORECAST_WEATHER_RESPONSE)
+
+    with patch.object(type(llm_dispatcher), "load", new_callable=PropertyMock, return_value=1.0):
+        await get_llm_recommendation(weather_data, RequestTypeEnum.FORECAST)
+
+    model = json.loads(route.calls.last.request.content)["model"]
+    assert model == MODEL_PARAMS[ModelTypeEnum.MISTRAL]
+    assert model_selector.downgrades == {ModelTierEnum.BALANCED: 1}
@@ -0,0 +1,155 @@
+import json
+import threading
+from datetime import timedelta
+from http import HTTPStatus
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import pytest
+import respx
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, delete
+
+from what_to_wear.api.database.db import engine, init_db, utc_now
+from what_to_wear.api.models.db_models.recommendation import Recommendation
+from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
+from what_to_wear.api.services.recommendation_service import (
+    get_llm_recommendation,
+    recommendation_cache,
+    stream_llm_recommendation,
+)
+from what_to_wear.api.services.recommendation_store_service import (
+    get_store_key,
+    get_stored_recommendation,
+    purge_expired_recommendations,
+    store_recommendation,
+)
+from what_to_wear.api.utils.constants import HEADERS, LLM_API_URL, ModelTypeEnum, RequestTypeEnum
+
+STORE_SERVICE = "what_to_wear.api.services.recommendation_store_service"
+CACHE_KEY = (ModelTypeEnum.MISTRAL, RequestTypeEnum.CURRENT, 10, 9, 3, 1, 0, True)
+MOCK_RECOMMENDATION = "Wear a light jacket."
+
+
+def load_mock_data(filename: str):
+    json_path = Path(__file__).parent / "mock_data" / filename
+    with open(json_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+MOCK_CURRENT_WEATHER_RESPONSE = load_mock_data("mock_current_weather_response.json")
+MOCK_LLM_RESPONSE = {"choices": [{"message": {"content": MOCK_RECOMMENDATION}}]}
+
+
+@pytest.fixture(autouse=True)
+def store():
+    init_db()
+    with Session(engine) as session:
+        session.exec(delete(Recommendation))
+        session.commit()
+    with patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_STORE_ENABLED",
+               True):
+        yield
+
+
+def test_store_key_is_stable():
+    expected_key = get_store_key(
+        (ModelTypeEnum.MISTRAL.value, RequestTypeEnum.CURRENT.value, 10, 9, 3, 1, 0, True)
+    )
+    assert get_store_key(CACHE_KEY) == expected_key
+    assert get_store_key(CACHE_KEY[:-1] + (False,)) != expected_key
+
+
+def test_store_and_get_recommendation():
+    assert get_stored_recommendation(CACHE_KEY) is None
+
+    store_recommendation(CACHE_KEY, MOCK_RECOMMENDATION, ModelTypeEnum.MISTRAL)
+    store_recommendation(CACHE_KEY, MOCK_RECOMMENDATION, ModelTypeEnum.MISTRAL)
+
+    assert get_stored_recommendation(CACHE_KEY) == MOCK_RECOMMENDATION
+
+
+def test_expired_recommendations_are_ignored_and_purged():
+    with patch(f"{STORE_SERVICE}.RECOMMENDATION_STORE_TTL_SECONDS", -1):
+        store_recommendation(CACHE_KEY, MOCK_RECOMMENDATION, ModelTypeEnum.MISTRAL)
+    store_recommendation(CACHE_KEY[:-1] + (False,), MOCK_RECOMMENDATION, ModelTypeEnum.MISTRAL)
+
+    assert get_stored_recommendation(CACHE_KEY) is None
+    assert purge_expired_recommendations() == 1
+    with Session(engine) as session:
+        remaining = session.get(Recommendation, get_store_key(CACHE_KEY[:-1] + (False,)))
+    in_an_hour = (utc_now() + timedelta(hours=1)).replace(tzinfo=None)
+    assert remaining.expires_at.replace(tzinfo=None) > in_an_hour
+
+
+def test_database_failures_are_ignored():
+    error = OperationalError("SELECT", {}, Exception("locked"))
+    with patch(f"{STORE_SERVICE}.Session", side_effect=error):
+        store_recommendation(CACHE_KEY, MOCK_RECOMMENDATION, ModelTypeEnum.MISTRAL)
+        assert get_stored_recommendation(CACHE_KEY) is None
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_llm_recommendations_survive_the_memory_cache():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    weather_data = CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE)
+
+    first = await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+    recommendation_cache.clear()  # As after a restart, or in another worker
+    second = await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+    recommendation_cache.clear()
+    streamed = [
+        chunk async for chunk in stream_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+    ]
+
+    assert first == second == MOCK_RECOMMENDATION
+    assert streamed == [MOCK_RECOMMENDATION]
+
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_store_is_used_outside_the_event_loop_thread():
+    respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    weather_data = CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE)
+    threads = []
+
+    def record_thread(*args):
+        threads.append(threading.get_ident())
+
+    service = "what_to_wear.api.services.recommendation_service"
+    with patch(f"{service}.get_stored_recommendation", side_effect=record_thread), \
+         patch(f"{service}.store_recommendation", side_effect=record_thread):
+        await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+
+    expected_calls = 2
+    assert len(threads) == expected_calls
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_store_is_used_with_the_memory_cache_disabled():
+    route = respx.post(LLM_API_URL, headers=HEADERS).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_LLM_RESPONSE)
+    )
+    weather_data = CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE)
+
+    with patch("what_to_wear.api.services.recommendation_service.RECOMMENDATION_CACHE_ENABLED",
+               False):
+        first = await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+        second = await get_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+        stream = stream_llm_recommendation(weather_data, RequestTypeEnum.CURRENT)
+        streamed = [chunk async for chunk in stream]
+
+    assert first == second == MOCK_RECOMMENDATION
+    assert streamed == [MOCK_RECOMMENDATION]
+    assert route.call_count == 1
+    assert len(recommendation_cache) == 0
@@ -0,0 +1,147 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from what_to_wear.api.utils.resilience import (
+    CircuitBreaker,
+    CircuitStateEnum,
+    LatencyTracker,
+    RetryBudget,
+    hedge,
+    jittered_backoff,
+)
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitStateEnum.OPEN
+        assert not breaker.allow_request()
+
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=131.0):
+        assert breaker.state == CircuitStateEnum.HALF_OPEN
+        breaker.record_failure()
+        assert breaker.state == CircuitStateEnum.OPEN
+
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=162.0):
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CircuitStateEnum.CLOSED
+
+
+def test_circuit_breaker_admits_a_single_probe_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=131.0):
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=162.0):
+        assert breaker.allow_request()  # The first probe never reported back
+        breaker.record_failure()
+        assert not breaker.allow_request()
+
+
+def test_retry_budget_limits_retries_to_a_fraction_of_requests():
+    budget = RetryBudget(ratio=0.5, max_tokens=1)
+    assert budget.try_retry()
+    assert not budget.try_retry()
+
+    budget.record_request()
+    assert not budget.try_retry()
+    budget.record_request()
+    assert budget.try_retry()
+
+
+def test_latency_tracker_adapts_timeout_to_observed_latency():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    max_timeout = 10.0
+    assert tracker.adaptive_timeout(3, 1, max_timeout) == max_timeout
+
+    for _ in range(100):
+        tracker.record(0.5)
+    expected_timeout = 1.5
+    assert tracker.adaptive_timeout(3, 1, max_timeout) == expected_timeout
+
+    for _ in range(100):
+        tracker.record(0.1)
+    min_timeout = 1.0
+    assert tracker.adaptive_timeout(3, min_timeout, max_timeout) == min_timeout
+
+
+def test_latency_tracker_forgets_old_samples():
+    tracker = LatencyTracker(min_samples=1, max_age=60)
+    slow, fast = 20.0, 0.5
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=100.0):
+        tracker.record(slow)
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=150.0):
+        tracker.record(fast)
+        assert tracker.percentile(100) == slow
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=170.0):
+        assert tracker.percentile(100) == fast
+        assert len(tracker) == 1
+    with patch("what_to_wear.api.utils.resilience.time.monotonic", return_value=300.0):
+        assert tracker.percentile(100) is None
+
+
+def test_jittered_backoff_stays_within_bounds():
+    max_delay = 1.0
+    for attempt in range(10):
+        delay = jittered_backoff(attempt, 0.1, max_delay)
+        assert 0 <= delay <= min(max_delay, 0.1 * 2 ** attempt)
+
+
+async def answer(value: str, delay: float, calls: list):
+    calls.append(value)
+    await asyncio.sleep(delay)
+    return value
+
+
+async def fail(calls: list):
+    calls.append("failed")
+    raise ValueError("provider down")
+
+
+@pytest.mark.asyncio
+async def test_hedge_does_not_hedge_fast_answers():
+    calls = []
+
+    calls_in_order = [lambda: answer("fast", 0, calls), lambda: answer("backup", 0, calls)]
+    result = await hedge(calls_in_order, delay=0.1)
+
+    assert result == "fast"
+    assert calls == ["fast"]
+
+
+@pytest.mark.asyncio
+async def test_hedge_takes_first_success_and_cancels_the_loser():
+    calls = []
+    slow = None
+
+    async def slow_call():
+        nonlocal slow
+        slow = asyncio.current_task()
+        return await answer("slow", 1, calls)
+
+    result = await hedge([slow_call, lambda: answer("backup", 0, calls)], delay=0.01)
+    await asyncio.sleep(0)
+
+    assert result == "backup"
+    assert calls == ["slow", "backup"]
+    assert slow.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_hedge_moves_on_after_failures_and_raises_first_error():
+    calls = []
+
+    result = await hedge([lambda: fail(calls), lambda: answer("backup", 0, calls)], delay=10)
+    assert result == "backup"
+    with pytest.raises(ValueError, match="provider down"):
+        await hedge([lambda: fail(calls), lambda: fail(calls)], delay=10)
@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.services.rule_recommendation_service import (
+    get_rule_recommendation,
+    recommend_for_current,
+    recommend_for_day,
+)
+from what_to_wear.api.utils.constants import RequestTypeEnum
+
+
+def load_mock_data(filename: str):
+    json_path = Path(__file__).parent / "mock_data" / filename
+    with open(json_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+MOCK_CURRENT_WEATHER_RESPONSE = load_mock_data("mock_current_weather_response.json")
+MOCK_FORECAST_WEATHER_RESPONSE = load_mock_data("mock_forecast_weather_response.json")
+
+
+def test_recommend_for_current_cold_wet_and_windy():
+    current = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE).current
+    current.feelslike_c, current.precip_mm, current.wind_kph, current.is_day = -5, 8, 45, 1
+
+    recommendation = recommend_for_current(current)
+
+    assert recommendation.startswith("Wear a warm winter coat")
+    assert "waterproof jacket" in recommendation
+    assert "windproof" in recommendation
+
+
+def test_recommend_for_current_warm_dry_evening():
+    current = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE).current
+    current.feelslike_c, current.precip_mm, current.wind_kph = 27, 0, 5
+    current.uv, current.is_day = 9, 0
+
+    recommendation = recommend_for_current(current)
+
+    assert recommendation.startswith("Wear light, breathable clothes")
+    assert "add a layer" in recommendation
+    assert "sunscreen" not in recommendation
+
+
+def test_recommend_for_day_suggests_layers_for_large_temperature_ranges():
+    day = ForecastWeatherResponse(**MOCK_FORECAST_WEATHER_RESPONSE).forecast.forecastday[0].day
+
+    recommendation = recommend_for_day(day)
+
+    assert "Dress in layers, it will range from 15°C to 25°C." in recommendation
+    assert "an umbrella or a rain jacket" in recommendation
+
+
+def test_get_rule_recommendation_forecast_has_one_line_per_day():
+    weather_data = ForecastWeatherResponse(**MOCK_FORECAST_WEATHER_RESPONSE)
+
+    recommendation = get_rule_recommendation(weather_data, RequestTypeEnum.FORECAST)
+
+    assert recommendation.startswith("2022-01-01: Wear ")
+    assert "\n" not in recommendation
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from what_to_wear.api.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call_between_concurrent_callers():
+    flights = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "sunny"
+
+    results = await asyncio.gather(*(flights.do("berlin", fetch) for _ in range(10)))
+
+    assert results == ["sunny"] * 10
+    assert calls == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_every_caller():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(
+        *(flights.do("berlin", fetch) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "sunny"
+
+    cancelled = asyncio.create_task(flights.do("berlin", fetch))
+    waiting = asyncio.create_task(flights.do("berlin", fetch))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await waiting == "sunny"
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_shared_call_when_nobody_waits():
+    flights = SingleFlight()
+    upstream_cancelled = asyncio.Event()
+
+    async def fetch():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+
+    caller = asyncio.create_task(flights.do("berlin", fetch))
+    await asyncio.sleep(0)
+    caller.cancel()
+
+    await asyncio.wait_for(upstream_cancelled.wait(), timeout=1)
+    assert len(flights) == 0
@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+
+from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import LazyForecastWeatherResponse
+from what_to_wear.api.utils.utils import (
+    FORECAST_PROMPT_HEADER,
+    estimate_tokens,
+    generate_clothes_recommendation_prompt_current_weather,
+    generate_clothes_recommendation_prompt_forecast,
+    generate_clothes_recommendation_prompt_forecast_day,
+)
+from what_to_wear.tests.conftest import build_multi_day_forecast
+
+
+def load_mock_data(filename: str):
+    json_path = Path(__file__).parent / "mock_data" / filename
+    with open(json_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+MOCK_CURRENT_WEATHER_RESPONSE = load_mock_data("mock_current_weather_response.json")
+MOCK_FORECAST_WEATHER_RESPONSE = load_mock_data("mock_forecast_weather_response.json")
+
+
+def build_forecast(days: int) -> LazyForecastWeatherResponse:
+    payload = build_multi_day_forecast(days)
+    return LazyForecastWeatherResponse.model_validate_json(json.dumps(payload))
+
+
+def test_estimate_tokens():
+    expected_tokens = 3
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Wear a coat") == expected_tokens
+
+
+def test_prompts_are_compact():
+    weather_data = CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE)
+    forecast = build_forecast(days=3)
+
+    for prompt in (
+        generate_clothes_recommendation_prompt_current_weather(weather_data),
+        generate_clothes_recommendation_prompt_forecast_day(forecast.forecast.forecastday[0].day),
+        generate_clothes_recommendation_prompt_forecast(forecast),
+    ):
+        assert prompt == prompt.strip()
+        assert "  " not in prompt
+
+    current_prompt = generate_clothes_recommendation_prompt_current_weather(weather_data)
+    assert f"{weather_data.current.temp_c}°C" in current_prompt
+
+
+def test_forecast_prompt_has_one_line_per_day():
+    expected_days = 3
+    prompt = generate_clothes_recommendation_prompt_forecast(build_forecast(expected_days))
+    lines = prompt.split("\n")
+
+    assert lines[0] == FORECAST_PROMPT_HEADER
+    assert [line.split(":")[0] for line in lines[1:]] == ["2022-01-01", "2022-01-02", "2022-01-03"]
+    assert "humidity" in lines[1]
+
+
+def test_forecast_prompt_fits_the_token_budget():
+    forecast = build_forecast(days=14)
+    full_prompt = generate_clothes_recommendation_prompt_forecast(forecast, max_tokens=10_000)
+
+    short_budget = estimate_tokens(full_prompt) - 1
+    short_prompt = generate_clothes_recommendation_prompt_forecast(
+        forecast, max_tokens=short_budget
+    )
+    assert estimate_tokens(short_prompt) <= short_budget
+    assert "humidity" not in short_prompt
+    assert short_prompt.count("\n") == full_prompt.count("\n")
+
+    tight_budget = estimate_tokens(FORECAST_PROMPT_HEADER) + 60
+    tight_prompt = generate_clothes_recommendation_prompt_forecast(
+        forecast, max_tokens=tight_budget
+    )
+    assert estimate_tokens(tight_prompt) <= tight_budget
+    assert tight_prompt.split("\n")[-1].startswith("2022-01-")
+    assert " to 2022-01-14: " in tight_prompt
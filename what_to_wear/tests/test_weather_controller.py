@@ -4,12 +4,18 @@ from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 
 from what_to_wear.api.controllers.weather_controller import router
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
-from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import (
+    ForecastWeatherResponse,
+    LazyForecastWeatherResponse,
+)
+from what_to_wear.api.models.schemas.weather_batch import WeatherBatchResult
 from what_to_wear.api.services.auth_service import get_current_user
+from what_to_wear.api.utils.constants import RequestTypeEnum
 from what_to_wear.main import app
 
 client = TestClient(app)
@@ -130,3 +136,123 @@ async def test_get_current_weather_server_error(override_auth):
         )
 
         assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@pytest.mark.asyncio
+async def test_get_current_weather_keeps_upstream_status(override_auth):
+    with patch("what_to_wear.api.controllers.weather_controller.get_current_weather_data",
+               new_callable=AsyncMock) as mock_weather:
+        mock_weather.side_effect = HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="Weather service temporarily unavailable",
+        )
+
+        headers = {"Authorization": "Bearer fake_token"}
+        response = client.get("/weather/current", params={"city": "Test City"}, headers=headers)
+
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert response.json()["detail"] == "Weather service temporarily unavailable"
+
+
+@pytest.mark.asyncio
+async def test_get_forecast_weather_reuses_encoded_bytes_of_cached_entry(override_auth):
+    weather_data = ForecastWeatherResponse.model_validate(MOCK_FORECAST_WEATHER_RESPONSE)
+
+    with patch("what_to_wear.api.controllers.weather_controller.get_forecast_weather_data",
+               new_callable=AsyncMock, return_value=weather_data):
+        headers = {"Authorization": "Bearer fake_token"}
+        params = {"city": "Test City", "include_hours": True}
+        first = client.get("/weather/forecast", params=params, headers=headers)
+        encoded = weather_data.to_json_bytes()
+        second = client.get("/weather/forecast", params=params, headers=headers)
+
+    assert first.status_code == HTTPStatus.OK
+    assert first.json() == weather_data.model_dump()
+    assert second.content == first.content == encoded
+    assert weather_data.to_json_bytes() is encoded
+
+
+@pytest.mark.asyncio
+async def test_get_forecast_weather_omits_hours_by_default(override_auth):
+    weather_data = LazyForecastWeatherResponse.model_validate_json(
+        json.dumps(MOCK_FORECAST_WEATHER_RESPONSE)
+    )
+
+    with patch("what_to_wear.api.controllers.weather_controller.get_forecast_weather_data",
+               new_callable=AsyncMock, return_value=weather_data):
+        headers = {"Authorization": "Bearer fake_token"}
+        summary = client.get("/weather/forecast", params={"city": "Test City"}, headers=headers)
+        full = client.get(
+            "/weather/forecast",
+            params={"city": "Test City", "include_hours": True},
+            headers=headers,
+        )
+
+    assert summary.status_code == HTTPStatus.OK
+    assert "hour" not in summary.json()["forecast"]["forecastday"][0]
+    assert full.json() == MOCK_FORECAST_WEATHER_RESPONSE
+
+
+def test_get_forecast_weather_documents_both_projections():
+    schema = app.openapi()["paths"]["/weather/forecast"]["get"]["responses"]["200"]
+    documented = schema["content"]["application/json"]["schema"]["anyOf"]
+
+    assert {model["$ref"].rsplit("/", 1)[-1] for model in documented} == {
+        "ForecastWeatherSummaryResponse", "ForecastWeatherResponse"
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_weather_batch_data(override_auth):
+    results = [
+        WeatherBatchResult(index=0, status_code=HTTPStatus.OK,
+                           data=CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE)),
+        WeatherBatchResult(index=1, status_code=HTTPStatus.NOT_FOUND,
+                           error="City or coordinates not found."),
+    ]
+    with patch("what_to_wear.api.controllers.weather_controller.get_weather_batch",
+               new_callable=AsyncMock, return_value=results) as mock_batch:
+        headers = {"Authorization": "Bearer fake_token"}
+        response = client.post("/weather/batch", json={"items": [
+            {"city": "Test City"},
+            {"city": "InvalidCity", "type": "FORECAST", "days": 2},
+        ]}, headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    body = response.json()["results"]
+    assert body[0]["data"]["location"]["name"] == "Test City"
+    assert body[1] == {"index": 1, "status_code": HTTPStatus.NOT_FOUND, "data": None,
+                       "error": "City or coordinates not found."}
+    items = mock_batch.call_args.args[0]
+    assert items[1].type == RequestTypeEnum.FORECAST
+
+
+@pytest.mark.asyncio
+async def test_get_weather_batch_data_invalid_item(override_auth):
+    headers = {"Authorization": "Bearer fake_token"}
+    response = client.post("/weather/batch", json={"items": [{"lat": 12.34}]}, headers=headers)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    response = client.post("/weather/batch", json={"items": []}, headers=headers)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    response = client.post("/weather/batch", json={"items": ["Berlin"]}, headers=headers)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_get_weather_batch_data_unauthorized():
+    response = client.post("/weather/batch", json={"items": [{"city": "Test City"}]})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_get_current_weather_flags_stale_fallback(override_auth):
+    stale = CurrentWeatherResponse.model_validate(MOCK_CURRENT_WEATHER_RESPONSE).as_stale()
+    with patch("what_to_wear.api.controllers.weather_controller.get_current_weather_data",
+               new_callable=AsyncMock, return_value=stale):
+        headers = {"Authorization": "Bearer fake_token"}
+        response = client.get("/weather/current", params={"city": "Test City"}, headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["Warning"] == '110 - "Response is Stale"'
@@ -1,6 +1,9 @@
+import asyncio
 import json
+import time
 from http import HTTPStatus
 from pathlib import Path
+from unittest.mock import patch
 
 import httpx
 import pytest
@@ -8,12 +11,24 @@ import respx
 from fastapi import HTTPException
 
 from what_to_wear.api.models.schemas.current_weather import CurrentWeatherResponse
-from what_to_wear.api.models.schemas.forecast_weather import ForecastWeatherResponse
+from what_to_wear.api.models.schemas.forecast_weather import (
+    ForecastWeatherResponse,
+    LazyForecastWeatherResponse,
+)
+from what_to_wear.api.models.schemas.weather_batch import WeatherBatchItem
+from what_to_wear.api.services.location_service import resolve_location
 from what_to_wear.api.services.weather_service import (
     get_current_weather_data,
     get_forecast_weather_data,
+    get_weather_batch,
+    weather_cache,
+    weather_circuit_breaker,
+    weather_retry_budget,
 )
-from what_to_wear.api.utils.constants import WEATHER_API_BASE_URL, WEATHER_API_KEY
+from what_to_wear.api.utils.background import background_tasks
+from what_to_wear.api.utils.constants import WEATHER_API_BASE_URL, WEATHER_API_KEY, RequestTypeEnum
+from what_to_wear.api.utils.resilience import CircuitStateEnum
+from what_to_wear.tests.conftest import build_multi_day_forecast
 
 
 def load_mock_data(filename: str):
@@ -204,3 +219,381 @@ async def test_get_forecast_weather_data_invalid_lat_lon():
 
     assert exc_info.value.status_code == HTTPStatus.BAD_REQUEST
     assert "Invalid city or coordinates" in str(exc_info.value.detail)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_is_cached_per_normalized_city():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+
+    first = await get_current_weather_data(None, None, "Berlin")
+    second = await get_current_weather_data(None, None, "  berlin ")
+
+    assert route.call_count == 1
+    assert second is first
+    assert weather_cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_quantizes_coordinates():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url, params={"key": WEATHER_API_KEY, "q": "12.34,56.78"}).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+
+    await get_current_weather_data("12.3401", "56.7799", None)
+    await get_current_weather_data("12.338", "56.781", None)
+
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_forecast_weather_data_is_cached_per_days():
+    url = f"{WEATHER_API_BASE_URL}/forecast.json"
+    route = respx.get(url).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_FORECAST_WEATHER_RESPONSE)
+    )
+
+    await get_forecast_weather_data(None, None, "Berlin", 3)
+    await get_forecast_weather_data(None, None, "Berlin", 3)
+    await get_forecast_weather_data(None, None, "Berlin", 5)
+
+    expected_upstream_calls = 2
+    assert route.call_count == expected_upstream_calls
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_does_not_cache_errors():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url).mock(
+        return_value=httpx.Response(
+            HTTPStatus.INTERNAL_SERVER_ERROR, json={"error": "Upstream down"}
+        )
+    )
+
+    with patch("what_to_wear.api.services.weather_service.WEATHER_API_MAX_RETRIES", 0):
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await get_current_weather_data(None, None, "Berlin")
+
+    expected_upstream_calls = 2
+    assert route.call_count == expected_upstream_calls
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_coalesces_concurrent_misses():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+
+    results = await asyncio.gather(
+        *(get_current_weather_data(None, None, "Berlin") for _ in range(5))
+    )
+
+    assert route.call_count == 1
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_serves_stale_entry_while_refreshing():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    refreshed_response = {**MOCK_CURRENT_WEATHER_RESPONSE, "location": {
+        **MOCK_CURRENT_WEATHER_RESPONSE["location"], "name": "Refreshed City"}}
+    route = respx.get(url).mock(return_value=httpx.Response(HTTPStatus.OK, json=refreshed_response))
+
+    stale = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+    cache_key = (RequestTypeEnum.CURRENT, "berlin")
+    weather_cache.set(cache_key, stale, ttl=0)
+
+    background_tasks.start()
+    try:
+        response = await get_current_weather_data(None, None, "Berlin")
+        assert response is stale
+
+        assert background_tasks.is_pending(("weather_refresh", cache_key))
+        while background_tasks.is_pending(("weather_refresh", cache_key)):
+            await asyncio.sleep(0.01)
+    finally:
+        await background_tasks.stop()
+
+    assert route.call_count == 1
+    refreshed = await get_current_weather_data(None, None, "Berlin")
+    assert refreshed.location.name == "Refreshed City"
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_refreshes_inline_without_lifespan():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+    stale = CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+    weather_cache.set((RequestTypeEnum.CURRENT, "berlin"), stale, ttl=0)
+
+    response = await get_current_weather_data(None, None, "Berlin")
+
+    assert route.call_count == 1
+    assert response is not stale
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_forecast_weather_data_slices_one_cached_forecast():
+    url = f"{WEATHER_API_BASE_URL}/forecast.json"
+    max_days = 10
+    route = respx.get(url, params={"key": WEATHER_API_KEY, "q": "Berlin", "days": max_days}).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=build_multi_day_forecast(max_days))
+    )
+
+    with patch("what_to_wear.api.services.weather_service.WEATHER_FORECAST_SLICING_ENABLED", True):
+        three_days = await get_forecast_weather_data(None, None, "Berlin", 3)
+        one_day = await get_forecast_weather_data(None, None, "berlin", 1)
+        ten_days = await get_forecast_weather_data(None, None, "Berlin", max_days)
+        current = await get_current_weather_data(None, None, "Berlin")
+
+    assert route.call_count == 1
+    first_dates = ["2022-01-01", "2022-01-02", "2022-01-03"]
+    assert [day.date for day in three_days.forecast.forecastday] == first_dates
+    assert len(one_day.forecast.forecastday) == 1
+    assert len(ten_days.forecast.forecastday) == max_days
+    assert isinstance(current, CurrentWeatherResponse)
+    assert current.current == ten_days.current
+
+    with_hours = three_days.with_hours()
+    assert not isinstance(with_hours, LazyForecastWeatherResponse)
+    assert [day.date for day in with_hours.forecast.forecastday] == first_dates
+
+
+def test_lazy_forecast_does_not_keep_the_hourly_forecast():
+    raw = json.dumps(build_multi_day_forecast(3))
+    weather_data = LazyForecastWeatherResponse.model_validate_json(raw)
+
+    with_hours = weather_data.with_hours()
+
+    assert not isinstance(with_hours, LazyForecastWeatherResponse)
+    assert weather_data.with_hours() is not with_hours
+    assert set(weather_data.__pydantic_private__) == {"_json_bytes", "_is_stale", "_raw"}
+
+
+def test_forecast_slices_keep_the_stale_flag():
+    raw = json.dumps(build_multi_day_forecast(3))
+    stale = LazyForecastWeatherResponse.model_validate_json(raw).as_stale()
+
+    sliced = stale.first_days(1)
+
+    assert sliced.is_stale
+    assert sliced.with_hours().is_stale
+    assert ForecastWeatherResponse.model_validate_json(raw).as_stale().first_days(1).is_stale
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_weather_batch_reports_results_per_item():
+    respx.get(f"{WEATHER_API_BASE_URL}/current.json", params={"q": "Berlin"}).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+    respx.get(f"{WEATHER_API_BASE_URL}/current.json", params={"q": "InvalidCity"}).mock(
+        return_value=httpx.Response(HTTPStatus.NOT_FOUND, json={"error": "City not found"})
+    )
+    forecast_route = respx.get(f"{WEATHER_API_BASE_URL}/forecast.json").mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_FORECAST_WEATHER_RESPONSE)
+    )
+    items = [
+        WeatherBatchItem(city="Berlin"),
+        WeatherBatchItem(city="InvalidCity"),
+        WeatherBatchItem(lat=12.34, lon=56.78, type=RequestTypeEnum.FORECAST, days=3),
+        WeatherBatchItem(lat=12.34, lon=56.78, type=RequestTypeEnum.FORECAST, days=3),
+    ]
+
+    results = await get_weather_batch(items)
+
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert [result.status_code for result in results] == [HTTPStatus.OK, HTTPStatus.NOT_FOUND,
+                                                         HTTPStatus.OK, HTTPStatus.OK]
+    assert isinstance(results[0].data, CurrentWeatherResponse)
+    assert results[1].error == "City or coordinates not found."
+    assert isinstance(results[2].data, ForecastWeatherResponse)
+    assert forecast_route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_weather_batch_limits_concurrency():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_current_weather(lat, lon, city):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return CurrentWeatherResponse(**MOCK_CURRENT_WEATHER_RESPONSE)
+
+    concurrency = 3
+    items = [WeatherBatchItem(city=f"City {index}") for index in range(10)]
+    with patch("what_to_wear.api.services.weather_service.get_current_weather_data",
+               fake_current_weather), \
+         patch("what_to_wear.api.services.weather_service.WEATHER_BATCH_CONCURRENCY", concurrency):
+        results = await get_weather_batch(items)
+
+    assert all(result.status_code == HTTPStatus.OK for result in results)
+    assert max_in_flight == concurrency
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_shares_entry_between_location_aliases():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    respx.get(url, params={"q": "Berlin"}).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+    alias_route = respx.get(url, params={"q": "Berlin, Germany"}).mock(
+        return_value=httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE)
+    )
+
+    await get_current_weather_data(None, None, "Berlin")
+    learned_alias = await get_current_weather_data(None, None, "Berlin, Germany")
+    cached_via_alias = await get_current_weather_data(None, None, "berlin, germany")
+    cached_via_other_alias = await get_current_weather_data(None, None, "berlin")
+
+    assert alias_route.call_count == 1
+    assert cached_via_alias is learned_alias
+    assert cached_via_other_alias is learned_alias
+    assert resolve_location("BERLIN").key == "test city|test region|test country"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_caches_unknown_locations():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url).mock(
+        return_value=httpx.Response(
+            HTTPStatus.BAD_REQUEST, json={"error": "No matching location found."}
+        )
+    )
+
+    for city in ("Berlinn", "berlinn"):
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_weather_data(None, None, city)
+        assert exc_info.value.status_code == HTTPStatus.BAD_REQUEST
+        assert "Invalid city or coordinates" in str(exc_info.value.detail)
+
+    with pytest.raises(HTTPException):
+        await get_forecast_weather_data(None, None, "Berlinn", 3)
+
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_retries_transient_errors():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url).mock(side_effect=[
+        httpx.ConnectError("Connection reset"),
+        httpx.Response(HTTPStatus.SERVICE_UNAVAILABLE, json={"error": "Try again"}),
+        httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE),
+    ])
+
+    response = await get_current_weather_data(None, None, "Berlin")
+
+    expected_attempts = 3
+    assert route.call_count == expected_attempts
+    assert response.location.name == "Test City"
+    assert weather_circuit_breaker.state == CircuitStateEnum.CLOSED
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_retries_are_capped_by_budget():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    route = respx.get(url).mock(return_value=httpx.Response(HTTPStatus.BAD_GATEWAY))
+    weather_retry_budget.tokens = 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_weather_data(None, None, "Berlin")
+
+    expected_attempts = 2
+    assert exc_info.value.status_code == HTTPStatus.BAD_GATEWAY
+    assert route.call_count == expected_attempts
+    assert weather_circuit_breaker.failures == 1
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_half_open_circuit_sends_a_single_probe_upstream():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+
+    async def failing_upstream(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(HTTPStatus.BAD_GATEWAY)
+
+    route = respx.get(url).mock(side_effect=failing_upstream)
+    weather_circuit_breaker.failures = weather_circuit_breaker.failure_threshold
+    weather_circuit_breaker.opened_at = time.monotonic() - weather_circuit_breaker.reset_timeout
+
+    results = await asyncio.gather(
+        *(get_current_weather_data(None, None, f"City {index}") for index in range(50)),
+        return_exceptions=True
+    )
+
+    status_codes = [result.status_code for result in results]
+    assert route.call_count == 1
+    assert status_codes.count(HTTPStatus.BAD_GATEWAY) == 1
+    assert status_codes.count(HTTPStatus.SERVICE_UNAVAILABLE) == len(results) - 1
+    assert weather_circuit_breaker.state == CircuitStateEnum.OPEN
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_opens_circuit_after_repeated_failures():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+
+    async def flaky_upstream(request):
+        await asyncio.sleep(0.01)
+        raise httpx.ReadTimeout("Upstream too slow", request=request)
+
+    route = respx.get(url).mock(side_effect=flaky_upstream)
+
+    with patch("what_to_wear.api.services.weather_service.WEATHER_API_MAX_RETRIES", 0):
+        for city in ("Berlin", "Paris", "Rome", "Madrid", "Vienna"):
+            with pytest.raises(HTTPException):
+                await get_current_weather_data(None, None, city)
+
+        assert weather_circuit_breaker.state == CircuitStateEnum.OPEN
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_weather_data(None, None, "Lisbon")
+
+    expected_attempts = 5
+    assert route.call_count == expected_attempts
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert exc_info.value.detail == "Weather service temporarily unavailable"
+
+
+@pytest.mark.asyncio
+@respx.mock
+async def test_get_current_weather_data_falls_back_to_last_known_good_entry():
+    url = f"{WEATHER_API_BASE_URL}/current.json"
+    respx.get(url).mock(side_effect=[
+        httpx.Response(HTTPStatus.OK, json=MOCK_CURRENT_WEATHER_RESPONSE),
+        httpx.Response(HTTPStatus.INTERNAL_SERVER_ERROR),
+    ])
+
+    fresh = await get_current_weather_data(None, None, "Berlin")
+    weather_cache.clear()
+    with patch("what_to_wear.api.services.weather_service.WEATHER_API_MAX_RETRIES", 0):
+        fallback = await get_current_weather_data(None, None, "Berlin")
+
+    assert not fresh.is_stale
+    assert fallback.is_stale
+    assert fallback.model_dump() == fresh.model_dump()